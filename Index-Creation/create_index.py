@@ -14,7 +14,7 @@ from azure.storage.blob import BlobServiceClient, generate_blob_sas, BlobSasPerm
 from azure.ai.documentintelligence import DocumentIntelligenceClient
 from azure.core.credentials import AzureKeyCredential
 from openai import AzureOpenAI
-from azure.search.documents import SearchClient
+from azure.search.documents import SearchIndexingBufferedSender
 from azure.search.documents.indexes import SearchIndexClient
 from azure.search.documents.indexes.models import (
     SearchIndex,
@@ -54,7 +54,6 @@ openai_client = AzureOpenAI(
 
 search_credential = AzureKeyCredential(SEARCH_SERVICE_KEY)
 search_index_client = SearchIndexClient(endpoint=SEARCH_SERVICE_ENDPOINT, credential=search_credential)
-search_client = SearchClient(endpoint=SEARCH_SERVICE_ENDPOINT, index_name=SEARCH_INDEX_NAME, credential=search_credential)
 
 # === Helper Functions ===
 def clean_filename_for_key(filename):
@@ -199,7 +198,8 @@ def create_search_index():
         SearchField(name="file_name", type=SearchFieldDataType.String, filterable=True, searchable=True),
         SearchField(name="customer_id", type=SearchFieldDataType.String, filterable=True, searchable=True),
         SearchField(name="document_type", type=SearchFieldDataType.String, filterable=True, searchable=True),
-        SimpleField(name="embedding_str", type=SearchFieldDataType.String)
+        # Stored for offline use only; hidden so search results do not ship the ~30KB vector string
+        SimpleField(name="embedding_str", type=SearchFieldDataType.String, hidden=True)
     ]
     
     index = SearchIndex(name=SEARCH_INDEX_NAME, fields=fields)
@@ -234,12 +234,21 @@ def upload_to_search_index(chunks, embeddings, file_name):
         }
         documents.append(doc)
 
+    # The buffered sender sizes batches itself and retries throttled (503/429) actions;
+    # leaving the context manager flushes whatever is still queued
+    failed = []
     try:
-        batch_size = 10
-        for i in range(0, len(documents), batch_size):
-            batch = documents[i:i+batch_size]
-            search_client.upload_documents(batch)
-        print(f"📥 Uploaded {len(documents)} chunks from '{file_name}' to search index.")
+        with SearchIndexingBufferedSender(
+            endpoint=SEARCH_SERVICE_ENDPOINT,
+            index_name=SEARCH_INDEX_NAME,
+            credential=search_credential,
+            on_error=failed.append
+        ) as sender:
+            sender.upload_documents(documents)
+        if failed:
+            print(f"⚠️ {len(failed)} of {len(documents)} chunks from '{file_name}' failed to upload.")
+        else:
+            print(f"📥 Uploaded {len(documents)} chunks from '{file_name}' to search index.")
     except Exception as e:
         print(f"❌ Upload failed: {e}")
 
@@ -3,140 +3,56 @@
 # providing definitive medical record interpretations, treatment validations, and clinical documentation guidance.
 # It acts as the primary medical records reference for all other agents in the medical insurance system.
 
-# Step 1: Load packages
 import os
 import sys
-import json
-import re
-from datetime import datetime
-from dotenv import load_dotenv
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects.models import AzureAISearchTool, Tool
+import asyncio
+from typing import List, Optional
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import centralized instructions
-from core.instructions import AZURE_AGENT_INSTRUCTIONS, SEARCH_FIELD_MAPPINGS
-
-# Load environment variables
-load_dotenv()
-
-# Azure AI Project config from environment variables
-ENDPOINT = os.getenv("AZURE_ENDPOINT", "https://eastus2.api.azureml.ms")
-RESOURCE_GROUP = os.getenv("AZURE_RESOURCE_GROUP", "")
-SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID", "")
-PROJECT_NAME = os.getenv("AZURE_PROJECT_NAME", "")
-INDEX_NAME = os.getenv("AZURE_SEARCH_EXCLUSIONS_INDEX", "healthclaims")
-# Step 2: Connect to your Azure AI Project
-project_client = AIProjectClient(
-    endpoint=ENDPOINT,
-    resource_group_name=RESOURCE_GROUP,
-    subscription_id=SUBSCRIPTION_ID,
-    project_name=PROJECT_NAME,
-    credential=DefaultAzureCredential()
-)
-# Step 3: Connect to Azure AI Search (fsisearchindex)
-conn_list = project_client.connections.list()
-conn_id = ""
-
-print("🔍 Available connections:")
-for conn in conn_list:
-    if conn.connection_type == "CognitiveSearch":
-        print(f"   - {conn.id}")
-
-# Try to find fsisearchindex connection first
-print("🔍 Searching for fsisearchindex connection...")
-for conn in conn_list:
-    if conn.connection_type == "CognitiveSearch" and "fsisearchindex" in conn.id.lower():
-        conn_id = conn.id
-        print(f"✅ Found fsisearchindex connection: {conn_id}")
-        break
-
-# If not found, try fsi
-if not conn_id:
-    for conn in conn_list:
-        if conn.connection_type == "CognitiveSearch" and "fsi" in conn.id.lower():
-            conn_id = conn.id
-            print(f"✅ Found fsi connection: {conn_id}")
-            break
-
-# Final fallback
-if not conn_id:
-    for conn in conn_list:
-        if conn.connection_type == "CognitiveSearch":
-            conn_id = conn.id
-            print(f"⚠️ Using fallback connection: {conn_id}")
-            break
-
-# Step 4: Define the AI Search tool
-try:
-    ai_search = AzureAISearchTool(
-        index_connection_id=conn_id,
-        index_name=INDEX_NAME,
-        field_mappings=SEARCH_FIELD_MAPPINGS
-    )
-    
-except TypeError:
-    print("⚠️ 'field_mappings' not supported by SDK. Proceeding without mappings.")
-    ai_search = AzureAISearchTool(
-        index_connection_id=conn_id,
-        index_name=INDEX_NAME
-    )
-
-# Step 5: Define the Agent with centralized instructions
-search_agent = project_client.agents.create_agent(
-    model="gpt-4o",
+# Shared agent pipeline (connection discovery, agent reuse, streaming, caching)
+from core.agent_runner import AgentSpec, run_agent, run_agent_queries
+
+# Fixed analysis query sent on every run, built once at import
+POLICY_EXPERT_QUERY = """Provide a comprehensive summary of exclusions and non-medical coverage lists including: \
+1) Summary of all policy exclusions and what is NOT covered \
+2) Non-medical items list - excluded equipment, devices, and services \
+3) Coverage limitations and policy restrictions overview \
+4) Pre-existing condition exclusions and waiting periods summary \
+5) Experimental and investigational treatment exclusions \
+6) Cosmetic, elective, and non-essential procedure exclusions \
+7) Geographic, network, and provider limitations summary \
+8) Alternative medicine and lifestyle-related exclusions \
+Please provide clear, organized summaries in bullet points with brief explanations for each exclusion category."""
+
+EXCLUSIONS_SPEC = AgentSpec(
     name="exclusions-summary-specialist",
-    instructions=AZURE_AGENT_INSTRUCTIONS["exclusions_specialist"],
-    tools=ai_search.definitions,
-    tool_resources=ai_search.resources,
+    instructions_key="exclusions_specialist",
+    index_env_var="AZURE_SEARCH_EXCLUSIONS_INDEX",
+    default_index="healthclaims",
+    agent_id_env_var="EXCLUSIONS_AGENT_ID",
+    query=POLICY_EXPERT_QUERY,
+    title="Exclusions and Non-Medical Coverage Summary"
 )
 
-# Step 6: Create a thread and get summary
-thread = project_client.agents.create_thread()
 
-print("\n💬 Generating Exclusions and Non-Medical Coverage Summary...")
+async def run_exclusions_summary(stream: bool = True, session_id: str = "default") -> Optional[str]:
+    """Run the exclusions summary and return the response text"""
+    return await run_agent(EXCLUSIONS_SPEC, stream=stream, session_id=session_id)
 
-# Step 7: Create message for complete analysis
-policy_expert_query = (
-    "Provide a comprehensive summary of exclusions and non-medical coverage lists including: "
-    "1) Summary of all policy exclusions and what is NOT covered "
-    "2) Non-medical items list - excluded equipment, devices, and services "
-    "3) Coverage limitations and policy restrictions overview "
-    "4) Pre-existing condition exclusions and waiting periods summary "
-    "5) Experimental and investigational treatment exclusions "
-    "6) Cosmetic, elective, and non-essential procedure exclusions "
-    "7) Geographic, network, and provider limitations summary "
-    "8) Alternative medicine and lifestyle-related exclusions "
-    "Please provide clear, organized summaries in bullet points with brief explanations for each exclusion category."
-)
 
-# Add message
-project_client.agents.create_message(
-    thread_id=thread.id,
-    role="user",
-    content=policy_expert_query
-)
+async def run_exclusions_queries(queries: List[str], session_id: str = "default") -> List[Optional[str]]:
+    """Run several exclusions queries on the session's pooled thread"""
+    return await run_agent_queries(EXCLUSIONS_SPEC, queries, session_id=session_id)
 
-# Run the agent
-run = project_client.agents.create_and_process_run(
-    thread_id=thread.id,
-    agent_id=search_agent.id
-)
 
-# Display output
-if run.status == "failed":
-    print(f"❌ Exclusions analysis failed: {run.last_error}")
-else:
-    messages = project_client.agents.list_messages(thread_id=thread.id)
-    last_msg = messages.get_last_text_message_by_role("assistant")
-    print("\n📋 Exclusions and Non-Medical Coverage Summary:")
-    print("=" * 60)
-    print(last_msg.text.value)
-    print("=" * 60)
+async def main() -> None:
+    """Run the analysis once; importing this module performs no network I/O"""
+    await run_exclusions_summary()
+    # Agent cleanup lives in agents/teardown.py so the agent survives across runs
+    print("\n✅ Exclusions analysis complete.")
+
 
-# Step 8: Clean up (optional)
-project_client.agents.delete_agent(search_agent.id)
-print("\n✅ Exclusions analysis complete and agent cleaned up.")
\ No newline at end of file
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+# Concurrent Azure AI Agent Runner
+# Runs the independent billing and medical records agents together so their
+# Azure AI Search + GPT-4o latency overlaps instead of adding up.
+
+import os
+import sys
+import asyncio
+from typing import Dict, Optional
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import bill, patientsummary
+
+
+async def run_all_agents() -> Dict[str, Optional[str]]:
+    """Run the billing and medical records analyses concurrently"""
+    # Streaming is disabled so the two replies are not interleaved on stdout
+    billing, medical = await asyncio.gather(
+        bill.run_billing_analysis(stream=False),
+        patientsummary.run_patient_summary(stream=False)
+    )
+    return {"billing": billing, "medical": medical}
+
+
+if __name__ == "__main__":
+    asyncio.run(run_all_agents())
+    print("\n✅ Billing and medical records analyses complete.")
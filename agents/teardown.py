@@ -0,0 +1,27 @@
+# Azure AI Agent Teardown
+# The billing, medical records and exclusions agents are created once and reused across
+# runs (see BILLING_AGENT_ID / MEDICAL_AGENT_ID / EXCLUSIONS_AGENT_ID). Run this script to
+# delete them when they are no longer needed or when their instructions have changed.
+
+import os
+import sys
+import asyncio
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.agent_runner import delete_agent
+from agents.bill import BILLING_SPEC
+from agents.patientsummary import MEDICAL_SPEC
+from agents.claim import EXCLUSIONS_SPEC
+
+
+async def teardown_agents() -> None:
+    """Delete all registered agents and clear their cached IDs"""
+    for spec in (BILLING_SPEC, MEDICAL_SPEC, EXCLUSIONS_SPEC):
+        await delete_agent(spec)
+
+
+if __name__ == "__main__":
+    asyncio.run(teardown_agents())
+    print("\n✅ Agent teardown complete.")
@@ -2,22 +2,127 @@ import requests
 import os
 import sys
 import json
-from typing import Optional, Dict, Any, Union
+import re
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Deque, Dict, Any, Union, Tuple, List
+import io
 import base64
+import mmap
+import heapq
+import hashlib
+import tempfile
+import asyncio
+import threading
 from urllib.parse import urlparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from azure.storage.blob import BlobServiceClient
-from azure.identity import DefaultAzureCredential
 from dotenv import load_dotenv
 
+try:
+    import aiohttp
+    from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    import imagehash
+    from PIL import Image
+    IMAGEHASH_AVAILABLE = True
+except ImportError:
+    IMAGEHASH_AVAILABLE = False
+
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import centralized instructions
 from core.instructions import XRAY_GRADE_DESCRIPTIONS, get_xray_grade_description
+from core.azure_clients import get_credential
 
 # Load environment variables
 load_dotenv()
 
+# Images downloaded and classified at once; Custom Vision's request rate is the practical cap
+XRAY_MAX_CONCURRENCY = int(os.getenv("XRAY_MAX_CONCURRENCY", "16"))
+
+# Custom Vision responses worth retrying: timeouts, throttling and transient server errors
+PREDICTION_RETRY_STATUS_CODES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def _is_transient_async_prediction_error(error: BaseException) -> bool:
+    """Check whether an aiohttp prediction error is worth retrying"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in PREDICTION_RETRY_STATUS_CODES
+    return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+
+# aiohttp has no built-in retry, so the async POST backs off with jitter (up to 5 attempts)
+async_prediction_retry = retry(
+    wait=wait_exponential_jitter(initial=0.5, max=8),
+    stop=stop_after_attempt(5),
+    retry=retry_if_exception(_is_transient_async_prediction_error),
+    reraise=True
+)
+
+# Blob downloads in flight in the predict_all_images pipeline, ahead of the prediction workers
+XRAY_DOWNLOAD_WORKERS = int(os.getenv("XRAY_DOWNLOAD_WORKERS", "8"))
+# Parallel range requests per blob download; beyond about 2x CPU cores the gain flattens out
+BLOB_DL_CONCURRENCY = int(os.getenv("BLOB_DL_CONCURRENCY", "8"))
+# Images up to the 4MB Custom Vision limit come back in the first GET; larger blobs in 4MB ranges
+BLOB_TRANSFER_OPTIONS = {"max_single_get_size": 4 * 1024 * 1024, "max_chunk_get_size": 4 * 1024 * 1024}
+
+# Prediction cache: Custom Vision results are deterministic for (project, iteration, image bytes)
+XRAY_CACHE_DIR = os.getenv("XRAY_CACHE_DIR", ".cache/xray")
+XRAY_MEMO_SIZE = 512  # Predictions also kept in memory for repeat calls within a process
+# Perceptual-hash tier for re-encoded or re-uploaded copies of a scan: a cached prediction is
+# reused when the pHash Hamming distance is within this bound. Off (-1) by default because knee
+# X-rays are structurally similar; enable only with a bound validated on your own data (e.g. 4).
+XRAY_PHASH_MAX_DISTANCE = int(os.getenv("XRAY_PHASH_MAX_DISTANCE", "-1"))
+
+# Worker threads log through a queue drained by one listener thread instead of contending
+# for stdout; per-request detail is logged at DEBUG (set XRAY_LOG_LEVEL=DEBUG to see it)
+XRAY_LOG_LEVEL = os.getenv("XRAY_LOG_LEVEL", "INFO").upper()
+
+logger = logging.getLogger(__name__)
+_log_listener: Optional[QueueListener] = None
+_log_listener_lock = threading.Lock()
+
+
+def _start_log_listener() -> None:
+    """Attach a QueueHandler to this module's logger and start its listener once per process"""
+    global _log_listener
+    with _log_listener_lock:
+        if _log_listener is not None:
+            return
+        log_queue = queue.SimpleQueue()
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(QueueHandler(log_queue))
+        logger.setLevel(XRAY_LOG_LEVEL)
+        logger.propagate = False
+        _log_listener = QueueListener(log_queue, handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+
+# Grade descriptions for the model's own tags, resolved once instead of per prediction
+_GRADE_DESC_CACHE = {grade: get_xray_grade_description(grade) for grade in XRAY_GRADE_DESCRIPTIONS}
+
+
+def _prediction_probability(prediction: Dict[str, Any]) -> float:
+    return prediction.get('probability', 0)
+
+
+# Image extensions (.jpg, .jpeg, .png, .bmp, .tiff, .dcm), matched without lowercasing each name
+XRAY_IMAGE_PATTERN = re.compile(r'\.(?:jpe?g|png|bmp|tiff|dcm)$', re.IGNORECASE)
+
 class XRayPredictionAPI:
     """
     Azure Custom Vision Prediction API client for X-ray image classification
@@ -38,78 +143,209 @@ class XRayPredictionAPI:
         self.iteration_name = os.getenv("CUSTOM_VISION_ITERATION_NAME", "Iteration4")
         self.prediction_key = os.getenv("CUSTOM_VISION_PREDICTION_KEY", "")
         
-        # Azure Storage configuration (using Managed Identity)
-        self.storage_account_name = os.getenv("AZURE_STORAGE_ACCOUNT_NAME", "fsidemo")
-        self.storage_account_key = os.getenv("AZURE_STORAGE_ACCOUNT_KEY", "")  # Optional - Managed Identity preferred
-        self.container_name = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "health-insurance")
-        self.xray_path = os.getenv("AZURE_STORAGE_XRAY_PATH", "xray")
-    
-    def _get_headers_for_url(self) -> Dict[str, str]:
-        """Get headers for URL-based prediction"""
-        return {
+        # Prediction endpoints and headers never change after construction, so build them once
+        iteration_url = f"{self.base_url}/{self.project_id}/classify/iterations/{self.iteration_name}"
+        self._url_endpoint = f"{iteration_url}/url"
+        self._image_endpoint = f"{iteration_url}/image"
+        self._headers_url = {
             "Prediction-Key": self.prediction_key,
             "Content-Type": "application/json"
         }
-    
-    def _get_headers_for_image(self) -> Dict[str, str]:
-        """Get headers for image file-based prediction"""
-        return {
+        self._headers_image = {
             "Prediction-Key": self.prediction_key,
             "Content-Type": "application/octet-stream"
         }
-    
-    def _build_url_endpoint(self) -> str:
-        """Build the URL endpoint for image URL predictions"""
-        return f"{self.base_url}/{self.project_id}/classify/iterations/{self.iteration_name}/url"
-    
-    def _build_image_endpoint(self) -> str:
-        """Build the URL endpoint for image file predictions"""
-        return f"{self.base_url}/{self.project_id}/classify/iterations/{self.iteration_name}/image"
+        
+        # One keep-alive session for all prediction POSTs; pool sized for the batch thread pool.
+        # Timeouts, throttling (429) and transient 5xx responses are retried with exponential
+        # backoff, honouring Retry-After; connection errors are retried by the same policy.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=max(64, XRAY_MAX_CONCURRENCY),
+            max_retries=Retry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=sorted(PREDICTION_RETRY_STATUS_CODES),
+                allowed_methods=["POST"],
+                respect_retry_after_header=True
+            )
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        
+        # Azure Storage configuration (using Managed Identity)
+        self.storage_account_name = os.getenv("AZURE_STORAGE_ACCOUNT_NAME", "fsidemo")
+        self.storage_account_key = os.getenv("AZURE_STORAGE_ACCOUNT_KEY", "")  # Optional - Managed Identity preferred
+        self.container_name = os.getenv("AZURE_STORAGE_CONTAINER_NAME", "health-insurance")
+        self.xray_path = os.getenv("AZURE_STORAGE_XRAY_PATH", "xray")
+        
+        _start_log_listener()
+        
+        # Storage clients are created on first use and reused, so a batch pays for one
+        # connection pool instead of one per image; tokens come from the shared credential
+        self._blob_service_client = None
+        self._container_client = None
+        self._client_lock = threading.Lock()  # Batch predictions may create the clients from worker threads
+        
+        # In-memory LRU in front of the on-disk prediction cache
+        self._prediction_memo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        # (pHash, response), oldest first; the oldest drops out once XRAY_MEMO_SIZE is reached
+        self._similar_predictions: Deque[Tuple[Any, Dict[str, Any]]] = deque(maxlen=XRAY_MEMO_SIZE)
     
     def get_blob_service_client(self):
-        """Create and return Azure Blob Service Client using Managed Identity"""
-        account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
-        # Use Managed Identity (DefaultAzureCredential) instead of storage key
-        if self.storage_account_key:
-            # Fallback to key if provided
-            return BlobServiceClient(account_url=account_url, credential=self.storage_account_key)
-        else:
-            # Use Managed Identity
-            return BlobServiceClient(account_url=account_url, credential=DefaultAzureCredential())
+        """Return the Azure Blob Service Client using Managed Identity, creating it once"""
+        with self._client_lock:
+            if self._blob_service_client is None:
+                account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
+                # Use the shared AAD credential (see core.azure_clients) instead of storage key
+                if self.storage_account_key:
+                    # Fallback to key if provided
+                    self._blob_service_client = BlobServiceClient(account_url=account_url, credential=self.storage_account_key, **BLOB_TRANSFER_OPTIONS)
+                else:
+                    # Use the process-wide token-caching credential
+                    self._blob_service_client = BlobServiceClient(account_url=account_url, credential=get_credential(), **BLOB_TRANSFER_OPTIONS)
+        return self._blob_service_client
+    
+    def get_container_client(self):
+        """Return the client for the X-ray container, creating it once"""
+        blob_service_client = self.get_blob_service_client()
+        with self._client_lock:
+            if self._container_client is None:
+                self._container_client = blob_service_client.get_container_client(self.container_name)
+        return self._container_client
     
     def list_xray_images(self):
         """List all X-ray images in the Azure Storage container"""
         try:
-            blob_service_client = self.get_blob_service_client()
-            container_client = blob_service_client.get_container_client(self.container_name)
-            
-            # List blobs in the xray directory
-            blob_list = container_client.list_blobs(name_starts_with=self.xray_path)
-            
-            xray_files = []
-            for blob in blob_list:
-                # Filter for image files
-                if blob.name.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.dcm')):
-                    xray_files.append(blob.name)
-            
-            return xray_files
+            container_client = self.get_container_client()
+            
+            # List blob names in the xray directory (names only, no properties deserialized)
+            # and filter for image files
+            return [
+                blob_name for blob_name in container_client.list_blob_names(name_starts_with=self.xray_path)
+                if XRAY_IMAGE_PATTERN.search(blob_name)
+            ]
         except Exception as e:
-            print(f"Error listing X-ray images: {str(e)}")
+            logger.error("Error listing X-ray images: %s", e)
             return []
     
     def download_blob_to_bytes(self, blob_name):
         """Download blob from Azure Storage and return as bytes"""
         try:
-            blob_service_client = self.get_blob_service_client()
-            blob_client = blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+            blob_client = self.get_container_client().get_blob_client(blob_name)
             
             # Download blob content
-            blob_data = blob_client.download_blob().readall()
+            blob_data = blob_client.download_blob(max_concurrency=BLOB_DL_CONCURRENCY).readall()
             return blob_data
         except Exception as e:
-            print(f"Error downloading blob {blob_name}: {str(e)}")
+            logger.error("Error downloading blob %s: %s", blob_name, e)
             return None
     
+    def _prediction_cache_key(self, image_data: bytes) -> str:
+        """Cache key for an image; includes project and iteration so retraining invalidates it"""
+        return f"{hashlib.sha256(image_data).hexdigest()}-{self.project_id}-{self.iteration_name}"
+    
+    def _get_cached_prediction(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached Custom Vision response from memory or disk, or None on a miss"""
+        with self._memo_lock:
+            result = self._prediction_memo.get(key)
+            if result is not None:
+                self._prediction_memo.move_to_end(key)
+                return result
+        
+        try:
+            with open(os.path.join(XRAY_CACHE_DIR, f"{key}.json"), "r", encoding="utf-8") as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember_prediction(key, result)
+        return result
+    
+    def _remember_prediction(self, key: str, result: Dict[str, Any]) -> None:
+        with self._memo_lock:
+            self._prediction_memo[key] = result
+            if len(self._prediction_memo) > XRAY_MEMO_SIZE:
+                self._prediction_memo.popitem(last=False)
+    
+    def _store_prediction(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a Custom Vision response in memory and atomically on disk"""
+        self._remember_prediction(key, result)
+        try:
+            os.makedirs(XRAY_CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=XRAY_CACHE_DIR, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+            os.replace(tmp_path, os.path.join(XRAY_CACHE_DIR, f"{key}.json"))
+        except OSError as e:
+            logger.warning("⚠️ Could not write prediction cache: %s", e)
+    
+    def _perceptual_hash(self, image_data) -> Optional[Any]:
+        """pHash of the image when the perceptual tier is enabled and the format is readable"""
+        if not IMAGEHASH_AVAILABLE or XRAY_PHASH_MAX_DISTANCE < 0:
+            return None
+        try:
+            with Image.open(io.BytesIO(image_data)) as image:
+                return imagehash.phash(image)
+        except Exception:
+            return None  # e.g. DICOM, which PIL cannot decode
+    
+    def _lookup_prediction(self, image_data) -> Tuple[str, Optional[Any], Optional[Dict[str, Any]]]:
+        """
+        Look an image up in the exact tier, then the perceptual-hash tier
+        
+        Args:
+            image_data: Raw image bytes
+            
+        Returns:
+            (cache key, perceptual hash or None, cached response or None)
+        """
+        key = self._prediction_cache_key(image_data)
+        result = self._get_cached_prediction(key)
+        if result is not None:
+            logger.info("⚡ Prediction served from cache")
+            return key, None, result
+        
+        image_hash = self._perceptual_hash(image_data)
+        if image_hash is not None:
+            with self._memo_lock:
+                similar = [(image_hash - cached_hash, cached) for cached_hash, cached in self._similar_predictions]
+            if similar:
+                distance, cached = min(similar, key=lambda item: item[0])
+                if distance <= XRAY_PHASH_MAX_DISTANCE:
+                    logger.info("⚡ Prediction served from perceptual-hash cache (distance %d)", distance)
+                    return key, image_hash, {**cached, "cache": "semantic"}
+        return key, image_hash, None
+    
+    def _save_prediction(self, key: str, image_hash: Optional[Any], result: Dict[str, Any]) -> None:
+        """Store a fresh Custom Vision response in the exact and perceptual-hash tiers"""
+        self._store_prediction(key, result)
+        if image_hash is not None:
+            with self._memo_lock:
+                self._similar_predictions.append((image_hash, result))
+    
+    def _post_image(self, image_data) -> Dict[str, Any]:
+        """
+        Classify image bytes with Custom Vision, reusing the cached response for identical bytes
+        
+        Args:
+            image_data: Raw image bytes (bytes, bytearray or a read-only mmap)
+            
+        Returns:
+            Raw API response
+        """
+        key, image_hash, result = self._lookup_prediction(image_data)
+        if result is not None:
+            return result
+        
+        response = self._session.post(self._image_endpoint, headers=self._headers_image, data=image_data)
+        response.raise_for_status()
+        
+        result = response.json()
+        self._save_prediction(key, image_hash, result)
+        return result
+    
     def predict_from_url(self, image_url: str) -> Dict[str, Any]:
         """
         Predict X-ray classification from an image URL
@@ -126,14 +362,14 @@ class XRayPredictionAPI:
             if not all([parsed_url.scheme, parsed_url.netloc]):
                 raise ValueError("Invalid URL format")
             
-            endpoint = self._build_url_endpoint()
-            headers = self._get_headers_for_url()
+            endpoint = self._url_endpoint
+            headers = self._headers_url
             body = {"Url": image_url}
             
-            print(f"Making prediction request to: {endpoint}")
-            print(f"Image URL: {image_url}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Making prediction request to: %s\nImage URL: %s", endpoint, image_url)
             
-            response = requests.post(endpoint, headers=headers, json=body)
+            response = self._session.post(endpoint, headers=headers, json=body)
             response.raise_for_status()
             
             result = response.json()
@@ -163,30 +399,27 @@ class XRayPredictionAPI:
             Dictionary containing prediction results
         """
         try:
-            # Validate file exists
-            if not os.path.exists(image_path):
-                raise FileNotFoundError(f"Image file not found: {image_path}")
-            
-            # Validate file size (Custom Vision has limits)
-            file_size = os.path.getsize(image_path)
-            max_size = 4 * 1024 * 1024  # 4MB limit
-            if file_size > max_size:
-                raise ValueError(f"File size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
-            
-            endpoint = self._build_image_endpoint()
-            headers = self._get_headers_for_image()
-            
-            print(f"Making prediction request to: {endpoint}")
-            print(f"Image file: {image_path}")
-            print(f"File size: {file_size} bytes")
-            
+            # One open + fstat validates existence and size; the pages are mapped rather than
+            # copied into a bytes object, and the mapping is hashed and posted as-is
             with open(image_path, 'rb') as image_file:
-                image_data = image_file.read()
-            
-            response = requests.post(endpoint, headers=headers, data=image_data)
-            response.raise_for_status()
+                file_size = os.fstat(image_file.fileno()).st_size
+                
+                # Validate file size (Custom Vision has limits)
+                max_size = 4 * 1024 * 1024  # 4MB limit
+                if file_size > max_size:
+                    raise ValueError(f"File size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
+                
+                endpoint = self._image_endpoint
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Making prediction request to: %s\nImage file: %s\nFile size: %d bytes", endpoint, image_path, file_size)
+                
+                if file_size == 0:
+                    result = self._post_image(b"")
+                else:
+                    with mmap.mmap(image_file.fileno(), file_size, access=mmap.ACCESS_READ) as image_data:
+                        result = self._post_image(image_data)
             
-            result = response.json()
             return self._format_prediction_result(result, source=f"File: {image_path}")
             
         except (FileNotFoundError, PermissionError) as e:
@@ -220,26 +453,27 @@ class XRayPredictionAPI:
             Dictionary containing prediction results
         """
         try:
+            # Reject oversized images from the encoded length before allocating the decoded copy
+            max_size = 4 * 1024 * 1024  # 4MB limit
+            encoded_size = len(base64_image) - base64_image.count("\n") - base64_image.count("\r")
+            estimated_size = encoded_size * 3 // 4 - base64_image.rstrip()[-2:].count("=")
+            if estimated_size > max_size:
+                raise ValueError(f"Image size ({estimated_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
+            
             # Decode base64 to get image data
             image_data = base64.b64decode(base64_image)
             
             # Validate file size
             file_size = len(image_data)
-            max_size = 4 * 1024 * 1024  # 4MB limit
             if file_size > max_size:
                 raise ValueError(f"Image size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
             
-            endpoint = self._build_image_endpoint()
-            headers = self._get_headers_for_image()
-            
-            print(f"Making prediction request to: {endpoint}")
-            print(f"Base64 image: {original_filename}")
-            print(f"Image size: {file_size} bytes")
+            endpoint = self._image_endpoint
             
-            response = requests.post(endpoint, headers=headers, data=image_data)
-            response.raise_for_status()
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Making prediction request to: %s\nBase64 image: %s\nImage size: %d bytes", endpoint, original_filename, file_size)
             
-            result = response.json()
+            result = self._post_image(image_data)
             return self._format_prediction_result(result, source=f"Base64: {original_filename}")
             
         except Exception as e:
@@ -249,47 +483,60 @@ class XRayPredictionAPI:
                 "source": f"Base64: {original_filename}"
             }
     
-    def predict_from_blob(self, blob_name: str) -> Dict[str, Any]:
+    def _download_image(self, blob_name: str, blob_client=None) -> bytearray:
+        """Download a blob into one buffer after checking its size against the 4MB limit"""
+        # Validate file size from the download's properties before the body is read
+        if blob_client is None:
+            blob_client = self.get_container_client().get_blob_client(blob_name)
+        downloader = blob_client.download_blob(max_concurrency=BLOB_DL_CONCURRENCY)
+        file_size = downloader.size
+        max_size = 4 * 1024 * 1024  # 4MB limit
+        if file_size > max_size:
+            raise ValueError(f"Image size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
+        
+        # Read the blob straight into one preallocated buffer that is posted as-is
+        image_data = bytearray(file_size)
+        downloader.readinto(memoryview(image_data))
+        return image_data
+    
+    def _predict_blob_data(self, blob_name: str, image_data: bytearray) -> Dict[str, Any]:
+        """Classify the downloaded bytes of a blob"""
+        try:
+            endpoint = self._image_endpoint
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Making prediction request to: %s\nAzure Storage blob: %s\nImage size: %d bytes", endpoint, blob_name, len(image_data))
+            
+            result = self._post_image(image_data)
+            return self._format_prediction_result(result, source=f"Azure Blob: {blob_name}")
+            
+        except Exception as e:
+            return self._blob_failure(blob_name, e)
+    
+    @staticmethod
+    def _blob_failure(blob_name: str, error: Exception) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": f"Blob prediction failed: {str(error)}",
+            "source": f"Azure Blob: {blob_name}"
+        }
+    
+    def predict_from_blob(self, blob_name: str, blob_client=None) -> Dict[str, Any]:
         """
         Predict X-ray classification from an Azure Storage blob
         
         Args:
             blob_name: Name of the blob in Azure Storage
+            blob_client: Optional BlobClient for the blob, e.g. from a batch's container client
             
         Returns:
             Dictionary containing prediction results
         """
         try:
-            # Download blob data
-            image_data = self.download_blob_to_bytes(blob_name)
-            if image_data is None:
-                raise ValueError(f"Failed to download blob: {blob_name}")
-            
-            # Validate file size
-            file_size = len(image_data)
-            max_size = 4 * 1024 * 1024  # 4MB limit
-            if file_size > max_size:
-                raise ValueError(f"Image size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
-            
-            endpoint = self._build_image_endpoint()
-            headers = self._get_headers_for_image()
-            
-            print(f"Making prediction request to: {endpoint}")
-            print(f"Azure Storage blob: {blob_name}")
-            print(f"Image size: {file_size} bytes")
-            
-            response = requests.post(endpoint, headers=headers, data=image_data)
-            response.raise_for_status()
-            
-            result = response.json()
-            return self._format_prediction_result(result, source=f"Azure Blob: {blob_name}")
-            
+            image_data = self._download_image(blob_name, blob_client)
         except Exception as e:
-            return {
-                "success": False,
-                "error": f"Blob prediction failed: {str(e)}",
-                "source": f"Azure Blob: {blob_name}"
-            }
+            return self._blob_failure(blob_name, e)
+        return self._predict_blob_data(blob_name, image_data)
     
     def _get_grade_description(self, grade_name: str) -> str:
         """
@@ -301,16 +548,20 @@ class XRayPredictionAPI:
         Returns:
             Detailed description of the grade
         """
-        # Use centralized grade descriptions from core/instructions.py
-        return get_xray_grade_description(grade_name)
+        # Use centralized grade descriptions from core/instructions.py, known tags precomputed
+        return _GRADE_DESC_CACHE.get(grade_name) or get_xray_grade_description(grade_name)
     
-    def _format_prediction_result(self, api_result: Dict[str, Any], source: str) -> Dict[str, Any]:
+    def _format_prediction_result(
+        self, api_result: Dict[str, Any], source: str, include_raw: bool = False, top_k: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Format the API prediction result into a standardized format
         
         Args:
             api_result: Raw API response
             source: Source of the image (URL, file path, etc.)
+            include_raw: Also return the raw API response under "raw_response"
+            top_k: Only format the k most probable tags in "all_predictions" (all when None)
             
         Returns:
             Formatted prediction result
@@ -318,11 +569,27 @@ class XRayPredictionAPI:
         try:
             predictions = api_result.get('predictions', [])
             
-            # Sort predictions by probability (highest first)
-            sorted_predictions = sorted(predictions, key=lambda x: x.get('probability', 0), reverse=True)
+            # Sort predictions by probability (highest first); a partial selection when only the top k are needed
+            if top_k is not None and top_k < len(predictions):
+                sorted_predictions = heapq.nlargest(top_k, predictions, key=_prediction_probability)
+            else:
+                sorted_predictions = sorted(predictions, key=_prediction_probability, reverse=True)
+            
+            all_predictions = [
+                {
+                    "tag_name": pred.get('tagName'),
+                    "probability": pred.get('probability'),
+                    "confidence_percentage": f"{(pred.get('probability', 0) * 100):.2f}%",
+                    "tag_id": pred.get('tagId'),
+                    "description": self._get_grade_description(pred.get('tagName', ''))
+                }
+                for pred in sorted_predictions
+            ]
             
-            # Get the top prediction
-            top_prediction = sorted_predictions[0] if sorted_predictions else None
+            # The top prediction reuses the first formatted entry instead of formatting it twice
+            top_prediction = {
+                key: all_predictions[0][key] for key in ("tag_name", "probability", "confidence_percentage", "description")
+            } if all_predictions else None
             
             formatted_result = {
                 "success": True,
@@ -331,25 +598,14 @@ class XRayPredictionAPI:
                 "project_id": api_result.get('project'),
                 "iteration": api_result.get('iteration'),
                 "created": api_result.get('created'),
-                "top_prediction": {
-                    "tag_name": top_prediction.get('tagName') if top_prediction else None,
-                    "probability": top_prediction.get('probability') if top_prediction else 0,
-                    "confidence_percentage": f"{(top_prediction.get('probability', 0) * 100):.2f}%" if top_prediction else "0.00%",
-                    "description": self._get_grade_description(top_prediction.get('tagName', '')) if top_prediction else None
-                } if top_prediction else None,
-                "all_predictions": [
-                    {
-                        "tag_name": pred.get('tagName'),
-                        "probability": pred.get('probability'),
-                        "confidence_percentage": f"{(pred.get('probability', 0) * 100):.2f}%",
-                        "tag_id": pred.get('tagId'),
-                        "description": self._get_grade_description(pred.get('tagName', ''))
-                    }
-                    for pred in sorted_predictions
-                ],
-                "total_predictions": len(predictions),
-                "raw_response": api_result
+                "top_prediction": top_prediction,
+                "all_predictions": all_predictions,
+                "total_predictions": len(predictions)
             }
+            if api_result.get("cache"):
+                formatted_result["cache"] = api_result["cache"]  # Served from a similarity tier, not this exact image
+            if include_raw:
+                formatted_result["raw_response"] = api_result
             
             return formatted_result
             
@@ -361,6 +617,70 @@ class XRayPredictionAPI:
                 "raw_response": api_result
             }
     
+    def _predict_source(self, image_source: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the prediction for one batch entry according to its 'type'"""
+        source_type = image_source.get('type')
+        source_value = image_source.get('source')
+        
+        if source_type == 'url':
+            return self.predict_from_url(source_value)
+        elif source_type == 'file':
+            return self.predict_from_file(source_value)
+        elif source_type == 'blob':
+            return self.predict_from_blob(source_value)
+        return {
+            "success": False,
+            "error": f"Invalid source type: {source_type}. Must be 'url', 'file', or 'blob'",
+            "source": source_value
+        }
+    
+    def _run_blob_pipeline(self, xray_images: list) -> List[Dict[str, Any]]:
+        """
+        Download and classify blobs as a two-stage pipeline
+        
+        Download workers (XRAY_DOWNLOAD_WORKERS) feed a bounded queue that prediction workers
+        (XRAY_MAX_CONCURRENCY) drain, so Blob Storage reads for later images overlap Custom
+        Vision POSTs for earlier ones, and downloads pause when predictions fall behind.
+        
+        Args:
+            xray_images: Blob names in listing order
+            
+        Returns:
+            Prediction results in the same order
+        """
+        container_client = self.get_container_client()
+        downloaded: "queue.Queue" = queue.Queue(maxsize=2 * XRAY_DOWNLOAD_WORKERS)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(xray_images)
+        
+        def download(index: int, image_blob: str) -> None:
+            try:
+                image_data = self._download_image(image_blob, container_client.get_blob_client(image_blob))
+            except Exception as e:
+                results[index] = self._blob_failure(image_blob, e)
+                return
+            downloaded.put((index, image_blob, image_data))
+        
+        def predict() -> None:
+            while True:
+                item = downloaded.get()
+                if item is None:
+                    return
+                index, image_blob, image_data = item
+                results[index] = self._predict_blob_data(image_blob, image_data)
+        
+        with ThreadPoolExecutor(max_workers=XRAY_MAX_CONCURRENCY) as predict_pool:
+            predictors = [predict_pool.submit(predict) for _ in range(XRAY_MAX_CONCURRENCY)]
+            try:
+                with ThreadPoolExecutor(max_workers=XRAY_DOWNLOAD_WORKERS) as download_pool:
+                    for index, image_blob in enumerate(xray_images):
+                        download_pool.submit(download, index, image_blob)
+            finally:
+                # One stop marker per predictor once every download has been queued
+                for _ in predictors:
+                    downloaded.put(None)
+        
+        return results
+    
     def batch_predict(self, image_sources: list) -> Dict[str, Any]:
         """
         Perform batch predictions on multiple images
@@ -378,64 +698,52 @@ class XRayPredictionAPI:
             "results": []
         }
         
-        for i, image_source in enumerate(image_sources, 1):
-            print(f"\nProcessing image {i}/{len(image_sources)}")
-            
-            source_type = image_source.get('type')
-            source_value = image_source.get('source')
-            
-            if source_type == 'url':
-                result = self.predict_from_url(source_value)
-            elif source_type == 'file':
-                result = self.predict_from_file(source_value)
-            elif source_type == 'blob':
-                result = self.predict_from_blob(source_value)
-            else:
-                result = {
-                    "success": False,
-                    "error": f"Invalid source type: {source_type}. Must be 'url', 'file', or 'blob'",
-                    "source": source_value
-                }
-            
-            results["results"].append(result)
-            
-            if result.get("success", False):
-                results["successful_predictions"] += 1
-            else:
-                results["failed_predictions"] += 1
+        # Predictions are I/O-bound, so overlap them on a thread pool; map() keeps input order
+        with ThreadPoolExecutor(max_workers=XRAY_MAX_CONCURRENCY) as executor:
+            for result in executor.map(self._predict_source, image_sources):
+                results["results"].append(result)
+                
+                if result.get("success", False):
+                    results["successful_predictions"] += 1
+                else:
+                    results["failed_predictions"] += 1
         
         return results
     
-    def predict_all_images(self) -> Dict[str, Any]:
-        """
-        Predict X-ray classification for all images in Azure Storage
-        
-        Returns:
-            Dictionary containing all prediction results
-        """
+    def _print_batch_header(self) -> None:
         print("=== Predicting All X-ray Images ===")
         print(f"Storage Account: {self.storage_account_name}")
         print(f"Container: {self.container_name}")
         print(f"X-ray Path: {self.xray_path}")
-        
-        # List available X-ray images
-        xray_images = self.list_xray_images()
-        
-        if not xray_images:
-            return {
-                "success": False,
-                "error": "No X-ray images found in the specified Azure Storage path",
-                "total_images": 0,
-                "results": []
-            }
-        
+    
+    def _announce_images(self, xray_images: list) -> None:
         print(f"\nFound {len(xray_images)} X-ray image(s) to analyze:")
         for i, image_name in enumerate(xray_images, 1):
             filename = image_name.split('/')[-1]
             print(f"{i}. {filename}")
         
         print("\nStarting batch prediction...")
+    
+    @staticmethod
+    def _no_images_result() -> Dict[str, Any]:
+        return {
+            "success": False,
+            "error": "No X-ray images found in the specified Azure Storage path",
+            "total_images": 0,
+            "results": []
+        }
+    
+    def _report_predictions(self, xray_images: list, predictions) -> Dict[str, Any]:
+        """
+        Print per-image results and the batch summary in listing order
         
+        Args:
+            xray_images: Blob names in listing order
+            predictions: Prediction results in the same order (any iterable)
+            
+        Returns:
+            Dictionary containing all prediction results
+        """
         results = {
             "total_images": len(xray_images),
             "successful_predictions": 0,
@@ -443,46 +751,33 @@ class XRayPredictionAPI:
             "results": []
         }
         
-        for i, image_blob in enumerate(xray_images, 1):
+        for i, (image_blob, result) in enumerate(zip(xray_images, predictions), 1):
             filename = image_blob.split('/')[-1]
             print(f"\n{'='*60}")
             print(f"ANALYZING IMAGE {i}/{len(xray_images)}: {filename}")
             print(f"{'='*60}")
             
-            try:
-                result = self.predict_from_blob(image_blob)
-                
-                if result.get("success", False):
-                    top_pred = result.get("top_prediction")
-                    if top_pred:
-                        grade = top_pred.get('tag_name', 'Unknown')
-                        confidence = top_pred.get('confidence_percentage', '0.00%')
-                        description = top_pred.get('description', 'No description available')
-                        
-                        print(f"✅ PREDICTION: {grade}")
-                        print(f"   Confidence: {confidence}")
-                        print(f"   Description: {description}")
-                        
-                        print(f"\n📊 ALL PREDICTIONS:")
-                        for pred in result.get("all_predictions", []):
-                            print(f"  {pred.get('tag_name', 'Unknown')}: {pred.get('confidence_percentage', '0.00%')}")
+            if result.get("success", False):
+                top_pred = result.get("top_prediction")
+                if top_pred:
+                    grade = top_pred.get('tag_name', 'Unknown')
+                    confidence = top_pred.get('confidence_percentage', '0.00%')
+                    description = top_pred.get('description', 'No description available')
                     
-                    results["successful_predictions"] += 1
-                else:
-                    print(f"❌ PREDICTION FAILED: {result.get('error', 'Unknown error')}")
-                    results["failed_predictions"] += 1
-                
-                results["results"].append(result)
+                    print(f"✅ PREDICTION: {grade}")
+                    print(f"   Confidence: {confidence}")
+                    print(f"   Description: {description}")
+                    
+                    print(f"\n📊 ALL PREDICTIONS:")
+                    for pred in result.get("all_predictions", []):
+                        print(f"  {pred.get('tag_name', 'Unknown')}: {pred.get('confidence_percentage', '0.00%')}")
                 
-            except Exception as e:
-                error_result = {
-                    "success": False,
-                    "error": f"Exception during prediction: {str(e)}",
-                    "source": f"Azure Blob: {image_blob}"
-                }
-                print(f"❌ ERROR: {str(e)}")
-                results["results"].append(error_result)
+                results["successful_predictions"] += 1
+            else:
+                print(f"❌ PREDICTION FAILED: {result.get('error', 'Unknown error')}")
                 results["failed_predictions"] += 1
+            
+            results["results"].append(result)
         
         # Print final summary
         print(f"\n{'='*60}")
@@ -501,6 +796,110 @@ class XRayPredictionAPI:
                     print(f"  - {source}: {error}")
         
         return results
+    
+    def predict_all_images(self) -> Dict[str, Any]:
+        """
+        Predict X-ray classification for all images in Azure Storage
+        
+        Returns:
+            Dictionary containing all prediction results
+        """
+        self._print_batch_header()
+        
+        # List available X-ray images
+        xray_images = self.list_xray_images()
+        
+        if not xray_images:
+            return self._no_images_result()
+        
+        self._announce_images(xray_images)
+        
+        # Download and classify in an overlapped pipeline, then report in listing order
+        return self._report_predictions(xray_images, self._run_blob_pipeline(xray_images))
+    
+    @async_prediction_retry
+    async def _apost_image(self, session, image_data) -> Dict[str, Any]:
+        """POST image bytes to Custom Vision on the async path and return the raw response"""
+        async with session.post(self._image_endpoint, headers=self._headers_image, data=image_data) as response:
+            response.raise_for_status()
+            return await response.json()
+    
+    async def _apredict_from_blob(self, container_client, session, slots: asyncio.Semaphore, blob_name: str) -> Dict[str, Any]:
+        """Download one blob and classify it on the async path"""
+        try:
+            async with slots:
+                downloader = await container_client.get_blob_client(blob_name).download_blob(max_concurrency=BLOB_DL_CONCURRENCY)
+                
+                # Validate file size before the body is read
+                file_size = downloader.size
+                max_size = 4 * 1024 * 1024  # 4MB limit
+                if file_size > max_size:
+                    raise ValueError(f"Image size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
+                
+                image_data = bytearray(file_size)
+                await downloader.readinto(memoryview(image_data))
+                
+                # Cache I/O and the perceptual hash (image decode) run off the event loop
+                key, image_hash, result = await asyncio.to_thread(self._lookup_prediction, image_data)
+                if result is None:
+                    result = await self._apost_image(session, image_data)
+                    await asyncio.to_thread(self._save_prediction, key, image_hash, result)
+            
+            return self._format_prediction_result(result, source=f"Azure Blob: {blob_name}")
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "error": f"Blob prediction failed: {str(e)}",
+                "source": f"Azure Blob: {blob_name}"
+            }
+    
+    async def apredict_all_images(self) -> Dict[str, Any]:
+        """
+        Async variant of predict_all_images for callers already running an event loop
+        
+        Lists and downloads with azure.storage.blob.aio and posts through one aiohttp
+        session, keeping up to XRAY_MAX_CONCURRENCY images in flight on a single thread.
+        Falls back to the thread-pool implementation when aiohttp is not installed.
+        
+        Returns:
+            Dictionary containing all prediction results
+        """
+        if not AIOHTTP_AVAILABLE:
+            return await asyncio.to_thread(self.predict_all_images)
+        
+        self._print_batch_header()
+        
+        account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
+        # The shared async credential outlives this call and is not closed here
+        credential = self.storage_account_key or get_credential(use_async=True)
+        async with AsyncBlobServiceClient(account_url=account_url, credential=credential, **BLOB_TRANSFER_OPTIONS) as blob_service_client:
+            container_client = blob_service_client.get_container_client(self.container_name)
+            
+            # List available X-ray images
+            try:
+                xray_images = [
+                    blob_name async for blob_name in container_client.list_blob_names(name_starts_with=self.xray_path)
+                    if XRAY_IMAGE_PATTERN.search(blob_name)
+                ]
+            except Exception as e:
+                logger.error("Error listing X-ray images: %s", e)
+                xray_images = []
+            
+            if not xray_images:
+                return self._no_images_result()
+            
+            self._announce_images(xray_images)
+            
+            connector = aiohttp.TCPConnector(limit=XRAY_MAX_CONCURRENCY, ttl_dns_cache=300)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                slots = asyncio.Semaphore(XRAY_MAX_CONCURRENCY)
+                predictions = await asyncio.gather(*(
+                    self._apredict_from_blob(container_client, session, slots, image_blob)
+                    for image_blob in xray_images
+                ))
+        
+        return self._report_predictions(xray_images, predictions)
 
     def print_grade_information(self):
         """Print information about the osteoarthritis grading system"""
@@ -5,17 +5,97 @@ Handles storing and retrieving claim logs and agent processing results
 
 import os
 import json
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict, Any, List, Optional
-from azure.cosmos import CosmosClient, PartitionKey, exceptions
-from azure.identity import DefaultAzureCredential, ChainedTokenCredential, AzureCliCredential, ManagedIdentityCredential
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+from typing import Dict, Any, AsyncIterator, List, Optional
+import asyncio
+import aiohttp
+from azure.core import MatchConditions
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.cosmos import PartitionKey, exceptions
+from azure.cosmos.aio import CosmosClient
 from dotenv import load_dotenv
 
+from core.azure_clients import get_credential
+from core.retry import azure_retry, azure_throttle_retry
+
 load_dotenv()
 
+# SDK-level retries: throttled (429) requests are retried up to COSMOS_RETRY_TOTAL times,
+# waiting at most COSMOS_RETRY_BACKOFF_MAX seconds in total, before an error is raised
+COSMOS_CLIENT_OPTIONS = {
+    "retry_total": int(os.getenv("COSMOS_RETRY_TOTAL", "19")),
+    "retry_backoff_max": int(os.getenv("COSMOS_RETRY_BACKOFF_MAX", "60")),
+    "connection_timeout": int(os.getenv("COSMOS_CONNECTION_TIMEOUT", "30"))
+}
+
+# Set COSMOS_ENSURE_CREATED=1 for the one deploy-time run that should create the database and
+# containers; ordinary worker boots skip those round trips and assume the resources exist
+COSMOS_ENSURE_CREATED = os.getenv("COSMOS_ENSURE_CREATED", "0") == "1"
+
+# Size of the single aiohttp connection pool shared by every Cosmos DB request
+COSMOS_MAX_CONNECTIONS = int(os.getenv("COSMOS_MAX_CONNECTIONS", "200"))
+
+# Point reads of a claim are served from memory for this many seconds (0 disables the cache)
+CLAIM_CACHE_TTL_SECONDS = float(os.getenv("COSMOS_CLAIM_CACHE_TTL", "5"))
+CLAIM_CACHE_MAXSIZE = 4096
+
+# Sessions whose agent progress is tracked in memory so updates can be sent as patches
+SESSION_STATE_MAXSIZE = 1024
+
+# Attempts for an ETag-conditional session replace before the conflict is raised
+SESSION_UPDATE_MAX_ATTEMPTS = 5
+
+# Operations the service accepts in one patch request; longer updates are split into
+# several patches sent together as one transactional batch
+PATCH_MAX_OPERATIONS = 10
+
+# Message-only session updates are buffered and written together in one patch once this
+# many are pending or the oldest has waited SESSION_FLUSH_INTERVAL_SECONDS. A patch holds
+# at most 10 operations and an agent/status change adds up to 5, hence at most 5 messages.
+# The interval is checked lazily when the session's next update arrives, not on a timer;
+# the session writer flushes whatever is left when its stream ends.
+SESSION_MESSAGE_BATCH_SIZE = max(1, min(5, int(os.getenv("COSMOS_SESSION_BATCH_SIZE", "5"))))
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.getenv("COSMOS_SESSION_FLUSH_INTERVAL", "0.25"))
+
+# Query texts are fixed and values are bound as @parameters, so every call sends
+# byte-identical SQL and the service can reuse its cached plan. Queries that pass a
+# partition_key go straight to that partition without a query-plan round trip.
+CLAIMS_QUERY = "SELECT * FROM c ORDER BY c.created_at DESC OFFSET 0 LIMIT @limit"
+AGENT_LOGS_QUERY = "SELECT * FROM c WHERE c.claim_id = @claim_id ORDER BY c.created_at DESC"
+LATEST_AGENT_LOG_QUERY = "SELECT TOP 1 * FROM c WHERE c.claim_id = @claim_id ORDER BY c.created_at DESC"
+ACTIVE_SESSIONS_QUERY = "SELECT c.session_id FROM c WHERE c.shard = @shard ORDER BY c.started_at DESC"
+ACTIVE_SESSIONS_FALLBACK_QUERY = "SELECT * FROM c WHERE c.status IN ('started', 'processing') ORDER BY c.started_at DESC"
+
+# Active sessions are listed from a small index container holding one row per running
+# session, all in a single logical partition, so listing them is a single-partition
+# query instead of a fan-out over every sessions partition. The container is provisioned
+# with the others (see README); while it is missing, sessions are listed with the
+# cross-partition ACTIVE_SESSIONS_FALLBACK_QUERY on the sessions container instead.
+ACTIVE_SESSIONS_SHARD = "ACTIVE"
+
+# Items fetched per query page; iter_* methods hand pages on as they arrive
+QUERY_PAGE_SIZE = int(os.getenv("COSMOS_QUERY_PAGE_SIZE", "100"))
+
+# Composite index for status-filtered, newest-first session queries;
+# applied when the sessions container is created by this service
+SESSIONS_INDEXING_POLICY = {
+    "indexingMode": "consistent",
+    "includedPaths": [{"path": "/*"}],
+    "excludedPaths": [{"path": "/messages/*"}, {"path": "/\"_etag\"/?"}],
+    "compositeIndexes": [[
+        {"path": "/status", "order": "ascending"},
+        {"path": "/started_at", "order": "descending"}
+    ]]
+}
+
 
 class CosmosDBService:
-    """Service for interacting with Azure Cosmos DB"""
+    """Service for interacting with Azure Cosmos DB (async; share one instance per event loop)"""
     
     def __init__(self):
         """Initialize Cosmos DB connection"""
@@ -25,97 +105,115 @@ class CosmosDBService:
         self.claims_container_name = os.getenv("COSMOS_CLAIMS_CONTAINER", "claims")
         self.logs_container_name = os.getenv("COSMOS_LOGS_CONTAINER", "agent_logs")
         self.sessions_container_name = os.getenv("COSMOS_SESSIONS_CONTAINER", "processing_sessions")
+        self.active_sessions_container_name = os.getenv("COSMOS_ACTIVE_SESSIONS_CONTAINER", "active_sessions_index")
         
         # AAD authentication flag
         self.use_aad_auth = os.getenv("COSMOS_USE_AAD", "true").lower() == "true"
         
         self.client = None
+        self.credential = None
         self.database = None
         self.claims_container = None
         self.logs_container = None
         self.sessions_container = None
+        self.active_sessions_container = None
+        # Cleared once the active-sessions index container turns out not to exist
+        self._active_index_available = True
+        
+        # claim_id -> (expires_at, claim); bounded LRU shared by the request handlers
+        self._claim_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._claim_cache_lock = threading.RLock()
+        
+        # session_id -> (current_agent, agents_completed, pending_messages, pending_since)
+        # as last written by this service
+        self._session_state: "OrderedDict[str, tuple]" = OrderedDict()
         
         if self.endpoint:
             self._initialize_client()
     
     def _get_credential(self):
-        """Get Azure credential for AAD authentication"""
-        # Use a chained credential that tries multiple authentication methods
-        # 1. Managed Identity (for Azure App Service)
-        # 2. Azure CLI (for local development)
-        # 3. Default credential chain
+        """
+        Get the Azure credential for AAD authentication
+        
+        Uses the process-wide credential from core.azure_clients as selected by
+        AZURE_CRED_KIND (service principal, workload identity, managed identity, Azure CLI
+        or DefaultAzureCredential), with tokens cached until near expiry.
+        """
+        return get_credential(use_async=True)
+    
+    def _create_transport(self) -> Optional[AioHttpTransport]:
+        """One pooled aiohttp session for all requests; None (SDK default) outside an event loop"""
         try:
-            credential = ChainedTokenCredential(
-                ManagedIdentityCredential(),
-                AzureCliCredential(),
-                DefaultAzureCredential()
-            )
-            return credential
-        except Exception as e:
-            print(f"⚠️ Failed to create credential chain: {e}")
-            return DefaultAzureCredential()
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=COSMOS_MAX_CONNECTIONS),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            auto_decompress=False,  # azure-core decompresses responses itself
+            trust_env=True
+        )
+        return AioHttpTransport(session=session)
     
     def _initialize_client(self):
-        """Initialize the Cosmos DB client and containers"""
+        """Initialize the Cosmos DB client and containers (no network I/O until the first request)"""
         try:
+            options = dict(COSMOS_CLIENT_OPTIONS, transport=self._create_transport())
             if self.use_aad_auth:
                 # Use AAD authentication
                 print("🔐 Using AAD authentication for Cosmos DB...")
-                credential = self._get_credential()
-                self.client = CosmosClient(self.endpoint, credential=credential)
+                self.credential = self._get_credential()
+                self.client = CosmosClient(self.endpoint, credential=self.credential, **options)
             elif self.key:
                 # Use key-based authentication
                 print("🔑 Using key-based authentication for Cosmos DB...")
-                self.client = CosmosClient(self.endpoint, self.key)
+                self.client = CosmosClient(self.endpoint, self.key, **options)
             else:
                 raise ValueError("No authentication method available. Set COSMOS_KEY or enable AAD auth.")
             
-            self.database = self._get_or_create_database()
-            self.claims_container = self._get_or_create_container(
-                self.claims_container_name, "/claim_id"
-            )
-            self.logs_container = self._get_or_create_container(
-                self.logs_container_name, "/claim_id"
-            )
-            self.sessions_container = self._get_or_create_container(
-                self.sessions_container_name, "/session_id"
-            )
+            # Handles are resolved locally without validating that the resources exist;
+            # creating them is a deploy-time step (see ensure_created / COSMOS_ENSURE_CREATED)
+            self.database = self.client.get_database_client(self.database_name)
+            self.claims_container = self.database.get_container_client(self.claims_container_name)
+            self.logs_container = self.database.get_container_client(self.logs_container_name)
+            self.sessions_container = self.database.get_container_client(self.sessions_container_name)
+            self.active_sessions_container = self.database.get_container_client(self.active_sessions_container_name)
             print("✅ Cosmos DB connection established")
         except Exception as e:
             print(f"❌ Cosmos DB connection failed: {e}")
             raise
     
-    def _get_or_create_database(self):
-        """Get the database (assumes it exists, falls back to creating)"""
-        try:
-            # Try to get existing database first (no write permission needed)
-            return self.client.get_database_client(self.database_name)
-        except Exception:
-            # Fall back to creating if it doesn't exist
-            try:
-                return self.client.create_database_if_not_exists(id=self.database_name)
-            except exceptions.CosmosResourceExistsError:
-                return self.client.get_database_client(self.database_name)
+    async def ensure_created(self):
+        """Create the database and containers if they do not exist yet (needs write permission)"""
+        self.database = await self.client.create_database_if_not_exists(id=self.database_name)
+        for attr, container_name, partition_key, indexing_policy in (
+            ("claims_container", self.claims_container_name, "/claim_id", None),
+            ("logs_container", self.logs_container_name, "/claim_id", None),
+            ("sessions_container", self.sessions_container_name, "/session_id", SESSIONS_INDEXING_POLICY),
+            ("active_sessions_container", self.active_sessions_container_name, "/shard", None),
+        ):
+            container = await self.database.create_container_if_not_exists(
+                id=container_name,
+                partition_key=PartitionKey(path=partition_key),
+                indexing_policy=indexing_policy,
+                offer_throughput=400
+            )
+            setattr(self, attr, container)
     
-    def _get_or_create_container(self, container_name: str, partition_key: str):
-        """Get the container (assumes it exists, falls back to creating)"""
-        try:
-            # Try to get existing container first (no write permission needed)
-            return self.database.get_container_client(container_name)
-        except Exception:
-            # Fall back to creating if it doesn't exist
-            try:
-                return self.database.create_container_if_not_exists(
-                    id=container_name,
-                    partition_key=PartitionKey(path=partition_key),
-                    offer_throughput=400
-                )
-            except exceptions.CosmosResourceExistsError:
-                return self.database.get_container_client(container_name)
+    async def warm_up(self):
+        """Fetch the AAD token for the account ahead of the first request"""
+        if self.credential is not None:
+            parsed = urlsplit(self.endpoint)
+            await self.credential.get_token(f"{parsed.scheme}://{parsed.hostname}/.default")
+    
+    async def close(self):
+        """Close the client's connection pool (the shared credential stays open)"""
+        if self.client is not None:
+            await self.client.close()
     
     # ==================== CLAIM OPERATIONS ====================
     
-    def save_claim(self, claim_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def save_claim(self, claim_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Save a claim to Cosmos DB
         
@@ -125,28 +223,75 @@ class CosmosDBService:
         Returns:
             The saved claim with Cosmos DB metadata
         """
-        claim_data["id"] = claim_data.get("claim_id", str(datetime.utcnow().timestamp()))
-        claim_data["created_at"] = claim_data.get("created_at", datetime.utcnow().isoformat())
-        claim_data["updated_at"] = datetime.utcnow().isoformat()
+        now = datetime.utcnow()
+        now_iso = now.isoformat()
+        claim_data["id"] = claim_data["claim_id"] if "claim_id" in claim_data else str(now.timestamp())
+        claim_data["created_at"] = claim_data.get("created_at", now_iso)
+        claim_data["updated_at"] = now_iso
         
-        return self.claims_container.upsert_item(claim_data)
+        saved_claim = await azure_retry(self.claims_container.upsert_item)(claim_data)
+        self._cache_claim(saved_claim["id"], saved_claim)
+        return saved_claim
+    
+    def _cache_claim(self, claim_id: str, claim: Dict[str, Any]) -> None:
+        if CLAIM_CACHE_TTL_SECONDS <= 0:
+            return
+        with self._claim_cache_lock:
+            self._claim_cache[claim_id] = (time.monotonic() + CLAIM_CACHE_TTL_SECONDS, claim)
+            self._claim_cache.move_to_end(claim_id)
+            if len(self._claim_cache) > CLAIM_CACHE_MAXSIZE:
+                self._claim_cache.popitem(last=False)
+    
+    def invalidate_claim(self, claim_id: str) -> None:
+        """Drop a claim from the point-read cache after it changes"""
+        with self._claim_cache_lock:
+            self._claim_cache.pop(claim_id, None)
     
-    def get_claim(self, claim_id: str) -> Optional[Dict[str, Any]]:
+    async def get_claim(self, claim_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a claim by ID
         
+        Repeated reads within COSMOS_CLAIM_CACHE_TTL seconds are served from memory.
+        
         Args:
             claim_id: The claim ID
             
         Returns:
             The claim data or None if not found
         """
+        with self._claim_cache_lock:
+            entry = self._claim_cache.get(claim_id)
+            if entry is not None:
+                expires_at, claim = entry
+                if expires_at > time.monotonic():
+                    self._claim_cache.move_to_end(claim_id)
+                    return dict(claim)  # Shallow copy so callers cannot mutate the cached claim
+                del self._claim_cache[claim_id]
+        
         try:
-            return self.claims_container.read_item(item=claim_id, partition_key=claim_id)
+            claim = await self.claims_container.read_item(item=claim_id, partition_key=claim_id)
         except exceptions.CosmosResourceNotFoundError:
             return None
+        self._cache_claim(claim_id, claim)
+        return dict(claim)
+    
+    def iter_all_claims(self, limit: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over claims, newest first, one query page at a time
+        
+        Args:
+            limit: Maximum number of claims to return
+            
+        Returns:
+            Async iterator of claims
+        """
+        return self.claims_container.query_items(
+            CLAIMS_QUERY,
+            parameters=[{"name": "@limit", "value": limit}],
+            max_item_count=QUERY_PAGE_SIZE
+        )
     
-    def get_all_claims(self, limit: int = 100) -> List[Dict[str, Any]]:
+    async def get_all_claims(self, limit: int = 100) -> List[Dict[str, Any]]:
         """
         Get all claims
         
@@ -156,10 +301,9 @@ class CosmosDBService:
         Returns:
             List of claims
         """
-        query = f"SELECT * FROM c ORDER BY c.created_at DESC OFFSET 0 LIMIT {limit}"
-        return list(self.claims_container.query_items(query, enable_cross_partition_query=True))
+        return [item async for item in self.iter_all_claims(limit)]
     
-    def delete_claim(self, claim_id: str) -> bool:
+    async def delete_claim(self, claim_id: str) -> bool:
         """
         Delete a claim
         
@@ -169,15 +313,16 @@ class CosmosDBService:
         Returns:
             True if deleted, False if not found
         """
+        self.invalidate_claim(claim_id)
         try:
-            self.claims_container.delete_item(item=claim_id, partition_key=claim_id)
+            await self.claims_container.delete_item(item=claim_id, partition_key=claim_id)
             return True
         except exceptions.CosmosResourceNotFoundError:
             return False
     
     # ==================== AGENT LOG OPERATIONS ====================
     
-    def save_agent_log(self, claim_id: str, log_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def save_agent_log(self, claim_id: str, log_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Save agent processing log
         
@@ -188,14 +333,15 @@ class CosmosDBService:
         Returns:
             The saved log with Cosmos DB metadata
         """
-        log_id = f"{claim_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        now = datetime.utcnow()
+        log_id = f"{claim_id}_{now.strftime('%Y%m%d_%H%M%S')}"
         log_data["id"] = log_id
         log_data["claim_id"] = claim_id
-        log_data["created_at"] = datetime.utcnow().isoformat()
+        log_data["created_at"] = now.isoformat()
         
-        return self.logs_container.upsert_item(log_data)
+        return await azure_retry(self.logs_container.upsert_item)(log_data)
     
-    def get_agent_log_by_id(self, log_id: str, claim_id: str) -> Optional[Dict[str, Any]]:
+    async def get_agent_log_by_id(self, log_id: str, claim_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a specific agent log by its ID
         
@@ -207,11 +353,28 @@ class CosmosDBService:
             The log data or None if not found
         """
         try:
-            return self.logs_container.read_item(item=log_id, partition_key=claim_id)
+            return await self.logs_container.read_item(item=log_id, partition_key=claim_id)
         except exceptions.CosmosResourceNotFoundError:
             return None
 
-    def get_agent_logs(self, claim_id: str) -> List[Dict[str, Any]]:
+    def iter_agent_logs(self, claim_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over a claim's agent logs, newest first, one query page at a time
+        
+        Args:
+            claim_id: The claim ID
+            
+        Returns:
+            Async iterator of agent logs
+        """
+        return self.logs_container.query_items(
+            AGENT_LOGS_QUERY,
+            parameters=[{"name": "@claim_id", "value": claim_id}],
+            partition_key=claim_id,  # claim_id is the logs partition key: single-partition query
+            max_item_count=QUERY_PAGE_SIZE
+        )
+    
+    async def get_agent_logs(self, claim_id: str) -> List[Dict[str, Any]]:
         """
         Get all agent logs for a claim
         
@@ -221,10 +384,9 @@ class CosmosDBService:
         Returns:
             List of agent logs
         """
-        query = f"SELECT * FROM c WHERE c.claim_id = '{claim_id}' ORDER BY c.created_at DESC"
-        return list(self.logs_container.query_items(query, enable_cross_partition_query=True))
+        return [item async for item in self.iter_agent_logs(claim_id)]
     
-    def get_latest_agent_log(self, claim_id: str) -> Optional[Dict[str, Any]]:
+    async def get_latest_agent_log(self, claim_id: str) -> Optional[Dict[str, Any]]:
         """
         Get the latest agent log for a claim
         
@@ -234,12 +396,19 @@ class CosmosDBService:
         Returns:
             The latest agent log or None
         """
-        logs = self.get_agent_logs(claim_id)
-        return logs[0] if logs else None
+        # Let Cosmos pick the newest log instead of materialising every log for the claim
+        logs = self.logs_container.query_items(
+            LATEST_AGENT_LOG_QUERY,
+            parameters=[{"name": "@claim_id", "value": claim_id}],
+            partition_key=claim_id
+        )
+        async for log in logs:
+            return log
+        return None
     
     # ==================== PROCESSING SESSION OPERATIONS ====================
     
-    def create_processing_session(self, claim_id: str) -> Dict[str, Any]:
+    async def create_processing_session(self, claim_id: str) -> Dict[str, Any]:
         """
         Create a new processing session for real-time updates
         
@@ -249,7 +418,9 @@ class CosmosDBService:
         Returns:
             The session data
         """
-        session_id = f"session_{claim_id}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}"
+        now = datetime.utcnow()
+        now_iso = now.isoformat()
+        session_id = f"session_{claim_id}_{now.strftime('%Y%m%d_%H%M%S')}"
         session_data = {
             "id": session_id,
             "session_id": session_id,
@@ -258,61 +429,327 @@ class CosmosDBService:
             "current_agent": None,
             "agents_completed": [],
             "messages": [],
-            "started_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat(),
+            "started_at": now_iso,
+            "updated_at": now_iso,
             "completed_at": None
         }
         
-        return self.sessions_container.upsert_item(session_data)
+        saved_session = await azure_retry(self.sessions_container.upsert_item)(session_data)
+        if self._active_index_available:
+            try:
+                await azure_retry(self.active_sessions_container.upsert_item)({
+                    "id": session_id,
+                    "shard": ACTIVE_SESSIONS_SHARD,
+                    "session_id": session_id,
+                    "claim_id": claim_id,
+                    "started_at": now_iso
+                })
+            except exceptions.CosmosResourceNotFoundError:
+                self._mark_active_index_missing()
+        self._track_session(session_id, None, [])
+        return saved_session
     
-    def update_processing_session(
+    def _mark_active_index_missing(self) -> None:
+        """Stop using the active-sessions index container after it was found missing"""
+        if self._active_index_available:
+            self._active_index_available = False
+            print(
+                f"⚠️ Cosmos container '{self.active_sessions_container_name}' not found; "
+                "listing active sessions from the sessions container instead"
+            )
+    
+    async def _remove_active_session(self, session_id: str) -> None:
+        """Drop a finished session from the active-sessions index"""
+        if not self._active_index_available:
+            return
+        try:
+            await azure_retry(self.active_sessions_container.delete_item)(
+                item=session_id, partition_key=ACTIVE_SESSIONS_SHARD
+            )
+        except exceptions.CosmosResourceNotFoundError:
+            # The row is already gone, or the index container itself does not exist
+            pass
+    
+    def _track_session(
+        self,
+        session_id: str,
+        current_agent: Optional[str],
+        agents_completed: List[str],
+        pending: List[Dict[str, Any]] = None,
+        pending_since: float = 0.0
+    ) -> None:
+        """
+        Record a session's last written agent state and its buffered messages
+        
+        Once more than SESSION_STATE_MAXSIZE sessions are tracked, the least recently
+        updated one without buffered messages is forgotten; sessions still holding
+        messages are never evicted, so no buffered /messages/- entry is dropped.
+        Buffered messages are written on the session's next update once
+        SESSION_FLUSH_INTERVAL_SECONDS has passed (checked then, not on a timer) or by
+        flush_processing_session.
+        """
+        self._session_state[session_id] = (current_agent, list(agents_completed), pending or [], pending_since)
+        self._session_state.move_to_end(session_id)
+        if len(self._session_state) > SESSION_STATE_MAXSIZE:
+            for tracked_id, (_, _, tracked_pending, _) in self._session_state.items():
+                if not tracked_pending:
+                    del self._session_state[tracked_id]
+                    break
+    
+    async def update_processing_session(
         self, 
         session_id: str, 
         current_agent: Optional[str] = None,
         message: Optional[Dict[str, Any]] = None,
-        status: Optional[str] = None
-    ) -> Dict[str, Any]:
+        status: Optional[str] = None,
+        completed_agent: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Update a processing session with real-time agent updates
         
+        Message-only updates are buffered and written with the next batch; agent and
+        status changes are written immediately together with any buffered messages.
+        
         Args:
             session_id: The session ID
-            current_agent: The currently active agent
+            current_agent: The most recently started agent
             message: A new message to append
             status: New status
+            completed_agent: An agent that finished, added to agents_completed
             
         Returns:
-            The updated session data
+            The updated session data, or None if the session was not found or the
+            message was buffered
         """
-        try:
-            session = self.sessions_container.read_item(item=session_id, partition_key=session_id)
-            
-            if current_agent:
-                if session["current_agent"] and session["current_agent"] not in session["agents_completed"]:
-                    session["agents_completed"].append(session["current_agent"])
-                session["current_agent"] = current_agent
-            
-            if message:
-                session["messages"].append({
-                    **message,
-                    "timestamp": datetime.utcnow().isoformat()
-                })
-            
-            if status:
-                session["status"] = status
-                if status == "completed":
-                    session["completed_at"] = datetime.utcnow().isoformat()
-            
-            session["updated_at"] = datetime.utcnow().isoformat()
+        return await self.apply_session_updates(session_id, [{
+            "current_agent": current_agent,
+            "message": message,
+            "status": status,
+            "completed_agent": completed_agent
+        }])
+    
+    async def apply_session_updates(
+        self, session_id: str, changes: List[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply several session updates in one round trip
+        
+        The updates are folded in order into patch operations; operations that do not
+        fit in one patch are sent as a single transactional batch on the session's
+        partition. Message-only updates are buffered as in update_processing_session.
+        
+        Args:
+            session_id: The session ID
+            changes: Updates in order, each with optional current_agent, message, status
+                and completed_agent
             
-            return self.sessions_container.upsert_item(session)
+        Returns:
+            The updated session data, or None if the session was not found or the
+            messages were buffered
+        """
+        state = self._session_state.get(session_id)
+        if state is None:
+            # Session not created by this process: fall back to read-modify-write,
+            # after which the session is tracked and the rest can be patched
+            first, rest = changes[0], changes[1:]
+            session = await self._replace_processing_session(
+                session_id,
+                first.get("current_agent"),
+                first.get("message"),
+                first.get("status"),
+                first.get("completed_agent")
+            )
+            if session is None or not rest:
+                return session
+            return await self.apply_session_updates(session_id, rest)
+        
+        now = datetime.utcnow().isoformat()
+        previous_agent, agents_completed, pending, pending_since = state
+        
+        operations = []
+        current_agent = status = None
+        has_message = False
+        for change in changes:
+            if change.get("message"):
+                has_message = True
+                pending = pending + [{**change["message"], "timestamp": now}]
+                pending_since = pending_since or time.monotonic()
+            if change.get("current_agent"):
+                previous_agent = current_agent = change["current_agent"]
+            # Agents may run concurrently, so completion is reported explicitly rather
+            # than inferred from the next agent starting
+            completed_agent = change.get("completed_agent")
+            if completed_agent and completed_agent not in agents_completed:
+                agents_completed = agents_completed + [completed_agent]
+                operations.append({"op": "add", "path": "/agents_completed/-", "value": completed_agent})
+            status = change.get("status") or status
+        
+        if (
+            has_message and not operations and not current_agent and not status
+            and len(pending) < SESSION_MESSAGE_BATCH_SIZE
+            and time.monotonic() - pending_since < SESSION_FLUSH_INTERVAL_SECONDS
+        ):
+            self._track_session(session_id, previous_agent, agents_completed, pending, pending_since)
+            return None
+        
+        # The buffered messages and the new agent state are taken over before the patch is
+        # awaited, so a concurrent flush neither re-sends these messages nor loses the ones
+        # buffered while this patch is in flight
+        self._track_session(session_id, previous_agent, agents_completed)
+        
+        # Atomic patches instead of a read plus a full-document upsert
+        if current_agent:
+            operations.append({"op": "set", "path": "/current_agent", "value": current_agent})
+        
+        operations.extend({"op": "add", "path": "/messages/-", "value": entry} for entry in pending)
+        
+        if status:
+            operations.append({"op": "set", "path": "/status", "value": status})
+            if status == "completed":
+                operations.append({"op": "set", "path": "/completed_at", "value": now})
+        
+        operations.append({"op": "set", "path": "/updated_at", "value": now})
+        
+        try:
+            session = await self._patch_session(session_id, operations)
         except exceptions.CosmosResourceNotFoundError:
+            self._session_state.pop(session_id, None)
             return None
+        except Exception:
+            added = [agent for agent in agents_completed if agent not in state[1]]
+            self._restore_pending(session_id, added, pending, pending_since)
+            raise
+        
+        if status in ("completed", "failed"):
+            self._session_state.pop(session_id, None)
+            await self._remove_active_session(session_id)
+        return session
     
-    def get_processing_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+    def _restore_pending(
+        self,
+        session_id: str,
+        added_agents: List[str],
+        pending: List[Dict[str, Any]],
+        pending_since: float
+    ) -> None:
+        """Hand the messages and completed agents of a failed patch back for the next write"""
+        state = self._session_state.get(session_id)
+        if state is None:
+            return
+        current_agent, agents_completed, newer, newer_since = state
+        self._track_session(
+            session_id,
+            current_agent,
+            [agent for agent in agents_completed if agent not in added_agents],
+            pending + newer,
+            min(pending_since or newer_since, newer_since or pending_since)
+        )
+    
+    async def _patch_session(self, session_id: str, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Send patch operations as one patch, or as one transactional batch of patches"""
+        # Patch appends are not idempotent, so only throttled requests are retried
+        if len(operations) <= PATCH_MAX_OPERATIONS:
+            return await azure_throttle_retry(self.sessions_container.patch_item)(
+                item=session_id,
+                partition_key=session_id,
+                patch_operations=operations
+            )
+        
+        batch = [
+            ("patch", (session_id, operations[start:start + PATCH_MAX_OPERATIONS]))
+            for start in range(0, len(operations), PATCH_MAX_OPERATIONS)
+        ]
+        try:
+            results = await azure_throttle_retry(self.sessions_container.execute_item_batch)(
+                batch_operations=batch,
+                partition_key=session_id
+            )
+        except exceptions.CosmosBatchOperationError as e:
+            if e.status_code == 404:
+                raise exceptions.CosmosResourceNotFoundError(message=str(e)) from e
+            raise
+        return results[-1]["resourceBody"]
+    
+    async def flush_processing_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Write any buffered messages for a session
+        
+        Args:
+            session_id: The session ID
+            
+        Returns:
+            The updated session data, or None if nothing was buffered
+        """
+        state = self._session_state.get(session_id)
+        if state is None or not state[2]:
+            return None
+        return await self.update_processing_session(session_id)
+    
+    async def _replace_processing_session(
+        self,
+        session_id: str,
+        current_agent: Optional[str],
+        message: Optional[Dict[str, Any]],
+        status: Optional[str],
+        completed_agent: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Read-modify-write update for sessions without tracked state
+        
+        The write is conditional on the ETag that was read, so a concurrent update is
+        never overwritten; on a conflict the session is re-read and the change replayed.
+        """
+        now = datetime.utcnow().isoformat()
+        for attempt in range(SESSION_UPDATE_MAX_ATTEMPTS):
+            try:
+                session = await self.sessions_container.read_item(item=session_id, partition_key=session_id)
+                
+                if current_agent:
+                    session["current_agent"] = current_agent
+                
+                if completed_agent and completed_agent not in session["agents_completed"]:
+                    session["agents_completed"].append(completed_agent)
+                
+                if message:
+                    session["messages"].append({
+                        **message,
+                        "timestamp": now
+                    })
+                
+                if status:
+                    session["status"] = status
+                    if status == "completed":
+                        session["completed_at"] = now
+                
+                session["updated_at"] = now
+                
+                saved_session = await azure_retry(self.sessions_container.replace_item)(
+                    item=session_id,
+                    body=session,
+                    etag=session["_etag"],
+                    match_condition=MatchConditions.IfNotModified
+                )
+                break
+            except exceptions.CosmosResourceNotFoundError:
+                return None
+            except exceptions.CosmosAccessConditionFailedError:
+                if attempt == SESSION_UPDATE_MAX_ATTEMPTS - 1:
+                    raise
+                print(f"🔁 Session {session_id} changed concurrently, replaying update...")
+        
+        if status in ("completed", "failed"):
+            await self._remove_active_session(session_id)
+        else:
+            self._track_session(session_id, session["current_agent"], session["agents_completed"])
+        return saved_session
+    
+    async def get_processing_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
         Get a processing session
         
+        Read-only: messages still buffered by a writer are not flushed here and show up
+        with that writer's next patch.
+        
         Args:
             session_id: The session ID
             
@@ -320,28 +757,60 @@ class CosmosDBService:
             The session data or None
         """
         try:
-            return self.sessions_container.read_item(item=session_id, partition_key=session_id)
+            return await self.sessions_container.read_item(item=session_id, partition_key=session_id)
         except exceptions.CosmosResourceNotFoundError:
             return None
     
-    def get_active_sessions(self) -> List[Dict[str, Any]]:
+    async def iter_active_sessions(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Iterate over active processing sessions, newest first, one index page at a time
+        
+        Each page of the active-sessions index is resolved with concurrent point reads;
+        index rows whose session no longer exists are skipped. Without the index
+        container the sessions container is queried across partitions instead.
+        """
+        if self._active_index_available:
+            index_rows = self.active_sessions_container.query_items(
+                ACTIVE_SESSIONS_QUERY,
+                parameters=[{"name": "@shard", "value": ACTIVE_SESSIONS_SHARD}],
+                partition_key=ACTIVE_SESSIONS_SHARD,
+                max_item_count=QUERY_PAGE_SIZE
+            )
+            try:
+                async for page in index_rows.by_page():
+                    session_ids = [row["session_id"] async for row in page]
+                    sessions = await asyncio.gather(*(self.get_processing_session(sid) for sid in session_ids))
+                    for session in sessions:
+                        if session is not None:
+                            yield session
+                return
+            except exceptions.CosmosResourceNotFoundError:
+                self._mark_active_index_missing()
+        
+        async for session in self.sessions_container.query_items(
+            ACTIVE_SESSIONS_FALLBACK_QUERY, max_item_count=QUERY_PAGE_SIZE
+        ):
+            yield session
+    
+    async def get_active_sessions(self) -> List[Dict[str, Any]]:
         """
         Get all active processing sessions
         
         Returns:
             List of active sessions
         """
-        query = "SELECT * FROM c WHERE c.status IN ('started', 'processing') ORDER BY c.started_at DESC"
-        return list(self.sessions_container.query_items(query, enable_cross_partition_query=True))
+        return [item async for item in self.iter_active_sessions()]
 
 
-# Singleton instance
-_cosmos_service: Optional[CosmosDBService] = None
+# One service per event loop: its aiohttp connection pool is bound to the loop that
+# created it, and entries go away with their loop (e.g. between test runs)
+_services: "WeakKeyDictionary[asyncio.AbstractEventLoop, CosmosDBService]" = WeakKeyDictionary()
 
 
 def get_cosmos_service() -> CosmosDBService:
-    """Get or create the Cosmos DB service singleton"""
-    global _cosmos_service
-    if _cosmos_service is None:
-        _cosmos_service = CosmosDBService()
-    return _cosmos_service
+    """Get or create the Cosmos DB service for the running event loop"""
+    loop = asyncio.get_running_loop()
+    service = _services.get(loop)
+    if service is None:
+        service = _services[loop] = CosmosDBService()
+    return service
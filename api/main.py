@@ -4,28 +4,71 @@ FastAPI application providing REST and WebSocket endpoints for claim processing
 """
 
 import os
-import json
 import asyncio
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Set
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Query, BackgroundTasks
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Query, BackgroundTasks, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, Response
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse, Response, JSONResponse
+from pydantic import BaseModel, ConfigDict, Field, SkipValidation, model_validator
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from api.cosmos_service import get_cosmos_service, CosmosDBService
-from api.realtime_processor import get_realtime_processor, RealtimeAgentProcessor, AgentUpdate
+from api.cosmos_service import get_cosmos_service, CosmosDBService, COSMOS_ENSURE_CREATED
+from api.realtime_processor import get_realtime_processor, RealtimeAgentProcessor, AgentUpdate, dumps_json
+
+
+# ==================== JSON SERIALISATION ====================
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps_json; the app's default response class"""
+    
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+async def stream_json_rows(
+    head: bytes,
+    rows: AsyncIterator[Dict[str, Any]],
+    tail: Callable[[int], bytes]
+) -> StreamingResponse:
+    """
+    Stream a JSON document whose rows array is written as query pages arrive.
+    
+    The first row is fetched before the response starts, so query errors still
+    surface as HTTP errors rather than a truncated body.
+    
+    Args:
+        head: Document bytes up to and including the array's opening bracket
+        rows: Async iterator of rows to write into the array
+        tail: Builds the bytes after the array from the number of rows written
+    """
+    rows = rows.__aiter__()
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        return Response(content=head + tail(0), media_type="application/json")
+    
+    async def body():
+        yield head + dumps_json(first)
+        count = 1
+        async for row in rows:
+            yield b"," + dumps_json(row)
+            count += 1
+        yield tail(count)
+    
+    return StreamingResponse(body(), media_type="application/json")
 
 
 # ==================== PYDANTIC MODELS ====================
 
 class ClaimInput(BaseModel):
     """Input model for claim data"""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     claim_id: str
     patient_name: str
     policy_number: str
@@ -40,17 +83,37 @@ class ClaimInput(BaseModel):
     available_balance: Optional[float] = None
     policy_year: Optional[str] = "2024-2025"
     age: Optional[int] = None
-
+    
+    @model_validator(mode="before")
+    @classmethod
+    def _fill_available_balance(cls, data: Any) -> Any:
+        """Derive available_balance from the coverage limit and prior claims when not given"""
+        if isinstance(data, dict) and data.get("available_balance") is None:
+            limit = data.get("policy_coverage_limit", 500000)
+            claimed = data.get("previously_claimed_amount", 0)
+            try:
+                data = {**data, "available_balance": float(limit) - float(claimed)}
+            except (TypeError, ValueError):
+                pass  # Invalid amounts are reported by field validation
+        return data
+
+
+# Response models are built by the handlers from data already read from Cosmos DB, so the
+# free-form payloads skip re-validation; only the scalar fields are checked
 
 class ClaimResponse(BaseModel):
     """Response model for claim operations"""
+    model_config = ConfigDict(frozen=True)
+    
     success: bool
     message: str
-    data: Optional[Dict[str, Any]] = None
+    data: SkipValidation[Optional[Dict[str, Any]]] = None
 
 
 class ProcessingSessionResponse(BaseModel):
     """Response model for processing session"""
+    model_config = ConfigDict(frozen=True, extra="ignore")
+    
     session_id: str
     claim_id: str
     status: str
@@ -62,37 +125,67 @@ class ProcessingSessionResponse(BaseModel):
 
 class AgentLogResponse(BaseModel):
     """Response model for agent logs"""
+    model_config = ConfigDict(frozen=True)
+    
     claim_id: str
-    logs: List[Dict[str, Any]]
+    logs: SkipValidation[List[Dict[str, Any]]]
+
+
+# ==================== DEPENDENCIES ====================
+
+async def cosmos_service_dependency() -> CosmosDBService:
+    """
+    Resolve the running event loop's Cosmos DB service for a request
+    
+    Declared async so FastAPI resolves it on the event loop rather than in its
+    threadpool; override it via app.dependency_overrides in tests.
+    """
+    return get_cosmos_service()
+
+
+CosmosService = Depends(cosmos_service_dependency)
 
 
 # ==================== CONNECTION MANAGER ====================
 
+async def send_json_text(websocket: WebSocket, message: Dict[str, Any]):
+    """Send a message as a JSON text frame, encoded with orjson when available"""
+    await websocket.send_text(dumps_json(message).decode("utf-8"))
+
+
 class ConnectionManager:
     """Manages WebSocket connections for real-time updates"""
     
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        # Sets give O(1) connect/disconnect; broadcast order does not matter
+        self.active_connections: Dict[str, Set[WebSocket]] = {}
     
     async def connect(self, websocket: WebSocket, session_id: str):
         await websocket.accept()
-        if session_id not in self.active_connections:
-            self.active_connections[session_id] = []
-        self.active_connections[session_id].append(websocket)
+        self.active_connections.setdefault(session_id, set()).add(websocket)
     
     def disconnect(self, websocket: WebSocket, session_id: str):
-        if session_id in self.active_connections:
-            self.active_connections[session_id].remove(websocket)
-            if not self.active_connections[session_id]:
+        connections = self.active_connections.get(session_id)
+        if connections is not None:
+            connections.discard(websocket)
+            if not connections:
                 del self.active_connections[session_id]
     
     async def broadcast(self, session_id: str, message: Dict[str, Any]):
-        if session_id in self.active_connections:
-            for connection in self.active_connections[session_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception:
-                    pass
+        # Snapshot the subscribers: connect/disconnect may change the set while sends are awaited
+        connections = list(self.active_connections.get(session_id, ()))
+        if not connections:
+            return
+        # Serialise once and send to every subscriber concurrently so one slow socket
+        # does not hold up the rest; subscribers whose send fails are dropped
+        payload = dumps_json(message).decode("utf-8")
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                self.disconnect(connection, session_id)
 
 
 manager = ConnectionManager()
@@ -107,6 +200,10 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting Health Insurance Claims API...")
     try:
         cosmos_service = get_cosmos_service()
+        if COSMOS_ENSURE_CREATED:
+            await cosmos_service.ensure_created()
+            print("✅ Cosmos DB database and containers ensured")
+        await cosmos_service.warm_up()
         print("✅ Cosmos DB connection established")
     except Exception as e:
         print(f"⚠️ Cosmos DB connection failed: {e}")
@@ -115,6 +212,10 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     print("👋 Shutting down Health Insurance Claims API...")
+    try:
+        await get_cosmos_service().close()
+    except Exception as e:
+        print(f"⚠️ Cosmos DB client close failed: {e}")
 
 
 # ==================== FASTAPI APP ====================
@@ -123,7 +224,8 @@ app = FastAPI(
     title="Health Insurance Claims Processing API",
     description="Real-time multi-agent fraud detection and claims processing API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware
@@ -182,20 +284,11 @@ async def api_status():
 # ==================== CLAIM ENDPOINTS ====================
 
 @app.post("/api/claims", response_model=ClaimResponse)
-async def create_claim(claim: ClaimInput):
+async def create_claim(claim: ClaimInput, cosmos_service: CosmosDBService = CosmosService):
     """Create or update a claim"""
     try:
-        cosmos_service = get_cosmos_service()
-        claim_data = claim.model_dump()
-        
-        # Calculate available balance if not provided
-        if claim_data.get("available_balance") is None:
-            claim_data["available_balance"] = (
-                claim_data.get("policy_coverage_limit", 500000) - 
-                claim_data.get("previously_claimed_amount", 0)
-            )
-        
-        saved_claim = cosmos_service.save_claim(claim_data)
+        claim_data = claim.model_dump()  # available_balance is filled in by ClaimInput
+        saved_claim = await cosmos_service.save_claim(claim_data)
         return ClaimResponse(
             success=True,
             message=f"Claim {claim.claim_id} saved successfully",
@@ -206,26 +299,24 @@ async def create_claim(claim: ClaimInput):
 
 
 @app.get("/api/claims", response_model=ClaimResponse)
-async def get_claims(limit: int = Query(default=100, le=1000)):
+async def get_claims(limit: int = Query(default=100, le=1000), cosmos_service: CosmosDBService = CosmosService):
     """Get all claims"""
     try:
-        cosmos_service = get_cosmos_service()
-        claims = cosmos_service.get_all_claims(limit=limit)
-        return ClaimResponse(
-            success=True,
-            message=f"Retrieved {len(claims)} claims",
-            data={"claims": claims, "total": len(claims)}
+        # Same shape as ClaimResponse, streamed page by page
+        return await stream_json_rows(
+            b'{"success":true,"data":{"claims":[',
+            cosmos_service.iter_all_claims(limit=limit),
+            lambda total: b'],"total":%d},"message":"Retrieved %d claims"}' % (total, total)
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/claims/{claim_id}", response_model=ClaimResponse)
-async def get_claim(claim_id: str):
+async def get_claim(claim_id: str, cosmos_service: CosmosDBService = CosmosService):
     """Get a specific claim by ID"""
     try:
-        cosmos_service = get_cosmos_service()
-        claim = cosmos_service.get_claim(claim_id)
+        claim = await cosmos_service.get_claim(claim_id)
         if claim is None:
             raise HTTPException(status_code=404, detail=f"Claim {claim_id} not found")
         return ClaimResponse(
@@ -240,11 +331,10 @@ async def get_claim(claim_id: str):
 
 
 @app.delete("/api/claims/{claim_id}", response_model=ClaimResponse)
-async def delete_claim(claim_id: str):
+async def delete_claim(claim_id: str, cosmos_service: CosmosDBService = CosmosService):
     """Delete a claim"""
     try:
-        cosmos_service = get_cosmos_service()
-        deleted = cosmos_service.delete_claim(claim_id)
+        deleted = await cosmos_service.delete_claim(claim_id)
         if not deleted:
             raise HTTPException(status_code=404, detail=f"Claim {claim_id} not found")
         return ClaimResponse(
@@ -260,27 +350,23 @@ async def delete_claim(claim_id: str):
 # ==================== AGENT LOGS ENDPOINTS ====================
 
 @app.get("/api/claims/{claim_id}/logs")
-async def get_claim_logs(claim_id: str):
+async def get_claim_logs(claim_id: str, cosmos_service: CosmosDBService = CosmosService):
     """Get all agent processing logs for a claim"""
     try:
-        cosmos_service = get_cosmos_service()
-        logs = cosmos_service.get_agent_logs(claim_id)
-        return {
-            "success": True,
-            "claim_id": claim_id,
-            "logs": logs,
-            "total": len(logs)
-        }
+        return await stream_json_rows(
+            dumps_json({"success": True, "claim_id": claim_id})[:-1] + b',"logs":[',
+            cosmos_service.iter_agent_logs(claim_id),
+            lambda total: b'],"total":%d}' % total
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/claims/{claim_id}/logs/latest")
-async def get_latest_claim_log(claim_id: str):
+async def get_latest_claim_log(claim_id: str, cosmos_service: CosmosDBService = CosmosService):
     """Get the latest agent processing log for a claim"""
     try:
-        cosmos_service = get_cosmos_service()
-        log = cosmos_service.get_latest_agent_log(claim_id)
+        log = await cosmos_service.get_latest_agent_log(claim_id)
         if log is None:
             raise HTTPException(status_code=404, detail=f"No logs found for claim {claim_id}")
         return {
@@ -295,11 +381,10 @@ async def get_latest_claim_log(claim_id: str):
 
 
 @app.get("/api/claims/{claim_id}/logs/by-id/{log_id}")
-async def get_claim_log_by_id(claim_id: str, log_id: str):
+async def get_claim_log_by_id(claim_id: str, log_id: str, cosmos_service: CosmosDBService = CosmosService):
     """Get a specific agent processing log by its document ID"""
     try:
-        cosmos_service = get_cosmos_service()
-        log = cosmos_service.get_agent_log_by_id(log_id, claim_id)
+        log = await cosmos_service.get_agent_log_by_id(log_id, claim_id)
         if log is None:
             raise HTTPException(status_code=404, detail=f"Log {log_id} not found for claim {claim_id}")
         return {
@@ -332,11 +417,12 @@ async def _run_agents_in_background(claim_data: Dict[str, Any]):
 
 
 @app.post("/api/process/{claim_id}")
-async def start_processing(claim_id: str, background_tasks: BackgroundTasks):
+async def start_processing(
+    claim_id: str, background_tasks: BackgroundTasks, cosmos_service: CosmosDBService = CosmosService
+):
     """Start real-time processing for a claim"""
     try:
-        cosmos_service = get_cosmos_service()
-        claim = cosmos_service.get_claim(claim_id)
+        claim = await cosmos_service.get_claim(claim_id)
         
         # If claim doesn't exist in Cosmos DB, create a placeholder
         # This supports fire-and-forget from frontend using static JSON
@@ -351,10 +437,10 @@ async def start_processing(claim_id: str, background_tasks: BackgroundTasks):
                 "diagnosis": "Demo Diagnosis",
                 "source": "frontend_trigger"
             }
-            cosmos_service.save_claim(claim)
+            await cosmos_service.save_claim(claim)
         
         # Create processing session
-        session = cosmos_service.create_processing_session(claim_id)
+        session = await cosmos_service.create_processing_session(claim_id)
         
         print(f"🚀 Processing started for claim: {claim_id}, session: {session['session_id']}")
         
@@ -375,14 +461,13 @@ async def start_processing(claim_id: str, background_tasks: BackgroundTasks):
 
 
 @app.get("/api/process/{claim_id}/stream")
-async def stream_processing(claim_id: str):
+async def stream_processing(claim_id: str, cosmos_service: CosmosDBService = CosmosService):
     """
     Server-Sent Events (SSE) endpoint for real-time processing updates
     Alternative to WebSocket for clients that don't support WebSocket
     """
     try:
-        cosmos_service = get_cosmos_service()
-        claim = cosmos_service.get_claim(claim_id)
+        claim = await cosmos_service.get_claim(claim_id)
         
         if claim is None:
             raise HTTPException(status_code=404, detail=f"Claim {claim_id} not found")
@@ -390,10 +475,10 @@ async def stream_processing(claim_id: str):
         processor = get_realtime_processor()
         
         async def event_generator():
-            """Generate SSE events"""
+            """Generate SSE events as bytes, serialising each update once"""
             async for update in processor.process_claim_realtime(claim, {}):
-                yield f"data: {update.to_json()}\n\n"
-            yield "data: {\"status\": \"complete\"}\n\n"
+                yield b"data: " + dumps_json(update.to_dict()) + b"\n\n"
+            yield b"data: {\"status\": \"complete\"}\n\n"
         
         return StreamingResponse(
             event_generator(),
@@ -410,17 +495,29 @@ async def stream_processing(claim_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/sessions/active")
+async def get_active_sessions(cosmos_service: CosmosDBService = CosmosService):
+    """Get all active processing sessions"""
+    try:
+        return await stream_json_rows(
+            b'{"success":true,"sessions":[',
+            cosmos_service.iter_active_sessions(),
+            lambda total: b'],"total":%d}' % total
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @app.get("/api/sessions/{session_id}")
-async def get_session(session_id: str):
+async def get_session(session_id: str, cosmos_service: CosmosDBService = CosmosService):
     """Get the status of a processing session"""
     try:
         processor = get_realtime_processor()
-        session = processor.get_session_status(session_id)
+        session = await processor.get_session_status(session_id)
         
         if session is None:
             # Try Cosmos DB
-            cosmos_service = get_cosmos_service()
-            session = cosmos_service.get_processing_session(session_id)
+            session = await cosmos_service.get_processing_session(session_id)
         
         if session is None:
             raise HTTPException(status_code=404, detail=f"Session {session_id} not found")
@@ -435,25 +532,12 @@ async def get_session(session_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.get("/api/sessions/active")
-async def get_active_sessions():
-    """Get all active processing sessions"""
-    try:
-        cosmos_service = get_cosmos_service()
-        sessions = cosmos_service.get_active_sessions()
-        return {
-            "success": True,
-            "sessions": sessions,
-            "total": len(sessions)
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 # ==================== WEBSOCKET ENDPOINT ====================
 
 @app.websocket("/ws/process/{session_id}")
-async def websocket_processing(websocket: WebSocket, session_id: str):
+async def websocket_processing(
+    websocket: WebSocket, session_id: str, cosmos_service: CosmosDBService = CosmosService
+):
     """
     WebSocket endpoint for real-time processing updates
     Connect to receive live updates during claim processing
@@ -461,21 +545,20 @@ async def websocket_processing(websocket: WebSocket, session_id: str):
     await manager.connect(websocket, session_id)
     
     try:
-        cosmos_service = get_cosmos_service()
-        session = cosmos_service.get_processing_session(session_id)
+        session = await cosmos_service.get_processing_session(session_id)
         
         if session is None:
-            await websocket.send_json({
+            await send_json_text(websocket, {
                 "error": "Session not found",
                 "session_id": session_id
             })
             return
         
         claim_id = session["claim_id"]
-        claim = cosmos_service.get_claim(claim_id)
+        claim = await cosmos_service.get_claim(claim_id)
         
         if claim is None:
-            await websocket.send_json({
+            await send_json_text(websocket, {
                 "error": "Claim not found",
                 "claim_id": claim_id
             })
@@ -485,7 +568,7 @@ async def websocket_processing(websocket: WebSocket, session_id: str):
         processor = get_realtime_processor()
         
         # Send initial status
-        await websocket.send_json({
+        await send_json_text(websocket, {
             "type": "session_started",
             "session_id": session_id,
             "claim_id": claim_id
@@ -493,13 +576,13 @@ async def websocket_processing(websocket: WebSocket, session_id: str):
         
         # Process and stream updates
         async for update in processor.process_claim_realtime(claim, {}):
-            await websocket.send_json({
+            await send_json_text(websocket, {
                 "type": "agent_update",
                 **update.to_dict()
             })
         
         # Send completion
-        await websocket.send_json({
+        await send_json_text(websocket, {
             "type": "processing_complete",
             "session_id": session_id
         })
@@ -507,7 +590,7 @@ async def websocket_processing(websocket: WebSocket, session_id: str):
     except WebSocketDisconnect:
         manager.disconnect(websocket, session_id)
     except Exception as e:
-        await websocket.send_json({
+        await send_json_text(websocket, {
             "type": "error",
             "message": str(e)
         })
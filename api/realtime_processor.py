@@ -3,17 +3,76 @@ Real-time Agent Processor
 Handles real-time processing of claims with live updates via WebSocket/SSE
 """
 
+import os
+import time
 import asyncio
+import inspect
+import logging
+import functools
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional, AsyncGenerator, Callable
-from dataclasses import dataclass, field, asdict
+from typing import Deque, Dict, Any, Optional, AsyncGenerator, AsyncIterator, Awaitable, Callable, Sequence, Set
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass, field
 from enum import Enum
+from weakref import WeakKeyDictionary
+
+# orjson is optional: a Rust extension several times faster than stdlib json on the
+# streaming endpoints and for every JSON response
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from api.cosmos_service import get_cosmos_service, CosmosDBService
 
+# Logged lazily (%-style) so nothing is formatted unless a handler will emit it, and
+# without taking the stdout lock on every report
+logger = logging.getLogger(__name__)
+
+# Session updates waiting for the background writer; emitting blocks only when this is full
+SESSION_WRITE_QUEUE_SIZE = 1000
+
+# The writer waits this long after the first queued update so updates emitted together
+# (an agent finishing and the next one starting) are written in one round trip
+SESSION_WRITE_LINGER_SECONDS = float(os.getenv("SESSION_WRITE_LINGER_SECONDS", "0.05"))
+
+# Most queued updates folded into one Cosmos DB write
+SESSION_WRITE_BATCH_MAX = 20
+
+# Claims processed at once per worker; more wait for a slot
+MAX_CONCURRENT_CLAIMS = int(os.getenv("MAX_CLAIMS", "32"))
+
+# Most agent updates kept per session for its final log
+SESSION_UPDATES_MAXLEN = 1024
+
+# Simulated generation time of each placeholder agent analysis
+AGENT_DEMO_DELAY_SECONDS = 0.5
+
+
+def dumps_json(data: Any) -> bytes:
+    """Serialise to UTF-8 JSON bytes, with orjson when available"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# Last formatted timestamp and the millisecond it belongs to
+_last_iso = (0, "")
+
+
+def _now_iso() -> str:
+    """Current UTC time in ISO format, formatted at most once per millisecond"""
+    global _last_iso
+    millis = time.time_ns() // 1_000_000
+    if millis != _last_iso[0]:
+        _last_iso = (millis, datetime.utcnow().isoformat())
+    return _last_iso[1]
+
 
-class AgentStatus(Enum):
+class AgentStatus(str, Enum):
     PENDING = "pending"
     PROCESSING = "processing"
     COMPLETED = "completed"
@@ -27,16 +86,22 @@ class AgentUpdate:
     status: AgentStatus
     message: str
     content: Optional[str] = None
-    timestamp: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    timestamp: str = field(default_factory=_now_iso)
     metadata: Dict[str, Any] = field(default_factory=dict)
     
     def to_dict(self) -> Dict[str, Any]:
-        data = asdict(self)
-        data["status"] = self.status.value
-        return data
+        # Built by hand: asdict() deep-copies every field
+        return {
+            "agent_name": self.agent_name,
+            "status": self.status,
+            "message": self.message,
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "metadata": self.metadata
+        }
     
     def to_json(self) -> str:
-        return json.dumps(self.to_dict())
+        return dumps_json(self.to_dict()).decode("utf-8")
 
 
 @dataclass
@@ -47,71 +112,293 @@ class ProcessingSession:
     status: str = "started"
     current_agent: Optional[str] = None
     agents_completed: list = field(default_factory=list)
-    updates: list = field(default_factory=list)
+    # Completed agent updates for the final log; bounded so a stuck session cannot grow without limit
+    updates: Deque[AgentUpdate] = field(default_factory=lambda: deque(maxlen=SESSION_UPDATES_MAXLEN))
     started_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
     completed_at: Optional[str] = None
 
 
+@functools.cache
+def _agent_factory_cls() -> type:
+    """Import AgentFactory on first use; a top-level import would be circular"""
+    from services.agent_factory import AgentFactory
+    return AgentFactory
+
+
+# Placeholder agent analyses, formatted with the claim's fields via _TemplateFields
+_AGENT_TEMPLATES: Dict[str, str] = {
+    "Fraud_Detection_Specialist": """
+### FRAUD DETECTION ANALYSIS
+
+**Claim ID:** {claim_id}
+**Patient:** {patient_name}
+
+**Identity Verification:** ✅ Verified
+**Document Authenticity:** ✅ Verified
+**Claim Pattern Analysis:** Normal patterns detected
+
+**FRAUD_RISK:** LOW
+**Recommendation:** Proceed with medical validation
+    """,
+
+    "Medical_Validator": """
+### MEDICAL VALIDATION REPORT
+
+**Diagnosis:** {diagnosis}
+**Treatment:** {treatment_type}
+
+**Medical Consistency:** ✅ Consistent
+**Treatment Appropriateness:** ✅ Appropriate for diagnosis
+**Documentation Quality:** Complete
+
+**Recommendation:** Medical records support the claim
+    """,
+
+    "Billing_Fraud_Validator": """
+### BILLING VALIDATION REPORT
+
+**Claimed Amount:** ₹{claim_amount:,.2f}
+**Hospital:** {hospital_name}
+
+**Rate Analysis:** Within normal range
+**Itemization Check:** ✅ Properly itemized
+**Duplicate Check:** No duplicates found
+
+**Recommendation:** Billing is reasonable and documented
+    """,
+
+    "Policy_Balance_Validator": """
+### POLICY BALANCE VALIDATION
+
+**Policy Number:** {policy_number}
+**Coverage Limit:** ₹{policy_coverage_limit:,.2f}
+**Previously Claimed:** ₹{previously_claimed_amount:,.2f}
+**Available Balance:** ₹{available_balance:,.2f}
+
+**Balance Status:** Sufficient
+**Coverage Check:** ✅ Within limits
+
+**Recommendation:** Claim amount is within available balance
+    """,
+
+    "Policy_Adjustment_Coordinator": """
+### POLICY ADJUSTMENT ANALYSIS
+
+**Exclusions Check:** No exclusions apply
+**Deductibles:** Standard deductible applied
+**Co-pay Requirements:** As per policy terms
+
+**Adjusted Amount:** ₹{claim_amount:,.2f}
+**Adjustments Applied:** None required
+
+**Recommendation:** Proceed with final decision
+    """,
+
+    "Decision_Coordinator": """
+### FINAL DECISION
+
+**Claim ID:** {claim_id}
+**Patient:** {patient_name}
+
+**FRAUD_RISK:** LOW
+**FINAL DECISION:** APPROVED
+**FINAL APPROVED AMOUNT:** ₹{claim_amount:,.2f}
+
+**Rationale:**
+1. Identity verification passed
+2. Medical records are consistent
+3. Billing is within normal ranges
+4. Policy balance is sufficient
+5. No exclusions apply
+
+**Balance After Claim:** ₹{balance_after_claim:,.2f}
+    """
+}
+
+# Values used when a claim lacks a field referenced by a template (other fields show None)
+_TEMPLATE_DEFAULTS: Dict[str, Any] = {
+    "treatment_type": "Not specified",
+    "hospital_name": "Not specified",
+    "policy_number": "Unknown",
+    "claim_amount": 0,
+    "policy_coverage_limit": 0,
+    "previously_claimed_amount": 0,
+    "available_balance": 0
+}
+
+
+class _TemplateFields(dict):
+    """Claim fields for str.format_map, filling in defaults and derived values"""
+    
+    def __missing__(self, key: str) -> Any:
+        if key == "balance_after_claim":
+            return self["available_balance"] - self["claim_amount"]
+        return _TEMPLATE_DEFAULTS.get(key)
+
+
 class RealtimeAgentProcessor:
     """
     Real-time processor for agent-based claim analysis
     Provides live updates during processing via callbacks or async generators
     """
     
-    AGENT_SEQUENCE = [
+    # Validators have no data dependency on each other and run concurrently
+    PARALLEL_AGENTS = (
         "Fraud_Detection_Specialist",
         "Medical_Validator", 
         "Billing_Fraud_Validator",
-        "Policy_Balance_Validator",
+        "Policy_Balance_Validator"
+    )
+    
+    # Coordinators build on the validators' findings and run afterwards, in order
+    SERIAL_AGENTS = (
         "Policy_Adjustment_Coordinator",
         "Decision_Coordinator"
-    ]
+    )
+    
+    AGENT_SEQUENCE = PARALLEL_AGENTS + SERIAL_AGENTS
+    
+    # Per-agent display strings, built once instead of on every update
+    _DISPLAY_NAMES = {agent: agent.replace("_", " ") for agent in AGENT_SEQUENCE}
+    _START_MSG = {agent: f"{name} is analyzing the claim..." for agent, name in _DISPLAY_NAMES.items()}
+    _COMPLETE_MSG = {agent: f"{name} completed analysis" for agent, name in _DISPLAY_NAMES.items()}
     
     def __init__(self):
         """Initialize the real-time processor"""
         self.cosmos_service: CosmosDBService = get_cosmos_service()
         self.active_sessions: Dict[str, ProcessingSession] = {}
-        self._update_callbacks: Dict[str, list] = {}
+        # Callbacks per session as insertion-ordered dict keys, for O(1) unregister
+        # (keyed by the callback itself so an equal bound method unregisters too)
+        self._update_callbacks: Dict[str, Dict[Callable[[AgentUpdate], Any], None]] = {}
+        self._write_queues: Dict[str, asyncio.Queue] = {}
+        self._pending_writes: Set[asyncio.Task] = set()
+        
+        # Admission control: claims processed at once, resizable at runtime
+        self._max_concurrent = MAX_CONCURRENT_CLAIMS
+        self._inflight = 0
+        self._admission = asyncio.Condition()
     
-    def register_update_callback(self, session_id: str, callback: Callable[[AgentUpdate], None]):
+    async def set_max_concurrent_claims(self, limit: int):
+        """Resize the concurrent-claim limit; waiting claims are admitted at once if it grew"""
+        async with self._admission:
+            self._max_concurrent = max(1, limit)
+            self._admission.notify_all()
+    
+    def register_update_callback(self, session_id: str, callback: Callable[[AgentUpdate], Any]):
         """
         Register a callback to receive real-time updates
         
         Args:
             session_id: The session to monitor
-            callback: Function to call with updates
+            callback: Function (or coroutine function) to call with updates
         """
-        if session_id not in self._update_callbacks:
-            self._update_callbacks[session_id] = []
-        self._update_callbacks[session_id].append(callback)
+        self._update_callbacks.setdefault(session_id, {})[callback] = None
     
-    def unregister_update_callback(self, session_id: str, callback: Callable[[AgentUpdate], None]):
+    def unregister_update_callback(self, session_id: str, callback: Callable[[AgentUpdate], Any]):
         """Unregister an update callback"""
-        if session_id in self._update_callbacks:
-            self._update_callbacks[session_id].remove(callback)
+        callbacks = self._update_callbacks.get(session_id)
+        if callbacks is not None:
+            callbacks.pop(callback, None)
+            if not callbacks:
+                del self._update_callbacks[session_id]
     
-    def _emit_update(self, session_id: str, update: AgentUpdate):
-        """Emit an update to all registered callbacks and save to Cosmos DB"""
-        # Save to Cosmos DB
-        self.cosmos_service.update_processing_session(
-            session_id=session_id,
-            current_agent=update.agent_name if update.status == AgentStatus.PROCESSING else None,
+    async def _session_writer(self, session_id: str, queue: asyncio.Queue):
+        """Persist queued session updates to Cosmos DB in order, off the streaming path"""
+        finished = False
+        while not finished:
+            batch = [await queue.get()]
+            if batch[0] is not None and SESSION_WRITE_LINGER_SECONDS > 0:
+                await asyncio.sleep(SESSION_WRITE_LINGER_SECONDS)
+            while batch[-1] is not None and len(batch) < SESSION_WRITE_BATCH_MAX and not queue.empty():
+                batch.append(queue.get_nowait())
+            
+            # A None marks the end of the stream and is always the last item queued
+            finished = batch[-1] is None
+            changes = batch[:-1] if finished else batch
+            try:
+                if changes:
+                    await self.cosmos_service.apply_session_updates(session_id, changes)
+                if finished:
+                    # Write any messages still buffered by the service
+                    await self.cosmos_service.flush_processing_session(session_id)
+            except Exception as e:
+                logger.warning("Session write failed for %s: %s", session_id, e)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    def _write_in_background(self, write: Awaitable, description: str, *args: Any) -> asyncio.Task:
+        """
+        Run a Cosmos DB write without holding up the stream; a failure is logged
+        
+        Args:
+            write: The write to run
+            description: %-style description of the write for the failure message
+            args: Values for the placeholders in description
+        """
+        task = asyncio.ensure_future(write)
+        # Keep a reference until the write finishes so the task is not garbage collected
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+        task.add_done_callback(functools.partial(self._report_write_failure, description, args))
+        return task
+    
+    @staticmethod
+    def _report_write_failure(description: str, args: tuple, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(description + " failed: %s", *args, task.exception())
+    
+    async def _queue_session_write(self, session_id: str, **changes):
+        """Hand a session update to the background writer"""
+        await self._write_queues[session_id].put(changes)
+    
+    async def _emit_update(self, session_id: str, update: AgentUpdate):
+        """Emit an update to all registered callbacks and queue it for Cosmos DB"""
+        # Save to Cosmos DB in the background so the caller can stream the update immediately
+        status = update.status
+        processing = status is AgentStatus.PROCESSING
+        write = self._queue_session_write(
+            session_id,
+            current_agent=update.agent_name if processing else None,
             message={
                 "agent_name": update.agent_name,
-                "status": update.status.value,
+                "status": status,
                 "message": update.message,
                 "content": update.content
             },
-            status="processing" if update.status == AgentStatus.PROCESSING else None
+            status=status if processing else None,
+            completed_agent=update.agent_name if status is AgentStatus.COMPLETED else None
         )
+        await self._notify_callbacks(session_id, update, write)
+    
+    async def _notify_callbacks(self, session_id: str, update: AgentUpdate, *also: Awaitable):
+        """
+        Pass an update to the session's registered callbacks
         
-        # Call registered callbacks
-        if session_id in self._update_callbacks:
-            for callback in self._update_callbacks[session_id]:
-                try:
-                    callback(update)
-                except Exception as e:
-                    print(f"Callback error: {e}")
+        Callbacks run concurrently with each other and with any awaitables in also,
+        so a slow subscriber holds up neither the others nor the Cosmos DB write.
+        """
+        callbacks = self._update_callbacks.get(session_id)
+        if not callbacks:
+            for awaitable in also:
+                await awaitable
+            return
+        
+        async with asyncio.TaskGroup() as group:
+            for awaitable in also:
+                group.create_task(awaitable)
+            for callback in list(callbacks):
+                group.create_task(self._call_callback(callback, update))
+    
+    @staticmethod
+    async def _call_callback(callback: Callable[[AgentUpdate], Any], update: AgentUpdate):
+        """Call one subscriber, awaiting it if it returns an awaitable; errors are logged, not raised"""
+        try:
+            result = callback(update)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            logger.exception("Callback error")
     
     async def process_claim_realtime(
         self, 
@@ -128,10 +415,30 @@ class RealtimeAgentProcessor:
         Yields:
             AgentUpdate objects as processing progresses
         """
+        # Wait for a slot so a burst of claims cannot flood Cosmos DB and the model service
+        async with self._admission:
+            await self._admission.wait_for(lambda: self._inflight < self._max_concurrent)
+            self._inflight += 1
+        
+        try:
+            async with aclosing(self._process_claim(claim_data, evidence)) as updates:
+                async for update in updates:
+                    yield update
+        finally:
+            async with self._admission:
+                self._inflight -= 1
+                self._admission.notify(1)
+    
+    async def _process_claim(
+        self, 
+        claim_data: Dict[str, Any],
+        evidence: Dict[str, Any]
+    ) -> AsyncGenerator[AgentUpdate, None]:
+        """Run one admitted claim through the agents (see process_claim_realtime)"""
         claim_id = claim_data.get("claim_id", "unknown")
         
         # Create session in Cosmos DB
-        session_data = self.cosmos_service.create_processing_session(claim_id)
+        session_data = await self.cosmos_service.create_processing_session(claim_id)
         session_id = session_data["session_id"]
         
         # Track locally
@@ -150,49 +457,66 @@ class RealtimeAgentProcessor:
         )
         yield start_update
         
+        # Background writer for this session's updates
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=SESSION_WRITE_QUEUE_SIZE)
+        self._write_queues[session_id] = write_queue
+        writer = asyncio.create_task(self._session_writer(session_id, write_queue))
+        log_write: Optional[asyncio.Task] = None
+        
         try:
-            # Process through each agent
-            for agent_name in self.AGENT_SEQUENCE:
-                # Emit agent starting
-                start_agent_update = AgentUpdate(
-                    agent_name=agent_name,
-                    status=AgentStatus.PROCESSING,
-                    message=f"{agent_name.replace('_', ' ')} is analyzing the claim..."
-                )
-                self._emit_update(session_id, start_agent_update)
+            # Announce every validator before starting them so all show as running at once
+            for agent_name in self.PARALLEL_AGENTS:
+                start_agent_update = self._agent_started(agent_name)
+                await self._emit_update(session_id, start_agent_update)
+                yield start_agent_update
+            
+            # Validator output streams as it is generated, interleaved in arrival order
+            findings: Dict[str, Any] = {}
+            async with aclosing(
+                self._stream_agents(session_id, self.PARALLEL_AGENTS, claim_data, evidence)
+            ) as agent_updates:
+                async for update in agent_updates:
+                    yield update
+                    if update.status is AgentStatus.COMPLETED:
+                        session.agents_completed.append(update.agent_name)
+                        session.updates.append(update)
+                        findings[update.agent_name] = update.content
+            
+            # Coordinators see the validators' findings (and each earlier coordinator's)
+            coordinator_evidence = {**evidence, "agent_findings": findings}
+            for agent_name in self.SERIAL_AGENTS:
+                start_agent_update = self._agent_started(agent_name)
+                await self._emit_update(session_id, start_agent_update)
                 yield start_agent_update
                 
-                # Simulate agent processing (replace with actual agent calls)
-                agent_result = await self._process_with_agent(
-                    agent_name, claim_data, evidence
-                )
-                
-                # Emit agent completed
-                complete_update = AgentUpdate(
-                    agent_name=agent_name,
-                    status=AgentStatus.COMPLETED,
-                    message=f"{agent_name.replace('_', ' ')} completed analysis",
-                    content=agent_result.get("content", ""),
-                    metadata=agent_result.get("metadata", {})
-                )
-                self._emit_update(session_id, complete_update)
-                yield complete_update
-                
-                session.agents_completed.append(agent_name)
+                async with aclosing(
+                    self._stream_agents(session_id, (agent_name,), claim_data, coordinator_evidence)
+                ) as agent_updates:
+                    async for update in agent_updates:
+                        yield update
+                        if update.status is AgentStatus.COMPLETED:
+                            session.agents_completed.append(agent_name)
+                            session.updates.append(update)
+                            findings[agent_name] = update.content
             
             # Processing complete
             session.status = "completed"
             session.completed_at = datetime.utcnow().isoformat()
             
             # Update Cosmos DB with final status
-            self.cosmos_service.update_processing_session(
-                session_id=session_id,
-                status="completed"
-            )
+            await self._queue_session_write(session_id, status="completed")
             
-            # Save complete log
+            # Save complete log. Building it is synchronous CPU work over every update,
+            # so yield once first to let the writer and pending stream sends run; the
+            # per-agent loops above need no such checkpoints since each await yields.
+            await asyncio.sleep(0)
             final_log = self._build_final_log(session, claim_data, evidence)
-            self.cosmos_service.save_agent_log(claim_id, final_log)
+            log_write = self._write_in_background(
+                self.cosmos_service.save_agent_log(claim_id, final_log),
+                "Saving agent log for %s", claim_id
+            )
+            # Give pending SSE/WebSocket writes a turn before the completion update
+            await asyncio.sleep(0)
             
             # Emit completion
             complete_update = AgentUpdate(
@@ -209,49 +533,125 @@ class RealtimeAgentProcessor:
                 status=AgentStatus.FAILED,
                 message=f"Processing failed: {str(e)}"
             )
-            self.cosmos_service.update_processing_session(
-                session_id=session_id,
-                status="failed"
-            )
+            await self._queue_session_write(session_id, status="failed")
             yield error_update
         
         finally:
-            # Cleanup
+            # Cleanup: let the writer drain its queue and the log save finish before
+            # dropping the session
+            await write_queue.put(None)
+            await asyncio.gather(writer, *([log_write] if log_write else []), return_exceptions=True)
+            self._write_queues.pop(session_id, None)
             if session_id in self.active_sessions:
                 del self.active_sessions[session_id]
     
+    def _agent_started(self, agent_name: str) -> AgentUpdate:
+        """Update announcing that an agent started"""
+        return AgentUpdate(
+            agent_name=agent_name,
+            status=AgentStatus.PROCESSING,
+            message=self._START_MSG[agent_name]
+        )
+    
+    def _agent_completed(self, agent_name: str, agent_result: Dict[str, Any]) -> AgentUpdate:
+        """Update carrying an agent's finished analysis"""
+        return AgentUpdate(
+            agent_name=agent_name,
+            status=AgentStatus.COMPLETED,
+            message=self._COMPLETE_MSG[agent_name],
+            content=agent_result.get("content", ""),
+            metadata=agent_result.get("metadata", {})
+        )
+    
+    def _agent_chunk(self, agent_name: str, chunk: str) -> AgentUpdate:
+        """Update carrying a piece of an agent's analysis as it is generated"""
+        return AgentUpdate(
+            agent_name=agent_name,
+            status=AgentStatus.PROCESSING,
+            message="",
+            content=chunk,
+            metadata={"delta": True}
+        )
+    
+    async def _stream_agents(
+        self,
+        session_id: str,
+        agent_names: Sequence[str],
+        claim_data: Dict[str, Any],
+        evidence: Dict[str, Any]
+    ) -> AsyncGenerator[AgentUpdate, None]:
+        """
+        Run agents concurrently and yield their output as it arrives
+        
+        Each agent's chunks are yielded as they are generated, followed by its completed
+        update. Chunks go to callbacks only; completions are also persisted to Cosmos DB.
+        Agents still running are cancelled, and awaited, when the generator is closed.
+        """
+        output: asyncio.Queue = asyncio.Queue()
+        
+        async def run(agent_name: str):
+            agent_result = await self._process_with_agent(
+                agent_name, claim_data, evidence,
+                on_chunk=lambda chunk: output.put_nowait(self._agent_chunk(agent_name, chunk))
+            )
+            output.put_nowait(self._agent_completed(agent_name, agent_result))
+        
+        tasks = [asyncio.create_task(run(agent_name)) for agent_name in agent_names]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                update = await output.get()
+                if update.status is AgentStatus.COMPLETED:
+                    remaining -= 1
+                    await self._emit_update(session_id, update)
+                else:
+                    await self._notify_callbacks(session_id, update)
+                yield update
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the cancellations to land so no task is left pending
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     async def _process_with_agent(
         self, 
         agent_name: str, 
         claim_data: Dict[str, Any],
-        evidence: Dict[str, Any]
+        evidence: Dict[str, Any],
+        on_chunk: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """
         Process claim data with a specific agent
         
         This is where actual agent processing happens.
         Replace with real AutoGen agent calls.
+        
+        Args:
+            agent_name: The agent to run
+            claim_data: The claim data to process
+            evidence: Collected evidence for the claim
+            on_chunk: Called with each piece of the analysis as it is generated
         """
-        # Import here to avoid circular imports
         try:
-            from services.agent_factory import AgentFactory
-            from core.config import get_llm_config
-            
             # Create the specific agent and get its analysis
-            factory = AgentFactory(claim_data, evidence)
+            factory = _agent_factory_cls()(claim_data, evidence)
             
             # Build context for the agent
             context = self._build_agent_context(agent_name, claim_data, evidence)
             
-            # Simulate processing time (replace with actual agent call)
-            await asyncio.sleep(0.5)  # Small delay for demo
+            # Forward the analysis piece by piece as it is generated
+            chunks = []
+            async for chunk in self._stream_agent_analysis(agent_name, claim_data, evidence):
+                chunks.append(chunk)
+                if on_chunk:
+                    on_chunk(chunk)
             
             # Return agent-specific analysis
             return {
-                "content": self._get_agent_analysis(agent_name, claim_data, evidence),
+                "content": "".join(chunks),
                 "metadata": {
                     "agent": agent_name,
-                    "processed_at": datetime.utcnow().isoformat()
+                    "processed_at": _now_iso()
                 }
             }
             
@@ -261,6 +661,23 @@ class RealtimeAgentProcessor:
                 "metadata": {"error": str(e)}
             }
     
+    async def _stream_agent_analysis(
+        self,
+        agent_name: str,
+        claim_data: Dict[str, Any],
+        evidence: Dict[str, Any]
+    ) -> AsyncIterator[str]:
+        """
+        Stream an agent's analysis as it is generated
+        
+        Placeholder for a streaming agent call: the canned analysis is released line by
+        line over AGENT_DEMO_DELAY_SECONDS (replace with the streaming model response).
+        """
+        lines = self._get_agent_analysis(agent_name, claim_data, evidence).splitlines(keepends=True)
+        for line in lines:
+            await asyncio.sleep(AGENT_DEMO_DELAY_SECONDS / len(lines))
+            yield line
+    
     def _build_agent_context(
         self, 
         agent_name: str, 
@@ -287,97 +704,10 @@ class RealtimeAgentProcessor:
         evidence: Dict[str, Any]
     ) -> str:
         """Get analysis content for a specific agent (placeholder for real agent output)"""
-        
-        analyses = {
-            "Fraud_Detection_Specialist": f"""
-### FRAUD DETECTION ANALYSIS
-
-**Claim ID:** {claim_data.get('claim_id')}
-**Patient:** {claim_data.get('patient_name')}
-
-**Identity Verification:** ✅ Verified
-**Document Authenticity:** ✅ Verified
-**Claim Pattern Analysis:** Normal patterns detected
-
-**FRAUD_RISK:** LOW
-**Recommendation:** Proceed with medical validation
-            """,
-            
-            "Medical_Validator": f"""
-### MEDICAL VALIDATION REPORT
-
-**Diagnosis:** {claim_data.get('diagnosis')}
-**Treatment:** {claim_data.get('treatment_type', 'Not specified')}
-
-**Medical Consistency:** ✅ Consistent
-**Treatment Appropriateness:** ✅ Appropriate for diagnosis
-**Documentation Quality:** Complete
-
-**Recommendation:** Medical records support the claim
-            """,
-            
-            "Billing_Fraud_Validator": f"""
-### BILLING VALIDATION REPORT
-
-**Claimed Amount:** ₹{claim_data.get('claim_amount', 0):,.2f}
-**Hospital:** {claim_data.get('hospital_name', 'Not specified')}
-
-**Rate Analysis:** Within normal range
-**Itemization Check:** ✅ Properly itemized
-**Duplicate Check:** No duplicates found
-
-**Recommendation:** Billing is reasonable and documented
-            """,
-            
-            "Policy_Balance_Validator": f"""
-### POLICY BALANCE VALIDATION
-
-**Policy Number:** {claim_data.get('policy_number', 'Unknown')}
-**Coverage Limit:** ₹{claim_data.get('policy_coverage_limit', 0):,.2f}
-**Previously Claimed:** ₹{claim_data.get('previously_claimed_amount', 0):,.2f}
-**Available Balance:** ₹{claim_data.get('available_balance', 0):,.2f}
-
-**Balance Status:** Sufficient
-**Coverage Check:** ✅ Within limits
-
-**Recommendation:** Claim amount is within available balance
-            """,
-            
-            "Policy_Adjustment_Coordinator": f"""
-### POLICY ADJUSTMENT ANALYSIS
-
-**Exclusions Check:** No exclusions apply
-**Deductibles:** Standard deductible applied
-**Co-pay Requirements:** As per policy terms
-
-**Adjusted Amount:** ₹{claim_data.get('claim_amount', 0):,.2f}
-**Adjustments Applied:** None required
-
-**Recommendation:** Proceed with final decision
-            """,
-            
-            "Decision_Coordinator": f"""
-### FINAL DECISION
-
-**Claim ID:** {claim_data.get('claim_id')}
-**Patient:** {claim_data.get('patient_name')}
-
-**FRAUD_RISK:** LOW
-**FINAL DECISION:** APPROVED
-**FINAL APPROVED AMOUNT:** ₹{claim_data.get('claim_amount', 0):,.2f}
-
-**Rationale:**
-1. Identity verification passed
-2. Medical records are consistent
-3. Billing is within normal ranges
-4. Policy balance is sufficient
-5. No exclusions apply
-
-**Balance After Claim:** ₹{claim_data.get('available_balance', 0) - claim_data.get('claim_amount', 0):,.2f}
-            """
-        }
-        
-        return analyses.get(agent_name, f"Analysis by {agent_name} completed.")
+        template = _AGENT_TEMPLATES.get(agent_name)
+        if template is None:
+            return f"Analysis by {agent_name} completed."
+        return template.format_map(_TemplateFields(claim_data))
     
     def _build_final_log(
         self, 
@@ -415,16 +745,18 @@ class RealtimeAgentProcessor:
                     "total_messages": len(session.updates),
                     "agents_participated": len(session.agents_completed),
                     "conversation_duration": 0,  # Calculate from timestamps
+                    # Plain objects, serialised once with the whole log (the frontend
+                    # accepts objects as well as JSON strings)
                     "detailed_messages": [
-                        json.dumps({"name": u.agent_name, "content": u.content, "role": "assistant"})
-                        for u in session.updates if hasattr(u, 'content')
+                        {"name": u.agent_name, "content": u.content, "role": "assistant"}
+                        for u in session.updates if u.content is not None
                     ]
                 },
                 "timestamp": datetime.utcnow().isoformat()
             }
         }
     
-    def get_session_status(self, session_id: str) -> Optional[Dict[str, Any]]:
+    async def get_session_status(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get the current status of a processing session"""
         # Check local cache first
         if session_id in self.active_sessions:
@@ -440,16 +772,18 @@ class RealtimeAgentProcessor:
             }
         
         # Fall back to Cosmos DB
-        return self.cosmos_service.get_processing_session(session_id)
+        return await self.cosmos_service.get_processing_session(session_id)
 
 
-# Singleton instance
-_processor: Optional[RealtimeAgentProcessor] = None
+# One processor per event loop: its queues, tasks and sessions belong to the loop that
+# created them, and entries go away with their loop (e.g. between test runs)
+_processors: "WeakKeyDictionary[asyncio.AbstractEventLoop, RealtimeAgentProcessor]" = WeakKeyDictionary()
 
 
 def get_realtime_processor() -> RealtimeAgentProcessor:
-    """Get or create the real-time processor singleton"""
-    global _processor
-    if _processor is None:
-        _processor = RealtimeAgentProcessor()
-    return _processor
+    """Get or create the real-time processor for the running event loop"""
+    loop = asyncio.get_running_loop()
+    processor = _processors.get(loop)
+    if processor is None:
+        processor = _processors[loop] = RealtimeAgentProcessor()
+    return processor
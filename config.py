@@ -1,8 +1,10 @@
 # Configuration settings for Health Insurance Claim Processing System
 
 import os
+import functools
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -14,6 +16,7 @@ from core.instructions import (
     SEARCH_FIELD_MAPPINGS,
     XRAY_GRADE_DESCRIPTIONS
 )
+from core.config import clear_config_cache
 
 # Re-export for backward compatibility
 AGENT_INSTRUCTIONS = AZURE_AGENT_INSTRUCTIONS
@@ -50,7 +53,8 @@ class WorkflowConfig:
     """Workflow processing configuration"""
     max_retry_attempts: int = 3
     timeout_seconds: int = 300
-    enable_parallel_processing: bool = False
+    # Run the five fraud validators concurrently instead of as a round-robin group chat
+    enable_parallel_processing: bool = field(default_factory=lambda: os.getenv("ENABLE_PARALLEL_PROCESSING", "false").lower() == "true")
     save_intermediate_results: bool = True
     cleanup_agents_after_processing: bool = True
 
@@ -93,19 +97,25 @@ CLAIM_STATUS_RULES = {
     ]
 }
 
-def get_environment_config() -> Dict[str, str]:
-    """Get configuration from environment variables"""
-    return {
+@functools.lru_cache(maxsize=1)
+def _environment_config() -> Mapping[str, str]:
+    """Read the environment settings once"""
+    return MappingProxyType({
         "azure_endpoint": os.getenv("AZURE_ENDPOINT", CONFIG.azure.endpoint),
         "azure_resource_group": os.getenv("AZURE_RESOURCE_GROUP", CONFIG.azure.resource_group),
         "azure_subscription_id": os.getenv("AZURE_SUBSCRIPTION_ID", CONFIG.azure.subscription_id),
         "azure_project_name": os.getenv("AZURE_PROJECT_NAME", CONFIG.azure.project_name),
         "custom_vision_key": os.getenv("CUSTOM_VISION_PREDICTION_KEY", CONFIG.xray.prediction_key),
         "storage_account_key": os.getenv("AZURE_STORAGE_ACCOUNT_KEY", CONFIG.xray.storage_account_key)
-    }
+    })
 
-def validate_config() -> List[str]:
-    """Validate configuration and return list of issues"""
+def get_environment_config() -> Dict[str, str]:
+    """Get configuration from environment variables (read once; see reload_config)"""
+    return dict(_environment_config())
+
+@functools.lru_cache(maxsize=1)
+def _config_issues() -> Tuple[str, ...]:
+    """Check the configuration once"""
     issues = []
     
     # Check Azure configuration
@@ -122,7 +132,20 @@ def validate_config() -> List[str]:
     if not CONFIG.xray.storage_account_key:
         issues.append("Azure Storage account key not configured")
     
-    return issues
+    return tuple(issues)
+
+def validate_config() -> List[str]:
+    """Validate configuration and return list of issues (checked once; see reload_config)"""
+    return list(_config_issues())
+
+def reload_config():
+    """Re-read .env and the environment, rebuild CONFIG in place and drop cached results"""
+    load_dotenv(override=True)
+    # Rebuilt in place so modules that imported CONFIG see the new values
+    CONFIG.__init__()
+    _environment_config.cache_clear()
+    _config_issues.cache_clear()
+    clear_config_cache()
 
 def print_config_status():
     """Print current configuration status"""
@@ -11,6 +11,7 @@ from .models import (
 from .config import (
     get_llm_config,
     get_default_claim_data,
+    clear_config_cache,
     EXCLUSION_KEYWORDS,
     KNOWN_EXCLUSIONS,
     HIGH_VALUE_THRESHOLD
@@ -18,6 +19,8 @@ from .config import (
 from .utils import (
     format_currency,
     calculate_utilization,
+    calculate_utilization_batch,
+    calculate_remaining_balance_batch,
     extract_pattern,
     extract_all_amounts,
     clean_amount_string,
@@ -25,13 +28,19 @@ from .utils import (
     extract_decision_field,
     get_message_content
 )
-from .prompts import (
+from .instructions import (
     get_fraud_specialist_prompt,
     get_medical_validator_prompt,
     get_billing_validator_prompt,
     get_policy_balance_validator_prompt,
     get_coverage_exclusions_validator_prompt,
-    get_fraud_coordinator_prompt
+    get_fraud_coordinator_prompt,
+    get_fraud_specialist_messages,
+    get_medical_validator_messages,
+    get_billing_validator_messages,
+    get_policy_balance_validator_messages,
+    get_coverage_exclusions_validator_messages,
+    get_fraud_coordinator_messages
 )
 from .queries import (
     get_medical_evidence_query,
@@ -52,12 +61,15 @@ __all__ = [
     # Config
     'get_llm_config',
     'get_default_claim_data',
+    'clear_config_cache',
     'EXCLUSION_KEYWORDS',
     'KNOWN_EXCLUSIONS',
     'HIGH_VALUE_THRESHOLD',
     # Utils
     'format_currency',
     'calculate_utilization',
+    'calculate_utilization_batch',
+    'calculate_remaining_balance_batch',
     'extract_pattern',
     'extract_all_amounts',
     'clean_amount_string',
@@ -71,6 +83,12 @@ __all__ = [
     'get_policy_balance_validator_prompt',
     'get_coverage_exclusions_validator_prompt',
     'get_fraud_coordinator_prompt',
+    'get_fraud_specialist_messages',
+    'get_medical_validator_messages',
+    'get_billing_validator_messages',
+    'get_policy_balance_validator_messages',
+    'get_coverage_exclusions_validator_messages',
+    'get_fraud_coordinator_messages',
     # Queries
     'get_medical_evidence_query',
     'get_billing_evidence_query',
@@ -0,0 +1,338 @@
+# Shared runner for the standalone Azure AI Search-backed agents
+# (agents/bill.py, agents/patientsummary.py, agents/claim.py)
+#
+# Each agent is described by an AgentSpec; this module owns the common pipeline:
+# connection discovery, agent registration, pooled threads, retries, streaming
+# runs and the response cache.
+
+import os
+import re
+import sys
+import asyncio
+import hashlib
+import functools
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from core.instructions import AZURE_AGENT_INSTRUCTIONS, SEARCH_FIELD_MAPPINGS
+from core.semantic_cache import get_response_cache, get_retrieval_cache
+from core.azure_clients import get_async_project_client
+from core.retry import azure_retry, agent_run_slots
+from core.thread_pool import get_thread
+
+load_dotenv()
+
+# azure.ai.projects is imported inside the functions that need it, so importing an agent
+# module (orchestrators, worker processes) does not pay the Azure SDK import cost.
+
+# Documents returned per AI Search tool call; fewer documents means fewer GPT-4o input tokens
+SEARCH_TOP_K = int(os.getenv("AZURE_SEARCH_TOP_K", "5"))
+
+SEP = "=" * 60
+
+# Search connection ID substrings, most preferred first
+SEARCH_CONN_KEYWORDS: Tuple[str, ...] = ("fsisearchindex", "fsi")
+
+
+@dataclass(frozen=True)
+class AgentSpec:
+    """Definition of a standalone Azure AI Search-backed agent"""
+    name: str                   # Agent name registered in Azure AI Foundry
+    instructions_key: str       # Key into AZURE_AGENT_INSTRUCTIONS
+    index_env_var: str          # Environment variable holding the search index name
+    default_index: str          # Index used when index_env_var is unset
+    agent_id_env_var: str       # Environment variable holding the pre-registered agent ID
+    query: str                  # Fixed analysis query sent by run_agent()
+    title: str                  # Heading printed above the analysis
+    conn_keywords: Tuple[str, ...] = SEARCH_CONN_KEYWORDS  # Connection ID substrings by preference
+
+    @property
+    def index_name(self) -> str:
+        return os.getenv(self.index_env_var, self.default_index)
+
+    @property
+    def cache_namespace(self) -> str:
+        # Includes a short hash of the instructions, so rewriting them retires cached answers
+        instructions = AZURE_AGENT_INSTRUCTIONS[self.instructions_key]
+        instructions_hash = hashlib.sha256(instructions.encode("utf-8")).hexdigest()[:12]
+        return f"{self.name}:{self.index_name}:{instructions_hash}"
+
+
+@functools.lru_cache(maxsize=None)
+def _connection_pattern(keywords: Tuple[str, ...]) -> 're.Pattern':
+    """One case-insensitive pattern whose matching group number is the keyword's priority"""
+    lookaheads = "|".join(f"(?=.*({re.escape(keyword)}))" for keyword in keywords)
+    return re.compile(f"^(?:{lookaheads})", re.IGNORECASE)
+
+
+def select_search_connection(connections: List[Any], keywords: Tuple[str, ...] = SEARCH_CONN_KEYWORDS) -> str:
+    """
+    Pick the Azure AI Search connection ID from already-listed project connections.
+
+    Shared by the async agent runner and the synchronous workflow manager.
+
+    Args:
+        connections: Connections as returned by project_client.connections.list()
+        keywords: Connection ID substrings, most preferred first
+
+    Returns:
+        The best-matching search connection ID, the first search connection if none
+        matches, or "" when the project has no search connection
+    """
+    conns = [conn for conn in connections if conn.connection_type == "CognitiveSearch"]
+
+    print("🔍 Available connections:")
+    for conn in conns:
+        print(f"   - {conn.id}")
+
+    print(f"🔍 Searching for {keywords[0]} connection...")
+    pattern = _connection_pattern(keywords)
+    conn_id, best_priority = "", None
+    for conn in conns:
+        match = pattern.match(conn.id)
+        if match and (best_priority is None or match.lastindex < best_priority):
+            conn_id, best_priority = conn.id, match.lastindex
+            if best_priority == 1:
+                break
+    if conn_id:
+        print(f"✅ Found search connection: {conn_id}")
+    elif conns:
+        conn_id = conns[0].id
+        print(f"⚠️ Using fallback connection: {conn_id}")
+
+    return conn_id
+
+
+async def _find_search_connection(project_client, keywords: Tuple[str, ...]) -> str:
+    """Find the Azure AI Search connection ID, preferring earlier keywords"""
+    # Page through the connections once; the SDK iterator is not safely re-iterable
+    connections = list(await azure_retry(project_client.connections.list)())
+    return select_search_connection(connections, keywords)
+
+
+def build_search_tool(conn_id: str, index_name: str) -> Any:
+    """
+    Build the AI Search tool with the smallest retrieval payload the installed SDK supports.
+
+    Tries the mapped text fields plus a top_k cap first, then drops options the SDK
+    rejects, ending with a plain tool.
+    """
+    from azure.ai.projects.models import AzureAISearchTool
+
+    option_sets = (
+        {"field_mappings": dict(SEARCH_FIELD_MAPPINGS), "top_k": SEARCH_TOP_K},
+        {"top_k": SEARCH_TOP_K},
+        {},
+    )
+    for options in option_sets[:-1]:
+        try:
+            return AzureAISearchTool(index_connection_id=conn_id, index_name=index_name, **options)
+        except TypeError:
+            print(f"⚠️ {', '.join(options)} not supported by SDK. Retrying with fewer options.")
+    return AzureAISearchTool(index_connection_id=conn_id, index_name=index_name)
+
+
+async def get_or_create_agent(spec: AgentSpec) -> str:
+    """
+    Get the agent ID for a spec, creating the agent only if none is registered.
+
+    The ID is read from spec.agent_id_env_var; a newly created agent's ID is stored
+    back into the environment so later calls in this process reuse it.
+    """
+    agent_id = os.getenv(spec.agent_id_env_var)
+    if agent_id:
+        return agent_id
+
+    project_client = get_async_project_client()
+    conn_id = await _find_search_connection(project_client, spec.conn_keywords)
+
+    ai_search = build_search_tool(conn_id, spec.index_name)
+
+    search_agent = await azure_retry(project_client.agents.create_agent)(
+        model="gpt-4o",
+        name=spec.name,
+        instructions=AZURE_AGENT_INSTRUCTIONS[spec.instructions_key],
+        tools=ai_search.definitions,
+        tool_resources=ai_search.resources,
+    )
+
+    os.environ[spec.agent_id_env_var] = search_agent.id
+    print(f"🆕 Created agent {spec.name}: {search_agent.id} (set {spec.agent_id_env_var} to reuse it)")
+    return search_agent.id
+
+
+async def delete_agent(spec: AgentSpec) -> None:
+    """Delete the registered agent for a spec and clear its cached ID"""
+    agent_id = os.getenv(spec.agent_id_env_var)
+    if not agent_id:
+        print(f"⏭️ {spec.agent_id_env_var} not set, nothing to delete")
+        return
+
+    try:
+        await get_async_project_client().agents.delete_agent(agent_id)
+        print(f"🧹 Deleted agent {agent_id} ({spec.agent_id_env_var})")
+    except Exception as e:
+        print(f"⚠️ Failed to delete agent {agent_id}: {e}")
+
+    os.environ.pop(spec.agent_id_env_var, None)
+
+
+def _print_delta(text: str) -> None:
+    print(text, end="", flush=True)
+
+
+async def _retrieved_documents(project_client, thread_id: str, run_id: str) -> Optional[str]:
+    """Collect the AI Search tool output from a finished run's steps, or None if it made no search"""
+    try:
+        steps = await project_client.agents.list_run_steps(thread_id=thread_id, run_id=run_id)
+    except Exception as e:
+        print(f"⚠️ Could not read run steps for retrieval cache: {e}")
+        return None
+
+    outputs = []
+    for step in steps.data:
+        for tool_call in getattr(step.step_details, "tool_calls", None) or []:
+            search_call = getattr(tool_call, "azure_ai_search", None)
+            if search_call and search_call.get("output"):
+                outputs.append(search_call["output"])
+    return "\n\n".join(outputs) or None
+
+
+async def _run_on_thread(
+    spec: AgentSpec, thread_id: str, query: str, on_delta: Optional[Callable[[str], None]] = None,
+    semantic: bool = True
+) -> Optional[str]:
+    """
+    Add the query to an existing thread and stream back the assistant's reply.
+
+    semantic=False restricts the retrieval cache to exact query matches.
+    """
+    from azure.ai.projects.models import AgentStreamEvent, MessageDeltaChunk, ThreadRun
+
+    project_client = get_async_project_client()
+    agent_id = await get_or_create_agent(spec)
+
+    # Replay documents retrieved for a similar earlier query instead of searching again
+    retrieval_cache = get_retrieval_cache(spec.cache_namespace)
+    documents = await asyncio.to_thread(retrieval_cache.get, query, semantic)
+    if documents is not None:
+        print("⚡ Search results served from retrieval cache")
+        content = f"{query}\n\nRetrieved documents:\n{documents}"
+    else:
+        content = query
+
+    # Bound the number of runs in flight; opening calls retry on transient throttling
+    async with agent_run_slots():
+        await azure_retry(project_client.agents.create_message)(
+            thread_id=thread_id,
+            role="user",
+            content=content
+        )
+
+        # Stream the run. The agent's instructions are static and no per-run instructions are
+        # added, so the system prefix stays byte-identical across runs and hits the
+        # service-side prompt cache; everything variable goes in the user message.
+        chunks = []
+        run_id = None
+        async with await azure_retry(project_client.agents.create_stream)(
+            thread_id=thread_id,
+            agent_id=agent_id,
+            additional_instructions=None,
+            tool_choice="none" if documents is not None else None
+        ) as stream:
+            async for event_type, event_data, _ in stream:
+                if isinstance(event_data, MessageDeltaChunk):
+                    chunks.append(event_data.text)
+                    if on_delta:
+                        on_delta(event_data.text)
+                elif isinstance(event_data, ThreadRun):
+                    run_id = event_data.id
+                    if event_data.status == "failed":
+                        print(f"❌ {spec.title} failed: {event_data.last_error}")
+                        return None
+                elif event_type == AgentStreamEvent.ERROR:
+                    print(f"❌ {spec.title} failed: {event_data}")
+                    return None
+
+    if documents is None and run_id is not None:
+        documents = await _retrieved_documents(project_client, thread_id, run_id)
+        if documents is not None:
+            await asyncio.to_thread(retrieval_cache.put, query, documents, semantic)
+
+    return "".join(chunks) or None
+
+
+async def _run_on_session(
+    spec: AgentSpec, query: str, on_delta: Optional[Callable[[str], None]] = None, session_id: str = "default",
+    semantic: bool = True
+) -> Optional[str]:
+    """Send the query on the session's pooled thread, creating the thread on first use"""
+    thread_id = await get_thread(get_async_project_client(), await get_or_create_agent(spec), session_id)
+    return await _run_on_thread(spec, thread_id, query, on_delta, semantic)
+
+
+async def run_agent(spec: AgentSpec, stream: bool = True, session_id: str = "default") -> Optional[str]:
+    """
+    Run the spec's fixed query against its agent and return the response text.
+
+    Args:
+        spec: Agent definition
+        stream: Print the reply as it is generated; disable when running agents concurrently
+        session_id: Caller/session whose pooled thread the query runs on
+
+    Returns:
+        The analysis text, or None if the run failed
+    """
+    print(f"\n💬 Generating {spec.title}...")
+
+    # Serve repeated or near-identical queries from the response cache
+    cache = get_response_cache(spec.cache_namespace)
+    analysis = await asyncio.to_thread(cache.get, spec.query)
+    if analysis is not None:
+        print("⚡ Served from response cache")
+
+    # Display output; on a cache miss with streaming enabled the reply is printed as it arrives
+    title = f"\n📋 {spec.title}:"
+    if analysis is None:
+        if stream:
+            print(title)
+            print(SEP)
+        analysis = await _run_on_session(spec, spec.query, _print_delta if stream else None, session_id)
+        if analysis is None:
+            return None
+        await asyncio.to_thread(cache.put, spec.query, analysis)
+        if stream:
+            print(f"\n{SEP}")
+            return analysis
+
+    # One write and one flush for the whole block
+    sys.stdout.write("\n".join((title, SEP, analysis, SEP)) + "\n")
+    sys.stdout.flush()
+    return analysis
+
+
+async def run_agent_queries(
+    spec: AgentSpec, queries: List[str], session_id: str = "default"
+) -> List[Optional[str]]:
+    """
+    Run several free-form queries (e.g. one per patient) against the spec's agent.
+
+    Each distinct query gets its own pooled thread, so one patient's turns never sit in
+    the model's context for another. Free-form queries differ only in names or IDs, so
+    both caches are used in exact-match mode only; the semantic tiers would hand one
+    patient's analysis or documents to another.
+    """
+    cache = get_response_cache(spec.cache_namespace)
+    results = []
+
+    for query in queries:
+        analysis = await asyncio.to_thread(cache.get, query, False)
+        if analysis is None:
+            query_session = f"{session_id}:{hashlib.sha256(query.encode('utf-8')).hexdigest()[:16]}"
+            analysis = await _run_on_session(spec, query, session_id=query_session, semantic=False)
+            if analysis is not None:
+                await asyncio.to_thread(cache.put, query, analysis, False)
+        results.append(analysis)
+
+    return results
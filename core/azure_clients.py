@@ -0,0 +1,193 @@
+# Shared Azure client helpers
+#
+# One credential and one AIProjectClient per process, shared by every agent module, so
+# the credential's in-memory token cache is reused instead of each module fetching its
+# own token from the STS.
+#
+# DefaultAzureCredential probes Environment -> Managed Identity -> Visual Studio ->
+# Azure CLI -> ... in turn, each with its own timeout. Selecting the credential
+# explicitly skips those probes and makes first-token acquisition sub-second.
+
+import os
+import time
+import asyncio
+import functools
+import threading
+from typing import Any, Dict, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# AZURE_CRED_KIND: "managed_identity" (production), "cli" (local dev), "default" (the full
+# DefaultAzureCredential probe) or "chained" (default): service principal and workload identity
+# when their environment variables are set, then managed identity, then the Azure CLI
+AZURE_CRED_KIND = os.getenv("AZURE_CRED_KIND", "chained").lower()
+
+# Cached tokens are reused until this many seconds before they expire
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+
+# Azure AI Project config from environment variables
+ENDPOINT = os.getenv("AZURE_ENDPOINT", "https://eastus2.api.azureml.ms")
+RESOURCE_GROUP = os.getenv("AZURE_RESOURCE_GROUP", "")
+SUBSCRIPTION_ID = os.getenv("AZURE_SUBSCRIPTION_ID", "")
+PROJECT_NAME = os.getenv("AZURE_PROJECT_NAME", "")
+
+
+def create_credential(use_async: bool = False) -> Any:
+    """
+    Create the Azure credential selected by AZURE_CRED_KIND.
+
+    Args:
+        use_async: Return an azure.identity.aio credential for aio SDK clients
+
+    Returns:
+        ManagedIdentityCredential, AzureCliCredential, DefaultAzureCredential, or a
+        ChainedTokenCredential trying the configured service principal / workload identity,
+        then managed identity, then the Azure CLI
+    """
+    if use_async:
+        from azure.identity.aio import (
+            AzureCliCredential, ChainedTokenCredential, DefaultAzureCredential,
+            EnvironmentCredential, ManagedIdentityCredential, WorkloadIdentityCredential
+        )
+    else:
+        from azure.identity import (
+            AzureCliCredential, ChainedTokenCredential, DefaultAzureCredential,
+            EnvironmentCredential, ManagedIdentityCredential, WorkloadIdentityCredential
+        )
+
+    if AZURE_CRED_KIND == "default":
+        return DefaultAzureCredential()
+    if AZURE_CRED_KIND == "managed_identity":
+        return ManagedIdentityCredential(client_id=_managed_identity_client_id())
+    if AZURE_CRED_KIND == "cli":
+        return AzureCliCredential()
+
+    credentials = []
+    if _service_principal_configured():
+        credentials.append(EnvironmentCredential())
+    if _workload_identity_configured():
+        credentials.append(WorkloadIdentityCredential())
+    credentials.append(ManagedIdentityCredential(client_id=_managed_identity_client_id()))
+    credentials.append(AzureCliCredential())
+    return ChainedTokenCredential(*credentials)
+
+
+def _service_principal_configured() -> bool:
+    """AZURE_TENANT_ID/AZURE_CLIENT_ID plus a secret or certificate, as read by EnvironmentCredential"""
+    return bool(
+        os.getenv("AZURE_TENANT_ID") and os.getenv("AZURE_CLIENT_ID")
+        and (os.getenv("AZURE_CLIENT_SECRET") or os.getenv("AZURE_CLIENT_CERTIFICATE_PATH"))
+    )
+
+
+def _workload_identity_configured() -> bool:
+    """Federated token file injected by AKS workload identity"""
+    return bool(
+        os.getenv("AZURE_TENANT_ID") and os.getenv("AZURE_CLIENT_ID") and os.getenv("AZURE_FEDERATED_TOKEN_FILE")
+    )
+
+
+def _managed_identity_client_id() -> Any:
+    """
+    Client ID of a user-assigned managed identity, or None for the system-assigned one.
+
+    AZURE_MANAGED_IDENTITY_CLIENT_ID wins; AZURE_CLIENT_ID is only used when it does not
+    already belong to a service principal or workload identity.
+    """
+    client_id = os.getenv("AZURE_MANAGED_IDENTITY_CLIENT_ID")
+    if client_id:
+        return client_id
+    if _service_principal_configured() or _workload_identity_configured():
+        return None
+    return os.getenv("AZURE_CLIENT_ID") or None
+
+
+def _token_is_fresh(token: Any) -> bool:
+    return token is not None and token.expires_on - time.time() > TOKEN_REFRESH_MARGIN_SECONDS
+
+
+class CachedTokenCredential:
+    """
+    Serve each scope's access token from memory until it nears expiry.
+
+    Every SDK client sharing the credential reuses one token per scope, so the chain
+    (managed identity endpoint, `az` subprocess) is only walked on refresh. Requests
+    carrying claims or a tenant override always go to the wrapped credential.
+    """
+
+    def __init__(self, credential: Any):
+        self._credential = credential
+        self._tokens: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        if kwargs.get("claims") or kwargs.get("tenant_id"):
+            return self._credential.get_token(*scopes, **kwargs)
+        with self._lock:
+            token = self._tokens.get(scopes)
+            if not _token_is_fresh(token):
+                token = self._credential.get_token(*scopes, **kwargs)
+                self._tokens[scopes] = token
+            return token
+
+    def close(self) -> None:
+        self._credential.close()
+
+
+class AsyncCachedTokenCredential:
+    """Async counterpart of CachedTokenCredential for azure.identity.aio credentials"""
+
+    def __init__(self, credential: Any):
+        self._credential = credential
+        self._tokens: Dict[Tuple[str, ...], Any] = {}
+        self._lock = asyncio.Lock()
+
+    async def get_token(self, *scopes: str, **kwargs: Any) -> Any:
+        if kwargs.get("claims") or kwargs.get("tenant_id"):
+            return await self._credential.get_token(*scopes, **kwargs)
+        async with self._lock:
+            token = self._tokens.get(scopes)
+            if not _token_is_fresh(token):
+                token = await self._credential.get_token(*scopes, **kwargs)
+                self._tokens[scopes] = token
+            return token
+
+    async def close(self) -> None:
+        await self._credential.close()
+
+
+@functools.lru_cache(maxsize=None)
+def get_credential(use_async: bool = False) -> Any:
+    """Get the process-wide token-caching credential (one sync and one async instance)"""
+    if use_async:
+        return AsyncCachedTokenCredential(create_credential(use_async=True))
+    return CachedTokenCredential(create_credential())
+
+
+@functools.lru_cache(maxsize=1)
+def get_project_client() -> Any:
+    """Get the shared synchronous Azure AI Project client"""
+    from azure.ai.projects import AIProjectClient
+
+    return AIProjectClient(
+        endpoint=ENDPOINT,
+        resource_group_name=RESOURCE_GROUP,
+        subscription_id=SUBSCRIPTION_ID,
+        project_name=PROJECT_NAME,
+        credential=get_credential()
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_async_project_client() -> Any:
+    """Get the shared azure.ai.projects.aio client used by the standalone agents"""
+    from azure.ai.projects.aio import AIProjectClient
+
+    return AIProjectClient(
+        endpoint=ENDPOINT,
+        resource_group_name=RESOURCE_GROUP,
+        subscription_id=SUBSCRIPTION_ID,
+        project_name=PROJECT_NAME,
+        credential=get_credential(use_async=True)
+    )
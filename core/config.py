@@ -1,31 +1,46 @@
 # Configuration management for the fraud detection system
 
 import os
-from typing import Dict, Any
+import functools
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-def get_llm_config() -> Dict[str, Any]:
-    """Get AutoGen LLM configuration from environment variables"""
-    return {
-        "config_list": [{
+@functools.lru_cache(maxsize=1)
+def _llm_config_template() -> Mapping[str, Any]:
+    """Read the AutoGen LLM settings from the environment once"""
+    return MappingProxyType({
+        "config_list": (MappingProxyType({
             "model": os.getenv("AZURE_OPENAI_MODEL", "gpt-4o"),
             "api_type": "azure",
             "azure_endpoint": os.getenv("AZURE_OPENAI_ENDPOINT"),
             "api_key": os.getenv("AZURE_OPENAI_API_KEY"),
             "api_version": os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
-        }],
+        }),),
         "temperature": 0.1,
         "max_tokens": 1000,
         "timeout": 120
-    }
+    })
 
 
-def get_default_claim_data() -> Dict[str, Any]:
-    """Get default claim data - Single source of truth for claim information"""
-    return {
+def get_llm_config() -> Dict[str, Any]:
+    """
+    Get AutoGen LLM configuration from environment variables
+    
+    The environment is read once (see clear_config_cache); each call returns fresh
+    dicts, as AutoGen requires plain dicts and may modify them.
+    """
+    template = _llm_config_template()
+    return {**template, "config_list": [dict(entry) for entry in template["config_list"]]}
+
+
+@functools.lru_cache(maxsize=1)
+def _default_claim_template() -> Mapping[str, Any]:
+    """Build the default claim once"""
+    return MappingProxyType({
         "claim_id": "CLM001-2024-LAKSHMI",
         "patient_name": "Lakshmisrinivas T",
         "policy_number": "POL789456123",
@@ -34,12 +49,25 @@ def get_default_claim_data() -> Dict[str, Any]:
         "diagnosis": "Orthopedic surgery and rehabilitation",
         "treatment_type": "Orthopedic Surgery with post-operative care",
         "hospital_name": "Ramakrishna hospital, Bangalore",
-        "documents_available": ["medical_records", "x-ray", "bills", "discharge_summary", "lab_reports"],
+        "documents_available": ("medical_records", "x-ray", "bills", "discharge_summary", "lab_reports"),
         "policy_coverage_limit": 1000000.00,
         "previously_claimed_amount": 150000.00,
         "available_balance": 850000.00,
         "policy_year": "2024-2025"
-    }
+    })
+
+
+def get_default_claim_data() -> Dict[str, Any]:
+    """Get default claim data - Single source of truth for claim information"""
+    # Callers may modify the claim, so every call gets its own copy
+    template = _default_claim_template()
+    return {**template, "documents_available": list(template["documents_available"])}
+
+
+def clear_config_cache() -> None:
+    """Forget cached settings so the next call re-reads the environment"""
+    _llm_config_template.cache_clear()
+    _default_claim_template.cache_clear()
 
 
 # Policy exclusion keywords for analysis
@@ -6,6 +6,8 @@
 # 2. AutoGen Fraud Detection Prompts (for orchestrator.py)
 # 3. X-ray Grade Descriptions
 
+import functools
+from types import MappingProxyType
 from typing import Dict, Any
 
 # =============================================================================
@@ -17,73 +19,47 @@ AZURE_AGENT_INSTRUCTIONS = {
     
     # Medical Records Specialist - Used in workflow_manager.py and patientsummary.py
     "medical_specialist": (
-        "You are a MEDICAL RECORDS SPECIALIST in a shared claim processing workflow. "
-        "Work collaboratively with billing and exclusion specialists for comprehensive analysis. "
-        "\n\nYour role:"
-        "\n• Analyze medical consultation records and treatment histories"
-        "\n• Validate medical necessity and treatment appropriateness"
-        "\n• Review diagnostic reports, lab results, and imaging studies"
-        "\n• Assess pre-existing conditions and medical history continuity"
-        "\n• Evaluate treatment protocols and clinical guidelines compliance"
-        "\n• Provide medical validity assessment for insurance processing"
-        "\n\nProvide clinical analysis with proper medical terminology and evidence-based recommendations."
-        "\nFocus on medical necessity, treatment appropriateness, and documentation completeness."
-        "\nAlways cite specific medical records and policy sections when making recommendations."
+        "You are the MEDICAL RECORDS SPECIALIST in a shared claim workflow with billing and exclusion specialists."
+        "\nReview consultation records, treatment history, diagnostics, labs and imaging to assess:"
+        "\n- medical necessity and treatment appropriateness"
+        "\n- pre-existing conditions and history continuity"
+        "\n- compliance with clinical guidelines"
+        "\n- documentation completeness"
+        "\nGive an evidence-based clinical validity assessment in proper medical terminology, "
+        "citing the specific records and policy sections relied on."
     ),
     
     # Billing Specialist - Used in workflow_manager.py and bill.py
     "billing_specialist": (
-        "You are a MEDICAL INSURANCE BILLING SPECIALIST providing detailed authoritative medical billing and settlement guidance. "
-        "The index contains medical insurance policies, billing procedures, and settlement calculations. "
-        "\n\nYour role:"
-        "\n• Calculate final medical bill settlements and claim amounts"
-        "\n• Process co-payment, deductibles, and out-of-pocket expenses"
-        "\n• Determine eligible medical expenses and covered treatments"
-        "\n• Apply policy limits, sub-limits, and benefit restrictions"
-        "\n• Calculate room rent limits and ICU charges eligibility"
-        "\n• Process network vs non-network hospital billing differences"
-        "\n• Handle pre and post-hospitalization expense calculations"
-        "\n• Ensure accurate medical coding and billing compliance"
-        "\n• Generate final settlement statements and payment authorizations"
-        "\n\nAlways cite specific policy sections and provide itemized billing breakdowns with all amounts in Indian Rupees."
+        "You are the MEDICAL INSURANCE BILLING SPECIALIST. The index holds policies, billing procedures and settlement rules."
+        "\nCalculate the final settlement:"
+        "\n- eligible expenses and covered treatments"
+        "\n- co-payments, deductibles and out-of-pocket amounts"
+        "\n- policy limits and sub-limits, room rent and ICU eligibility"
+        "\n- network vs non-network differences, pre/post-hospitalization expenses"
+        "\n- coding and billing compliance"
+        "\nReturn an itemized breakdown in Indian Rupees and a settlement statement, citing policy sections."
     ),
     
     # Exclusions Specialist - Used in workflow_manager.py and claim.py
     "exclusions_specialist": (
-        "You are an EXCLUSIONS AND NON-MEDICAL LIST SUMMARY SPECIALIST providing clear, concise summaries of insurance policy exclusions and non-covered items. "
-        "The index contains policy exclusions, non-medical coverage lists, and coverage limitations. "
-        "\n\nYour role is to SUMMARIZE:"
-        "\n• Policy exclusions - what treatments, procedures, and conditions are NOT covered"
-        "\n• Non-medical list items - equipment, devices, and services excluded from coverage"
-        "\n• Coverage limitations - restrictions on benefits, amounts, and timeframes"
-        "\n• Pre-existing condition exclusions and waiting periods"
-        "\n• Experimental and investigational treatment exclusions"
-        "\n• Cosmetic and elective procedure exclusions"
-        "\n• Geographic and network limitations"
-        "\n• Age-related and lifestyle exclusions"
-        "\n• Alternative medicine and non-conventional treatment exclusions"
-        "\n• Occupational and work-related injury exclusions"
-        "\n\nProvide CLEAR SUMMARIES with:"
-        "\n• Bullet-pointed lists of excluded items"
-        "\n• Brief explanations of why items are excluded"
-        "\n• Policy section references where applicable"
-        "\n• Organized by category (medical exclusions, equipment exclusions, etc.)"
-        "\n\nKeep summaries concise, well-organized, and easy to understand for quick reference."
+        "You are the EXCLUSIONS SPECIALIST. The index holds policy exclusions, non-medical lists and coverage limits."
+        "\nSummarize what is NOT covered, grouped by category:"
+        "\n- excluded treatments, procedures and conditions"
+        "\n- non-medical items: equipment, devices, services"
+        "\n- limits on benefits, amounts and timeframes; waiting periods for pre-existing conditions"
+        "\n- experimental, cosmetic/elective, alternative-medicine, occupational, age/lifestyle and geographic/network exclusions"
+        "\nUse concise bullets, one-line reasons and policy section references."
     ),
     
     # Claim Coordinator - Used in workflow_manager.py
     "claim_coordinator": (
-        "You are a CLAIM PROCESSING COORDINATOR overseeing the complete claim workflow. "
-        "Synthesize information from billing, medical, exclusions, and imaging specialists. "
-        "\n\nYour role:"
-        "\n• Coordinate information from all specialist agents"
-        "\n• Generate comprehensive claim status reports"
-        "\n• Make final claim recommendations (approve/reject/pending)"
-        "\n• Calculate final approved amounts based on all analyses"
-        "\n• Identify any missing information or additional requirements"
-        "\n• Provide clear, actionable claim decisions with detailed justifications"
-        "\n\nGenerate structured final reports with clear claim status, amounts, and reasoning."
-        "\nConsider all specialist inputs and provide balanced, evidence-based decisions."
+        "You are the CLAIM PROCESSING COORDINATOR. Synthesize the billing, medical, exclusions and imaging specialists' findings."
+        "\nProduce a structured final report with:"
+        "\n- decision: approve/reject/pending, with justification"
+        "\n- final approved amount"
+        "\n- missing information or additional requirements"
+        "\nWeigh all specialist inputs and keep the decision evidence-based."
     ),
 }
 
@@ -93,9 +69,21 @@ AZURE_AGENT_INSTRUCTIONS = {
 # Used by: orchestrator.py via services/agent_factory.py
 # =============================================================================
 
-def get_fraud_specialist_prompt(medical_evidence: str, billing_evidence: str, xray_evidence: str) -> str:
-    """Get prompt for Fraud Detection Specialist agent"""
-    return f"""You are a SENIOR FRAUD DETECTION SPECIALIST.
+def _cacheable_messages(static_prefix: str, context: str) -> Dict[str, Any]:
+    """
+    Split a prompt into a provider-cacheable system block and a per-claim user block.
+
+    Returns Anthropic-shaped request fields: the static role block carries an ephemeral
+    cache_control breakpoint, and the claim-specific context follows as the user message.
+    OpenAI-compatible endpoints cache the same byte-identical prefix automatically.
+    """
+    return {
+        "system": [{"type": "text", "text": static_prefix, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": [{"type": "text", "text": context}]}],
+    }
+
+
+_FRAUD_SPECIALIST_PREFIX = """You are a SENIOR FRAUD DETECTION SPECIALIST.
 
 EXCLUSIVE FOCUS: IDENTITY VERIFICATION AND DOCUMENT AUTHENTICITY
 
@@ -105,17 +93,6 @@ YOUR ONLY TASK:
 3. CLAIM ID CONSISTENCY: Verify claim ID matches patient identity
 4. SIGNATURE/STAMP VERIFICATION: Check hospital stamps, doctor signatures, official seals
 
-EVIDENCE AVAILABLE FOR ANALYSIS:
-
-MEDICAL EVIDENCE:
-{medical_evidence}
-
-BILLING EVIDENCE:
-{billing_evidence}
-
-X-RAY EVIDENCE:
-{xray_evidence}
-
 CRITICAL FRAUD INDICATORS YOU MUST CHECK:
 ❌ Patient name inconsistencies across documents
 ❌ Forged or altered documents
@@ -129,12 +106,49 @@ ONLY FOCUS ON: Identity fraud and document forgery
 REQUIRED OUTPUT FORMAT:
 IDENTITY_FRAUD_RISK: HIGH/MEDIUM/LOW
 DOCUMENT_AUTHENTICITY: AUTHENTIC/SUSPICIOUS/FORGED
-SPECIFIC_FINDINGS: [List any identity or document issues found]"""
+SPECIFIC_FINDINGS: [List any identity or document issues found]
 
+"""
 
-def get_medical_validator_prompt(medical_evidence: str, xray_evidence: str) -> str:
-    """Get prompt for Medical Validator agent"""
-    return f"""You are a MEDICAL VALIDATION SPECIALIST for fraud detection.
+
+_FRAUD_SPECIALIST_CONTEXT = """EVIDENCE AVAILABLE FOR ANALYSIS:
+
+MEDICAL EVIDENCE:
+{medical_evidence}
+
+BILLING EVIDENCE:
+{billing_evidence}
+
+X-RAY EVIDENCE:
+{xray_evidence}"""
+
+
+def _fraud_specialist_context(medical_evidence: str, billing_evidence: str, xray_evidence: str) -> str:
+    """Claim-specific part of the Fraud Detection Specialist prompt"""
+    return _FRAUD_SPECIALIST_CONTEXT.format(
+        medical_evidence=medical_evidence,
+        billing_evidence=billing_evidence,
+        xray_evidence=xray_evidence
+    )
+
+
+def get_fraud_specialist_prompt(medical_evidence: str, billing_evidence: str, xray_evidence: str) -> str:
+    """Get prompt for Fraud Detection Specialist agent"""
+    return _FRAUD_SPECIALIST_PREFIX + _fraud_specialist_context(
+        medical_evidence, billing_evidence, xray_evidence
+    )
+
+
+def get_fraud_specialist_messages(
+    medical_evidence: str, billing_evidence: str, xray_evidence: str
+) -> Dict[str, Any]:
+    """Get the Fraud Detection Specialist prompt as cacheable system and user blocks"""
+    return _cacheable_messages(
+        _FRAUD_SPECIALIST_PREFIX, _fraud_specialist_context(medical_evidence, billing_evidence, xray_evidence)
+    )
+
+
+_MEDICAL_VALIDATOR_PREFIX = """You are a MEDICAL VALIDATION SPECIALIST for fraud detection.
 
 EXCLUSIVE FOCUS: MEDICAL CONSISTENCY AND CLINICAL APPROPRIATENESS
 
@@ -145,14 +159,6 @@ YOUR ONLY TASK:
 4. MEDICAL NECESSITY: Is the surgery medically necessary or elective/cosmetic?
 5. CLINICAL TIMELINE: Do surgery dates align with medical progression?
 
-EVIDENCE AVAILABLE FOR ANALYSIS:
-
-MEDICAL EVIDENCE:
-{medical_evidence}
-
-X-RAY EVIDENCE:
-{xray_evidence}
-
 MEDICAL RED FLAGS YOU MUST CHECK:
 🔍 Diagnosis doesn't match X-ray findings
 🔍 Surgery inappropriate for patient's actual condition
@@ -168,12 +174,36 @@ MEDICAL_CONSISTENCY: CONSISTENT/INCONSISTENT/SUSPICIOUS
 TREATMENT_APPROPRIATENESS: APPROPRIATE/INAPPROPRIATE/QUESTIONABLE
 IMAGING_DIAGNOSIS_MATCH: MATCHES/CONFLICTS/UNCLEAR
 MEDICAL_NECESSITY: NECESSARY/ELECTIVE/COSMETIC
-SPECIFIC_MEDICAL_CONCERNS: [List any medical inconsistencies found]"""
+SPECIFIC_MEDICAL_CONCERNS: [List any medical inconsistencies found]
 
+"""
+
+
+_MEDICAL_VALIDATOR_CONTEXT = """EVIDENCE AVAILABLE FOR ANALYSIS:
+
+MEDICAL EVIDENCE:
+{medical_evidence}
+
+X-RAY EVIDENCE:
+{xray_evidence}"""
 
-def get_billing_validator_prompt(billing_evidence: str) -> str:
-    """Get prompt for Billing Fraud Validator agent"""
-    return f"""You are a BILLING FRAUD DETECTION SPECIALIST.
+
+def _medical_validator_context(medical_evidence: str, xray_evidence: str) -> str:
+    """Claim-specific part of the Medical Validator prompt"""
+    return _MEDICAL_VALIDATOR_CONTEXT.format(medical_evidence=medical_evidence, xray_evidence=xray_evidence)
+
+
+def get_medical_validator_prompt(medical_evidence: str, xray_evidence: str) -> str:
+    """Get prompt for Medical Validator agent"""
+    return _MEDICAL_VALIDATOR_PREFIX + _medical_validator_context(medical_evidence, xray_evidence)
+
+
+def get_medical_validator_messages(medical_evidence: str, xray_evidence: str) -> Dict[str, Any]:
+    """Get the Medical Validator prompt as cacheable system and user blocks"""
+    return _cacheable_messages(_MEDICAL_VALIDATOR_PREFIX, _medical_validator_context(medical_evidence, xray_evidence))
+
+
+_BILLING_VALIDATOR_PREFIX = """You are a BILLING FRAUD DETECTION SPECIALIST.
 
 EXCLUSIVE FOCUS: BILLING ACCURACY AND CHARGE VALIDATION
 
@@ -185,9 +215,6 @@ YOUR ONLY TASK:
 5. DATE CONSISTENCY: Do billing dates align with treatment timeline?
 6. PROCEDURE CODE VALIDATION: Do billed procedures match what was actually performed?
 
-BILLING EVIDENCE FOR ANALYSIS:
-{billing_evidence}
-
 BILLING FRAUD INDICATORS YOU MUST CHECK:
 💰 Total claimed amount ≠ sum of itemized bills
 💰 Same service charged multiple times
@@ -205,16 +232,31 @@ DUPLICATE_CHARGES: NONE/DETECTED/SUSPICIOUS
 CHARGE_INFLATION: NORMAL/INFLATED/EXCESSIVE
 BILL_CONSISTENCY: CONSISTENT/INCONSISTENT
 AMOUNT_DISCREPANCY: ₹[amount] (if any difference found)
-SPECIFIC_BILLING_ISSUES: [List any billing fraud indicators found]"""
+SPECIFIC_BILLING_ISSUES: [List any billing fraud indicators found]
 
+"""
 
-def get_policy_balance_validator_prompt(claim: Dict[str, Any], policy_coverage_evidence: str) -> str:
-    """Get prompt for Policy Balance Validator agent"""
-    balance_after = claim.get('available_balance', 0) - claim.get('claim_amount', 0)
-    policy_limit = claim.get('policy_coverage_limit', 1)
-    utilization = ((claim.get('previously_claimed_amount', 0) + claim.get('claim_amount', 0)) / policy_limit) * 100
-    
-    return f"""You are a POLICY BALANCE VALIDATION SPECIALIST.
+
+_BILLING_VALIDATOR_CONTEXT = """BILLING EVIDENCE FOR ANALYSIS:
+{billing_evidence}"""
+
+
+def _billing_validator_context(billing_evidence: str) -> str:
+    """Claim-specific part of the Billing Fraud Validator prompt"""
+    return _BILLING_VALIDATOR_CONTEXT.format(billing_evidence=billing_evidence)
+
+
+def get_billing_validator_prompt(billing_evidence: str) -> str:
+    """Get prompt for Billing Fraud Validator agent"""
+    return _BILLING_VALIDATOR_PREFIX + _billing_validator_context(billing_evidence)
+
+
+def get_billing_validator_messages(billing_evidence: str) -> Dict[str, Any]:
+    """Get the Billing Fraud Validator prompt as cacheable system and user blocks"""
+    return _cacheable_messages(_BILLING_VALIDATOR_PREFIX, _billing_validator_context(billing_evidence))
+
+
+_POLICY_BALANCE_VALIDATOR_PREFIX = """You are a POLICY BALANCE VALIDATION SPECIALIST.
 
 EXCLUSIVE FOCUS: POLICY BALANCE AND LIMIT VALIDATION
 
@@ -225,17 +267,6 @@ YOUR ONLY TASK:
 4. PREVIOUS CLAIMS VERIFICATION: Are previous claims accurate?
 5. BALANCE CALCULATION: Verify remaining balance after this claim
 
-CLAIM INFORMATION:
-- Current Available Balance: ₹{claim.get('available_balance', 0):,.2f}
-- Claim Amount: ₹{claim.get('claim_amount', 0):,.2f}
-- Balance After Claim: ₹{balance_after:,.2f}
-- Policy Coverage Limit: ₹{policy_limit:,.2f}
-- Previously Claimed: ₹{claim.get('previously_claimed_amount', 0):,.2f}
-- Utilization Rate: {utilization:.1f}%
-
-POLICY COVERAGE EVIDENCE:
-{policy_coverage_evidence}
-
 BALANCE ISSUES YOU MUST CHECK:
 🛡️ Claim amount > available balance
 🛡️ Exceeds sub-limits for specific procedures
@@ -248,35 +279,79 @@ ONLY FOCUS ON: Balance sufficiency and policy limit compliance
 REQUIRED OUTPUT FORMAT:
 BALANCE_STATUS: SUFFICIENT/INSUFFICIENT/EXCEEDED
 LIMIT_COMPLIANCE: COMPLIANT/VIOLATION/BORDERLINE
-UTILIZATION_RISK: LOW/MEDIUM/HIGH ({utilization:.1f}%)
-REMAINING_BALANCE: ₹{balance_after:,.2f}
-BALANCE_CONCERNS: [List any balance or limit issues found]"""
+UTILIZATION_RISK: LOW/MEDIUM/HIGH ([utilization rate from CLAIM_CONTEXT]%)
+REMAINING_BALANCE: ₹[balance after claim from CLAIM_CONTEXT]
+BALANCE_CONCERNS: [List any balance or limit issues found]
 
+"""
 
-def get_coverage_exclusions_validator_prompt(exclusions_evidence: str, exclusions_analysis: Dict[str, Any]) -> str:
-    """Get prompt for Coverage Exclusions Validator agent"""
-    potential = exclusions_analysis.get('potential_exclusions', [])
-    concerns = exclusions_analysis.get('coverage_concerns', [])
-    
-    return f"""You are a POLICY COVERAGE AND EXCLUSIONS VALIDATION SPECIALIST.
+
+_POLICY_BALANCE_VALIDATOR_CONTEXT = """CLAIM_CONTEXT:
+- Current Available Balance: ₹{available_balance:,.2f}
+- Claim Amount: ₹{claim_amount:,.2f}
+- Balance After Claim: ₹{balance_after:,.2f}
+- Policy Coverage Limit: ₹{policy_limit:,.2f}
+- Previously Claimed: ₹{previously_claimed_amount:,.2f}
+- Utilization Rate: {utilization:.1f}%
+
+POLICY COVERAGE EVIDENCE:
+{policy_coverage_evidence}"""
+
+
+def _policy_balance_validator_context(claim: Dict[str, Any], policy_coverage_evidence: str) -> str:
+    """Claim-specific part of the Policy Balance Validator prompt"""
+    return _cached_policy_balance_validator_context(
+        claim.get('available_balance', 0),
+        claim.get('claim_amount', 0),
+        claim.get('policy_coverage_limit', 1),
+        claim.get('previously_claimed_amount', 0),
+        policy_coverage_evidence
+    )
+
+
+# Keyed on the claim fields the prompt uses, so retries and reruns of a claim reuse the text
+@functools.lru_cache(maxsize=256)
+def _cached_policy_balance_validator_context(
+    available_balance: float, claim_amount: float, policy_limit: float, previously_claimed: float,
+    policy_coverage_evidence: str
+) -> str:
+    return _POLICY_BALANCE_VALIDATOR_CONTEXT.format(
+        available_balance=available_balance,
+        claim_amount=claim_amount,
+        balance_after=available_balance - claim_amount,
+        policy_limit=policy_limit,
+        previously_claimed_amount=previously_claimed,
+        utilization=((previously_claimed + claim_amount) / policy_limit) * 100,
+        policy_coverage_evidence=policy_coverage_evidence
+    )
+
+
+def get_policy_balance_validator_prompt(claim: Dict[str, Any], policy_coverage_evidence: str) -> str:
+    """Get prompt for Policy Balance Validator agent"""
+    return _POLICY_BALANCE_VALIDATOR_PREFIX + _policy_balance_validator_context(
+        claim, policy_coverage_evidence
+    )
+
+
+def get_policy_balance_validator_messages(claim: Dict[str, Any], policy_coverage_evidence: str) -> Dict[str, Any]:
+    """Get the Policy Balance Validator prompt as cacheable system and user blocks"""
+    return _cacheable_messages(
+        _POLICY_BALANCE_VALIDATOR_PREFIX, _policy_balance_validator_context(claim, policy_coverage_evidence)
+    )
+
+
+_COVERAGE_EXCLUSIONS_VALIDATOR_PREFIX = """You are a POLICY COVERAGE AND EXCLUSIONS VALIDATION SPECIALIST.
 
 EXCLUSIVE FOCUS: POLICY EXCLUSIONS AND ITEM-LEVEL COVERAGE
 
 COMMON POLICY EXCLUSIONS TO CHECK:
 🚫 WALKER/MOBILITY AIDS - Check if excluded
-🚫 KNEE BRACE/SUPPORTS - Check if excluded  
+🚫 KNEE BRACE/SUPPORTS - Check if excluded
 🚫 DIETARY SERVICES - Check if excluded
 🚫 CONSUMABLES - Check if excluded
 🚫 EQUIPMENT RENTALS - Check if excluded
 🚫 PRE-EXISTING CONDITIONS - Check waiting periods
 
-EXCLUSIONS EVIDENCE:
-{exclusions_evidence}
-
-ANALYSIS FLAGS:
-- Potential Exclusions: {len(potential)} items identified
-- Coverage Concerns: {len(concerns)} concerns identified
-
 YOUR ONLY TASK:
 1. FIND EXCLUDED ITEMS: Identify exact amounts for excluded items in bills
 2. CALCULATE DEDUCTIONS: Calculate total amount to be deducted
@@ -290,27 +365,68 @@ EXCLUSIONS_FOUND: YES/NO
 EXCLUDED_ITEMS: [List items with amounts]
 TOTAL_DEDUCTIONS: ₹[amount]
 ADJUSTED_CLAIM_AMOUNT: ₹[amount after deductions]
-EXCLUSION_SUMMARY: [Summary of all exclusions applied]"""
+EXCLUSION_SUMMARY: [Summary of all exclusions applied]
 
+"""
 
-def get_fraud_coordinator_prompt(claim: Dict[str, Any]) -> str:
-    """Get prompt for Fraud Decision Coordinator agent"""
-    return f"""You are the FINAL FRAUD DECISION AUTHORITY for claim {claim.get('claim_id', 'UNKNOWN')}.
+
+_COVERAGE_EXCLUSIONS_VALIDATOR_CONTEXT = """CLAIM_CONTEXT:
+ANALYSIS FLAGS:
+- Potential Exclusions: {potential_count} items identified
+- Coverage Concerns: {concern_count} concerns identified
+
+EXCLUSIONS EVIDENCE:
+{exclusions_evidence}"""
+
+
+def _coverage_exclusions_validator_context(exclusions_evidence: str, exclusions_analysis: Dict[str, Any]) -> str:
+    """Claim-specific part of the Coverage Exclusions Validator prompt"""
+    return _cached_coverage_exclusions_validator_context(
+        len(exclusions_analysis.get('potential_exclusions', [])),
+        len(exclusions_analysis.get('coverage_concerns', [])),
+        exclusions_evidence
+    )
+
+
+# Only the counts of the analysis lists appear in the prompt, so they are the cache key
+@functools.lru_cache(maxsize=256)
+def _cached_coverage_exclusions_validator_context(
+    potential_count: int, concern_count: int, exclusions_evidence: str
+) -> str:
+    return _COVERAGE_EXCLUSIONS_VALIDATOR_CONTEXT.format(
+        potential_count=potential_count,
+        concern_count=concern_count,
+        exclusions_evidence=exclusions_evidence
+    )
+
+
+def get_coverage_exclusions_validator_prompt(exclusions_evidence: str, exclusions_analysis: Dict[str, Any]) -> str:
+    """Get prompt for Coverage Exclusions Validator agent"""
+    return _COVERAGE_EXCLUSIONS_VALIDATOR_PREFIX + _coverage_exclusions_validator_context(
+        exclusions_evidence, exclusions_analysis
+    )
+
+
+def get_coverage_exclusions_validator_messages(
+    exclusions_evidence: str, exclusions_analysis: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Get the Coverage Exclusions Validator prompt as cacheable system and user blocks"""
+    return _cacheable_messages(
+        _COVERAGE_EXCLUSIONS_VALIDATOR_PREFIX,
+        _coverage_exclusions_validator_context(exclusions_evidence, exclusions_analysis)
+    )
+
+
+_FRAUD_COORDINATOR_PREFIX = """You are the FINAL FRAUD DECISION AUTHORITY for the claim described in CLAIM_CONTEXT below.
 
 EXCLUSIVE ROLE: SYNTHESIZE ALL AGENT FINDINGS AND MAKE FINAL DECISION
 
 YOUR ONLY TASK:
 Wait for ALL 5 specialist agents to provide their findings, then synthesize into final decision.
 
-CLAIM DETAILS:
-- Claim ID: {claim.get('claim_id', 'UNKNOWN')}
-- Patient: {claim.get('patient_name', 'UNKNOWN')}
-- Claim Amount: ₹{claim.get('claim_amount', 0):,.2f}
-- Available Balance: ₹{claim.get('available_balance', 0):,.2f}
-
 AGENTS YOU MUST WAIT FOR:
 1. Fraud_Detection_Specialist: Identity and document authenticity findings
-2. Medical_Consistency_Validator: Medical consistency and appropriateness findings  
+2. Medical_Consistency_Validator: Medical consistency and appropriateness findings
 3. Billing_Analysis_Validator: Billing accuracy and duplicate charge findings
 4. Policy_Balance_Validator: Balance sufficiency and limit compliance findings
 5. Coverage_Exclusions_Validator: Exclusions and deduction calculations
@@ -318,7 +434,7 @@ AGENTS YOU MUST WAIT FOR:
 SYNTHESIS PROTOCOL:
 - Collect findings from each specialist agent
 - If ANY agent finds HIGH risk or violations → REJECT
-- If exclusions found → APPROVE with deductions  
+- If exclusions found → APPROVE with deductions
 - If no issues found → APPROVE full amount
 
 REQUIRED OUTPUT FORMAT (EXACTLY AS SHOWN):
@@ -336,13 +452,42 @@ REQUIRED OUTPUT FORMAT (EXACTLY AS SHOWN):
 
 DECISION LOGIC:
 - If identity/document fraud found → REJECT (₹0)
-- If medical inconsistencies found → REJECT (₹0)  
+- If medical inconsistencies found → REJECT (₹0)
 - If billing fraud found → REJECT (₹0)
 - If insufficient balance → REJECT (₹0)
 - If exclusions found but otherwise valid → APPROVE with deductions
 - If no issues found → APPROVE full amount
 
-WAIT FOR ALL AGENTS BEFORE DECIDING."""
+WAIT FOR ALL AGENTS BEFORE DECIDING.
+
+"""
+
+
+_FRAUD_COORDINATOR_CONTEXT = """CLAIM_CONTEXT:
+- Claim ID: {claim_id}
+- Patient: {patient_name}
+- Claim Amount: ₹{claim_amount:,.2f}
+- Available Balance: ₹{available_balance:,.2f}"""
+
+
+def _fraud_coordinator_context(claim: Dict[str, Any]) -> str:
+    """Claim-specific part of the Fraud Decision Coordinator prompt"""
+    return _FRAUD_COORDINATOR_CONTEXT.format(
+        claim_id=claim.get('claim_id', 'UNKNOWN'),
+        patient_name=claim.get('patient_name', 'UNKNOWN'),
+        claim_amount=claim.get('claim_amount', 0),
+        available_balance=claim.get('available_balance', 0)
+    )
+
+
+def get_fraud_coordinator_prompt(claim: Dict[str, Any]) -> str:
+    """Get prompt for Fraud Decision Coordinator agent"""
+    return _FRAUD_COORDINATOR_PREFIX + _fraud_coordinator_context(claim)
+
+
+def get_fraud_coordinator_messages(claim: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the Fraud Decision Coordinator prompt as cacheable system and user blocks"""
+    return _cacheable_messages(_FRAUD_COORDINATOR_PREFIX, _fraud_coordinator_context(claim))
 
 
 # =============================================================================
@@ -358,18 +503,27 @@ XRAY_GRADE_DESCRIPTIONS = {
     "Grade 4": "Large osteophytes, significant joint narrowing, and severe sclerosis"
 }
 
+# Lowercased grade names for the exact-match fast path in get_xray_grade_description()
+_XRAY_GRADE_DESCRIPTIONS_BY_NAME = {grade.lower(): description for grade, description in XRAY_GRADE_DESCRIPTIONS.items()}
+
 
 # =============================================================================
 # SEARCH FIELD MAPPINGS
 # Used by: workflow_manager.py, agents/*.py
 # =============================================================================
 
-SEARCH_FIELD_MAPPINGS = {
+# Read-only: shared by every agent module, so callers must copy before modifying
+SEARCH_FIELD_MAPPINGS = MappingProxyType({
     "content": "content",
-    "title": "document_title", 
+    "title": "document_title",
     "source": "document_path",
     "claim_type": "claim_category"
-}
+})
+
+# Index field name -> logical field name
+SEARCH_FIELD_MAPPINGS_REVERSE = MappingProxyType({
+    index_field: name for name, index_field in SEARCH_FIELD_MAPPINGS.items()
+})
 
 
 # =============================================================================
@@ -400,7 +554,14 @@ def get_xray_grade_description(grade_name: str) -> str:
     Returns:
         Grade description string
     """
-    for grade, description in XRAY_GRADE_DESCRIPTIONS.items():
-        if grade.lower() in grade_name.lower() or grade_name.lower() in grade.lower():
-            return description
-    return "Unknown grade classification"
+    name = grade_name.strip().lower()
+    description = _XRAY_GRADE_DESCRIPTIONS_BY_NAME.get(name)
+    if description is not None:
+        return description
+
+    # Fall back to substring matching for tags like "grade 2 - minimal"
+    return next(
+        (description for grade, description in _XRAY_GRADE_DESCRIPTIONS_BY_NAME.items()
+         if grade in name or name in grade),
+        "Unknown grade classification"
+    )
@@ -1,12 +1,30 @@
 # Data models for the fraud detection system
 
+import sys
 from dataclasses import dataclass, field
-from typing import Dict, Any, List, Optional
-from datetime import datetime
-from enum import Enum
+from typing import Dict, Any, List, Optional, Tuple
+from enum import StrEnum
 
 
-class ClaimStatus(Enum):
+def _now_iso() -> str:
+    """Default factory for creation/completion timestamps"""
+    # Imported on first use so importing the models does not load datetime
+    from datetime import datetime
+    return datetime.now().isoformat()
+
+
+def _intern_fields(instance: Any, names: Tuple[str, ...]) -> None:
+    """
+    Intern small closed-set string fields (risk levels, statuses) parsed from LLM output,
+    so instances share one string object per value and == against literals is an identity hit.
+    """
+    for name in names:
+        value = getattr(instance, name)
+        if type(value) is str:
+            setattr(instance, name, sys.intern(value))
+
+
+class ClaimStatus(StrEnum):
     """Claim processing status enumeration"""
     INITIATED = "initiated"
     UNDER_REVIEW = "under_review"
@@ -20,7 +38,7 @@ class ClaimStatus(Enum):
     COMPLETED = "completed"
 
 
-@dataclass
+@dataclass(slots=True)
 class ClaimData:
     """Data structure for claim information"""
     claim_id: str
@@ -33,14 +51,10 @@ class ClaimData:
     hospital_name: str
     documents_available: List[str]
     status: ClaimStatus = ClaimStatus.INITIATED
-    created_at: str = None
-    
-    def __post_init__(self):
-        if self.created_at is None:
-            self.created_at = datetime.now().isoformat()
+    created_at: str = field(default_factory=_now_iso)
 
 
-@dataclass
+@dataclass(slots=True)
 class FraudIndicator:
     """Class to represent a fraud indicator"""
     fraud_type: str
@@ -48,8 +62,11 @@ class FraudIndicator:
     description: str
     evidence: Dict[str, Any] = field(default_factory=dict)
 
+    def __post_init__(self):
+        _intern_fields(self, ("severity",))
 
-@dataclass
+
+@dataclass(slots=True)
 class ClaimValidationResult:
     """Result of comprehensive claim validation"""
     is_consistent: bool = True
@@ -61,7 +78,7 @@ class ClaimValidationResult:
     confidence_score: float = 0.0
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentResult:
     """Result from an individual agent"""
     agent_name: str
@@ -70,14 +87,10 @@ class AgentResult:
     recommendations: List[str]
     findings: Dict[str, Any]
     processing_time: float
-    timestamp: str = None
-    
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now().isoformat()
+    timestamp: str = field(default_factory=_now_iso)
 
 
-@dataclass
+@dataclass(slots=True)
 class WorkflowResult:
     """Complete workflow processing result"""
     claim_id: str
@@ -87,14 +100,10 @@ class WorkflowResult:
     agent_results: List[AgentResult]
     final_report: str
     recommendations: List[str]
-    completed_at: str = None
-    
-    def __post_init__(self):
-        if self.completed_at is None:
-            self.completed_at = datetime.now().isoformat()
+    completed_at: str = field(default_factory=_now_iso)
 
 
-@dataclass
+@dataclass(slots=True)
 class FraudDecision:
     """Final fraud detection decision"""
     decision: str  # APPROVED, REJECTED, ORCHESTRATION_FAILED
@@ -110,3 +119,9 @@ class FraudDecision:
     rationale: str = ""
     conversation_length: int = 0
     decision_source: str = ""
+
+    def __post_init__(self):
+        _intern_fields(self, (
+            "decision", "fraud_risk_level", "coverage_risk_level",
+            "coverage_assessment", "balance_status", "exclusions_applicable"
+        ))
@@ -0,0 +1,60 @@
+# Retry and concurrency helpers for Azure control-plane calls
+#
+# Azure AI Search returns 503 and the agent service returns 429 under load; both are
+# transient and should cost a short, jittered wait rather than a failed pipeline.
+
+import os
+import asyncio
+from weakref import WeakKeyDictionary
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_random_exponential
+from azure.core.exceptions import HttpResponseError, ServiceRequestError
+
+# Status codes worth retrying: timeouts, throttling and transient server errors
+TRANSIENT_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Upper bound on agent runs in flight at once, to stay under the service's dynamic throttle
+MAX_CONCURRENT_AGENT_RUNS = int(os.getenv("AZURE_MAX_CONCURRENT_RUNS", "4"))
+
+
+def is_transient_azure_error(error: BaseException) -> bool:
+    """Check whether an Azure SDK error is worth retrying"""
+    if isinstance(error, ServiceRequestError):
+        return True
+    return isinstance(error, HttpResponseError) and error.status_code in TRANSIENT_STATUS_CODES
+
+
+# Decorator for sync or async callables: up to 6 attempts, jittered exponential wait capped at 30s
+azure_retry = retry(
+    wait=wait_random_exponential(multiplier=0.5, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception(is_transient_azure_error),
+    reraise=True
+)
+
+
+def is_throttled_azure_error(error: BaseException) -> bool:
+    """Check whether an Azure SDK error is a 429, i.e. the request was rejected before executing"""
+    return isinstance(error, HttpResponseError) and error.status_code == 429
+
+
+# Decorator for non-idempotent writes (e.g. Cosmos DB patch appends): only throttled requests
+# are retried, since a timed-out or 5xx request may already have been applied
+azure_throttle_retry = retry(
+    wait=wait_random_exponential(multiplier=0.5, max=30),
+    stop=stop_after_attempt(6),
+    retry=retry_if_exception(is_throttled_azure_error),
+    reraise=True
+)
+
+# One gate per event loop: a semaphore is bound to the loop it is first awaited on, and
+# entries go away with their loop (e.g. between asyncio.run calls)
+_agent_run_slots: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+
+def agent_run_slots() -> asyncio.Semaphore:
+    """Get the running loop's gate for concurrent agent runs (use with `async with agent_run_slots():`)"""
+    loop = asyncio.get_running_loop()
+    slots = _agent_run_slots.get(loop)
+    if slots is None:
+        slots = _agent_run_slots[loop] = asyncio.Semaphore(MAX_CONCURRENT_AGENT_RUNS)
+    return slots
@@ -0,0 +1,191 @@
+# Two-tier response cache for Azure AI agent runs
+#
+# 1. Exact tier: sha256(index version + namespace + query) -> answer, persisted with
+#    diskcache when installed; entries expire after RESPONSE_CACHE_TTL_SECONDS
+# 2. Semantic tier: cosine similarity between query embeddings, answered when above threshold;
+#    a ring buffer of the last SEMANTIC_CACHE_MAXSIZE queries
+#
+# The same cache also backs the retrieval tier: query -> Azure AI Search hits returned by
+# the agent's search tool, replayed for similar queries so the search call can be skipped.
+
+import os
+import time
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional
+from dotenv import load_dotenv
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+try:
+    from openai import AzureOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+load_dotenv()
+
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", ".cache/responses")
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+# Looser than the answer threshold: similar queries retrieve overlapping documents even
+# when the answers they need differ
+RETRIEVAL_CACHE_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_THRESHOLD", "0.90"))
+EMBEDDING_MODEL = os.getenv("AZURE_OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+# Exact-tier entries expire after this many seconds (0 keeps them until evicted)
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+# Part of every cache key; bump it after re-indexing so answers from the old documents are not served
+SEARCH_INDEX_VERSION = os.getenv("SEARCH_INDEX_VERSION", "1")
+# Queries kept per namespace in the semantic tier; the oldest is overwritten once full
+SEMANTIC_CACHE_MAXSIZE = max(1, int(os.getenv("SEMANTIC_CACHE_MAXSIZE", "1024")))
+
+
+class ResponseCache:
+    """Exact-match and embedding-similarity cache for agent responses"""
+
+    def __init__(
+        self,
+        namespace: str,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD
+    ):
+        self.namespace = namespace
+        self.embed_fn = embed_fn if NUMPY_AVAILABLE else None
+        self.threshold = threshold
+        self._exact = diskcache.Cache(RESPONSE_CACHE_DIR) if DISKCACHE_AVAILABLE else {}
+        self._embeddings: "OrderedDict[str, Any]" = OrderedDict()
+        # Ring buffer: row i of _vectors is the embedding of the query answered by _answers[i]
+        self._vectors = None
+        self._answers: List[str] = []
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+    def get(self, query: str, semantic: bool = True) -> Optional[str]:
+        """
+        Get a cached answer for the query, or None on a miss.
+
+        Pass semantic=False for free-form queries that embed per-patient details: queries
+        differing only in a name or ID score far above the threshold and must never share answers.
+        """
+        answer = self._get_exact(self._key(query))
+        if answer is not None or self.embed_fn is None or not semantic or not self._answers:
+            return answer
+
+        try:
+            vector = self._embed(query)
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup skipped: {e}")
+            return None
+        with self._lock:
+            scores = self._vectors[:len(self._answers)] @ vector
+            best = int(np.argmax(scores))
+            return self._answers[best] if scores[best] >= self.threshold else None
+
+    def put(self, query: str, answer: str, semantic: bool = True) -> None:
+        """Store an answer for the query in both tiers (exact tier only when semantic=False)"""
+        self._set_exact(self._key(query), answer)
+        if self.embed_fn is None or not semantic:
+            return
+
+        try:
+            vector = self._embed(query)
+        except Exception as e:
+            print(f"⚠️ Semantic cache store skipped: {e}")
+            return
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((SEMANTIC_CACHE_MAXSIZE, vector.shape[0]), dtype=np.float32)
+            slot = self._next_slot
+            self._vectors[slot] = vector
+            if slot < len(self._answers):
+                self._answers[slot] = answer
+            else:
+                self._answers.append(answer)
+            self._next_slot = (slot + 1) % SEMANTIC_CACHE_MAXSIZE
+
+    def _key(self, query: str) -> str:
+        key = f"{SEARCH_INDEX_VERSION}\x00{self.namespace}\x00{query}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _get_exact(self, key: str) -> Optional[str]:
+        if DISKCACHE_AVAILABLE:
+            return self._exact.get(key)
+        entry = self._exact.get(key)
+        if entry is None:
+            return None
+        expires_at, answer = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._exact.pop(key, None)
+            return None
+        return answer
+
+    def _set_exact(self, key: str, answer: str) -> None:
+        ttl = RESPONSE_CACHE_TTL_SECONDS or None
+        if DISKCACHE_AVAILABLE:
+            self._exact.set(key, answer, expire=ttl)
+        else:
+            self._exact[key] = (time.monotonic() + ttl if ttl else None, answer)
+
+    def _embed(self, query: str):
+        """Embed and L2-normalize the query so a dot product is the cosine similarity"""
+        with self._lock:
+            vector = self._embeddings.get(query)
+            if vector is not None:
+                self._embeddings.move_to_end(query)
+                return vector
+        vector = np.asarray(self.embed_fn(query), dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            self._embeddings[query] = vector
+            if len(self._embeddings) > SEMANTIC_CACHE_MAXSIZE:
+                self._embeddings.popitem(last=False)
+        return vector
+
+
+@functools.lru_cache(maxsize=1)
+def _get_embedding_client() -> 'AzureOpenAI':
+    return AzureOpenAI(
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION", "2024-02-01")
+    )
+
+
+def azure_openai_embed(text: str) -> List[float]:
+    """Embed text with the configured Azure OpenAI embedding deployment"""
+    response = _get_embedding_client().embeddings.create(model=EMBEDDING_MODEL, input=text)
+    return response.data[0].embedding
+
+
+def _default_embed_fn() -> Optional[Callable[[str], List[float]]]:
+    """Azure OpenAI embeddings when numpy, openai and an endpoint are available, else None"""
+    semantic_enabled = NUMPY_AVAILABLE and OPENAI_AVAILABLE and bool(os.getenv("AZURE_OPENAI_ENDPOINT"))
+    return azure_openai_embed if semantic_enabled else None
+
+
+@functools.lru_cache(maxsize=None)
+def get_response_cache(namespace: str) -> ResponseCache:
+    """
+    Get the shared response cache for a namespace (typically agent name + index).
+
+    The semantic tier is enabled only when numpy, openai and an Azure OpenAI
+    endpoint are available; otherwise only exact matches are served.
+    """
+    return ResponseCache(namespace, embed_fn=_default_embed_fn())
+
+
+@functools.lru_cache(maxsize=None)
+def get_retrieval_cache(namespace: str) -> ResponseCache:
+    """Get the shared cache of retrieved search documents for a namespace"""
+    return ResponseCache(f"retrieval:{namespace}", embed_fn=_default_embed_fn(), threshold=RETRIEVAL_CACHE_THRESHOLD)
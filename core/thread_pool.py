@@ -0,0 +1,41 @@
+# Pooled Azure AI agent threads keyed by (agent, session)
+#
+# Reusing a thread saves the create_thread round trip on repeat calls and keeps the
+# conversation prefix stable for the service-side prompt cache. The pool is a bounded
+# LRU: the least recently used thread is forgotten once THREAD_POOL_MAXSIZE is reached.
+
+import os
+from collections import OrderedDict
+from typing import Any
+
+from core.retry import azure_retry
+
+THREAD_POOL_MAXSIZE = int(os.getenv("AGENT_THREAD_POOL_SIZE", "256"))
+
+THREAD_POOL: "OrderedDict[str, str]" = OrderedDict()
+
+
+async def get_thread(project_client: Any, agent_id: str, session_id: str = "default") -> str:
+    """
+    Get the pooled thread ID for an agent and session, creating the thread on a miss.
+
+    Args:
+        project_client: azure.ai.projects.aio AIProjectClient
+        agent_id: Agent the thread is used with
+        session_id: Caller/session identifier (e.g. user or claim ID)
+
+    Returns:
+        Thread ID
+    """
+    key = f"{agent_id}:{session_id}"
+
+    thread_id = THREAD_POOL.get(key)
+    if thread_id is not None:
+        THREAD_POOL.move_to_end(key)
+        return thread_id
+
+    thread = await azure_retry(project_client.agents.create_thread)()
+    THREAD_POOL[key] = thread.id
+    if len(THREAD_POOL) > THREAD_POOL_MAXSIZE:
+        THREAD_POOL.popitem(last=False)
+    return thread.id
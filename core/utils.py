@@ -1,7 +1,24 @@
 # Utility functions for the fraud detection system
 
 import re
-from typing import List, Optional, Dict, Any
+import functools
+from typing import Callable, List, Optional, Dict, Any, Sequence, Tuple
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# ₹, Rs. and INR amounts in one pass; the three prefixes cannot overlap
+_AMOUNT_RE = re.compile(r'(?:₹|Rs\.?\s*|INR\s*)[\d,]+\.?\d*', re.IGNORECASE)
+
+# clean_amount_string() fast path: deletes every Latin-1 character except digits and '.', plus ₹
+_AMOUNT_DELETE_TABLE = str.maketrans(
+    '', '', ''.join(chr(c) for c in range(256) if chr(c) not in '0123456789.') + '₹'
+)
+_NON_AMOUNT_RE = re.compile(r'[^\d.]')
 
 
 def format_currency(amount: float) -> str:
@@ -21,60 +38,143 @@ def calculate_remaining_balance(available_balance: float, claim_amount: float) -
     return available_balance - claim_amount
 
 
+def calculate_utilization_batch(
+    previously_claimed: Sequence[float], current_claims: Sequence[float], coverage_limits: Sequence[float]
+) -> Sequence[float]:
+    """
+    Calculate policy utilization percentages for a batch of claims in one pass.
+
+    numpy is imported here rather than at module level so importing core stays cheap.
+
+    Args:
+        previously_claimed: Amount already claimed on each policy
+        current_claims: Amount of each current claim
+        coverage_limits: Coverage limit of each policy (non-positive limits give 0.0)
+
+    Returns:
+        A numpy array when numpy is installed, otherwise a list
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        return [
+            calculate_utilization(prev, curr, limit)
+            for prev, curr, limit in zip(previously_claimed, current_claims, coverage_limits)
+        ]
+
+    limits = np.asarray(coverage_limits, dtype=float)
+    totals = np.asarray(previously_claimed, dtype=float) + np.asarray(current_claims, dtype=float)
+    safe_limits = np.where(limits > 0, limits, 1.0)
+    return np.where(limits > 0, totals / safe_limits * 100, 0.0)
+
+
+def calculate_remaining_balance_batch(
+    available_balances: Sequence[float], claim_amounts: Sequence[float]
+) -> Sequence[float]:
+    """Calculate remaining balances for a batch of claims (numpy array when available, else a list)"""
+    try:
+        import numpy as np
+    except ImportError:
+        return [balance - amount for balance, amount in zip(available_balances, claim_amounts)]
+
+    return np.asarray(available_balances, dtype=float) - np.asarray(claim_amounts, dtype=float)
+
+
+@functools.lru_cache(maxsize=128)
+def _compiled_pattern(pattern: str) -> 're.Pattern':
+    """Case-insensitive compiled form of a caller-supplied pattern"""
+    return re.compile(pattern, re.IGNORECASE)
+
+
 def extract_pattern(content: str, pattern: str) -> Optional[str]:
     """Extract first match of a regex pattern from content"""
-    match = re.search(pattern, content, re.IGNORECASE)
+    match = _compiled_pattern(pattern).search(content)
     return match.group(0) if match else None
 
 
 def extract_all_amounts(content: str) -> List[str]:
-    """Extract all currency amounts from content"""
-    patterns = [
-        r'₹[\d,]+\.?\d*',
-        r'Rs\.?\s*[\d,]+\.?\d*',
-        r'INR\s*[\d,]+\.?\d*'
-    ]
-    amounts = []
-    for pattern in patterns:
-        amounts.extend(re.findall(pattern, content, re.IGNORECASE))
-    return amounts
+    """Extract all currency amounts from content, in the order they appear"""
+    return _AMOUNT_RE.findall(content)
 
 
 def clean_amount_string(amount_str: str) -> float:
     """Convert amount string to float"""
-    clean = re.sub(r'[^\d.]', '', str(amount_str))
+    amount_str = str(amount_str)
+    try:
+        return float(amount_str.translate(_AMOUNT_DELETE_TABLE))
+    except ValueError:
+        pass
+    # Other non-ASCII characters survive the table; strip them the slow way
     try:
-        return float(clean)
+        return float(_NON_AMOUNT_RE.sub('', amount_str))
     except ValueError:
         return 0.0
 
 
+@functools.lru_cache(maxsize=64)
+def _keyword_matcher(keywords: Tuple[str, ...]) -> Callable[[str], bool]:
+    """
+    Single-pass test for any of the keywords, built once per keyword set.
+
+    Uses an Aho-Corasick automaton when pyahocorasick is installed, otherwise one
+    alternation regex; either way the text is scanned once instead of once per keyword.
+    """
+    if AHOCORASICK_AVAILABLE:
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        return lambda text: next(automaton.iter(text), None) is not None
+
+    pattern = re.compile("|".join(map(re.escape, keywords)))
+    return lambda text: pattern.search(text) is not None
+
+
 def check_keywords_in_text(text: str, keywords: List[str]) -> bool:
     """Check if any keywords exist in text"""
-    text_lower = text.lower()
-    return any(keyword in text_lower for keyword in keywords)
+    if not keywords:
+        return False
+    return _keyword_matcher(tuple(keywords))(text.lower())
+
+
+@functools.lru_cache(maxsize=64)
+def _decision_field_pattern(field_name: str, options: Tuple[str, ...]) -> 're.Pattern':
+    """Matches "FIELD: OPTION" or "FIELD:** OPTION" for any of the options"""
+    alternatives = "|".join(map(re.escape, options))
+    return re.compile(rf"{re.escape(field_name)}:(?:\*\*)? ({alternatives})", re.IGNORECASE)
 
 
 def extract_decision_field(content: str, field_name: str, options: List[str]) -> Optional[str]:
-    """Extract a decision field value from content"""
-    content_upper = content.upper()
-    for option in options:
-        patterns = [
-            f"{field_name.upper()}:** {option}",
-            f"{field_name.upper()}: {option}"
-        ]
-        for pattern in patterns:
-            if pattern in content_upper:
-                return option
-    return None
+    """Extract a decision field value from content; earlier options win when several appear"""
+    found = {
+        match.group(1).upper()
+        for match in _decision_field_pattern(field_name, tuple(options)).finditer(content)
+    }
+    return next((option for option in options if option.upper() in found), None)
+
+
+def _dict_message_content(msg: Dict[str, Any]) -> str:
+    return msg.get('content', msg.get('message', str(msg)))
+
+
+# Content extractors for the common exact message types, looked up by type(msg)
+_MESSAGE_CONTENT_EXTRACTORS: Dict[type, Callable[[Any], str]] = {
+    str: lambda msg: msg,
+    dict: _dict_message_content,
+}
 
 
 def get_message_content(msg: Any) -> str:
     """Extract content from various message formats"""
-    if hasattr(msg, 'content') and msg.content:
-        return msg.content
+    extractor = _MESSAGE_CONTENT_EXTRACTORS.get(type(msg))
+    if extractor is not None:
+        return extractor(msg)
+
+    content = getattr(msg, 'content', None)
+    if content:
+        return content
     elif isinstance(msg, dict):
-        return msg.get('content', msg.get('message', str(msg)))
+        return _dict_message_content(msg)
     elif isinstance(msg, str):
         return msg
     return str(msg)
@@ -27,11 +27,13 @@ from core.utils import get_message_content
 
 # Services
 from services.agent_factory import AgentFactory
+from services.parallel_validators import OPENAI_AVAILABLE as PARALLEL_VALIDATORS_AVAILABLE, build_and_dispatch_all
 from services.decision_extractor import DecisionExtractor
 from services.report_generator import ReportGenerator
 
 # Workflow manager for Azure AI
 from workflow_manager import HealthInsuranceWorkflowManager
+from config import CONFIG
 
 # X-ray analysis
 try:
@@ -49,16 +51,26 @@ class FraudDetectionOrchestrator:
     Coordinates specialized agents for comprehensive claim analysis.
     """
     
-    def __init__(self, enable_xray: bool = True, enable_azure_evidence: bool = True):
+    def __init__(
+        self,
+        enable_xray: bool = True,
+        enable_azure_evidence: bool = True,
+        enable_parallel_processing: Optional[bool] = None
+    ):
         """
         Initialize the fraud detection orchestrator.
         
         Args:
             enable_xray: Enable X-ray analysis component
             enable_azure_evidence: Enable Azure AI evidence collection
+            enable_parallel_processing: Run the validators concurrently instead of as a
+                group chat (default: CONFIG.workflow.enable_parallel_processing)
         """
         self.enable_xray = enable_xray and XRAY_AVAILABLE
         self.enable_azure_evidence = enable_azure_evidence
+        if enable_parallel_processing is None:
+            enable_parallel_processing = CONFIG.workflow.enable_parallel_processing
+        self.enable_parallel_processing = enable_parallel_processing and PARALLEL_VALIDATORS_AVAILABLE
         self.llm_config = get_llm_config()
         
         # Initialize components
@@ -68,6 +80,7 @@ class FraudDetectionOrchestrator:
         print(f"   AutoGen: {'✅' if AUTOGEN_AVAILABLE else '❌'}")
         print(f"   X-ray Analysis: {'✅' if self.enable_xray else '❌'}")
         print(f"   Azure Evidence: {'✅' if self.enable_azure_evidence else '❌'}")
+        print(f"   Parallel Validators: {'✅' if self.enable_parallel_processing else '❌'}")
     
     def _init_components(self):
         """Initialize workflow and analysis components"""
@@ -160,6 +173,7 @@ class FraudDetectionOrchestrator:
             "autogen_enabled": AUTOGEN_AVAILABLE,
             "xray_analysis_enabled": self.enable_xray,
             "azure_evidence_collection": self.enable_azure_evidence,
+            "parallel_processing": self.enable_parallel_processing,
             "workflow_manager": self.workflow is not None,
             "xray_api": self.xray_api is not None
         }
@@ -276,7 +290,7 @@ class FraudDetectionOrchestrator:
         print("🩻 Collecting X-ray Evidence...")
         
         try:
-            xray_results = self.xray_api.predict_all_images()
+            xray_results = await self.xray_api.apredict_all_images()
             analysis = self._analyze_xray_for_fraud(xray_results, claim_data)
             print("   ✅ X-ray evidence collected")
             return analysis
@@ -345,6 +359,9 @@ class FraudDetectionOrchestrator:
     ) -> Dict[str, Any]:
         """Run AutoGen multi-agent fraud detection"""
         
+        if self.enable_parallel_processing:
+            return await self._run_parallel_validators(claim_data, evidence)
+        
         if not AUTOGEN_AVAILABLE:
             return {
                 "status": "unavailable",
@@ -402,6 +419,33 @@ class FraudDetectionOrchestrator:
                 "error": str(e)
             }
     
+    async def _run_parallel_validators(
+        self, claim_data: Dict[str, Any], evidence: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Run the validators concurrently, then the coordinator, without a group chat"""
+        print(f"\n🤖 STEP 2: Parallel Multi-Agent Fraud Analysis")
+        print("-" * 60)
+        
+        try:
+            findings = await build_and_dispatch_all(claim_data, evidence)
+            messages = [{"name": name, "content": reply} for name, reply in findings.items()]
+            
+            # Extract decision
+            extractor = DecisionExtractor(claim_data)
+            decision = extractor.extract_decision(messages)
+            
+            return {
+                "status": "completed",
+                "fraud_decision": decision,
+                "conversation_length": len(messages)
+            }
+            
+        except Exception as e:
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
+    
     def _create_initial_message(self, claim_data: Dict[str, Any]) -> str:
         """Create initial message for fraud detection workflow"""
         return f"""
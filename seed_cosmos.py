@@ -7,12 +7,13 @@ Loads log.json and log2.json into:
 
 import json
 import os
+import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from api.cosmos_service import get_cosmos_service
+from api.cosmos_service import get_cosmos_service, COSMOS_ENSURE_CREATED
 
 
 def load_json(path: str) -> dict:
@@ -20,8 +21,10 @@ def load_json(path: str) -> dict:
         return json.load(f)
 
 
-def seed():
+async def seed():
     cosmos = get_cosmos_service()
+    if COSMOS_ENSURE_CREATED:
+        await cosmos.ensure_created()
 
     log_files = {
         "CLM001-2024-LAKSHMI": os.path.join("health-insurance-frontend", "src", "log.json"),
@@ -44,7 +47,7 @@ def seed():
             "created_at": now,
             "updated_at": now,
         }
-        cosmos.claims_container.upsert_item(claim_doc)
+        await cosmos.claims_container.upsert_item(claim_doc)
         print(f"  ✅ Claim upserted into 'claims' container")
 
         # --- 2. Upsert into 'agent_logs' container ---
@@ -54,12 +57,13 @@ def seed():
             "claim_id": claim_id,
             "created_at": now,
         }
-        cosmos.logs_container.upsert_item(log_doc)
+        await cosmos.logs_container.upsert_item(log_doc)
         print(f"  ✅ Agent log upserted into 'agent_logs' container")
 
     print(f"\n{'='*60}")
     print("🎉 Seeding complete! Both claims and logs are now in Cosmos DB.")
+    await cosmos.close()
 
 
 if __name__ == "__main__":
-    seed()
+    asyncio.run(seed())
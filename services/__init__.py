@@ -3,5 +3,6 @@ from .evidence_collector import EvidenceCollector
 from .decision_extractor import DecisionExtractor
 from .report_generator import ReportGenerator
 from .agent_factory import AgentFactory
+from .parallel_validators import build_and_dispatch_all
 
-__all__ = ['EvidenceCollector', 'DecisionExtractor', 'ReportGenerator', 'AgentFactory']
+__all__ = ['EvidenceCollector', 'DecisionExtractor', 'ReportGenerator', 'AgentFactory', 'build_and_dispatch_all']
@@ -10,7 +10,7 @@ try:
 except ImportError:
     AUTOGEN_AVAILABLE = False
 
-from core.prompts import (
+from core.instructions import (
     get_fraud_specialist_prompt,
     get_medical_validator_prompt,
     get_billing_validator_prompt,
@@ -103,7 +103,7 @@ class EvidenceCollector:
         print("🩻 Collecting X-ray Evidence...")
         
         try:
-            xray_results = self.xray_api.predict_all_images()
+            xray_results = await self.xray_api.apredict_all_images()
             analysis = self._analyze_xray_for_fraud(xray_results, claim_data)
             print("   ✅ X-ray evidence collected")
             return analysis
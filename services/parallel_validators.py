@@ -0,0 +1,114 @@
+# Concurrent fan-out of the fraud validator prompts
+#
+# The five specialist validators are independent of each other; only the coordinator
+# needs their findings. Instead of AutoGen's round-robin group chat, this dispatches the
+# five validator calls concurrently and then runs the coordinator on their output.
+# FraudDetectionOrchestrator uses it when CONFIG.workflow.enable_parallel_processing is set.
+
+import asyncio
+import logging
+import functools
+from typing import Dict, Any, Callable
+from dotenv import load_dotenv
+
+try:
+    from openai import AsyncAzureOpenAI
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+from core.instructions import (
+    get_fraud_specialist_messages,
+    get_medical_validator_messages,
+    get_billing_validator_messages,
+    get_policy_balance_validator_messages,
+    get_coverage_exclusions_validator_messages,
+    get_fraud_coordinator_messages
+)
+from core.config import get_llm_config
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Validator agent name -> builder of its cacheable prompt from (claim, evidence).
+# Names and evidence keys match services/agent_factory.py.
+VALIDATOR_MESSAGE_BUILDERS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], Dict[str, Any]]] = {
+    "Fraud_Detection_Specialist": lambda claim, evidence: get_fraud_specialist_messages(
+        evidence.get("medical", ""), evidence.get("billing", ""), evidence.get("xray", "")
+    ),
+    "Medical_Consistency_Validator": lambda claim, evidence: get_medical_validator_messages(
+        evidence.get("medical", ""), evidence.get("xray", "")
+    ),
+    "Billing_Analysis_Validator": lambda claim, evidence: get_billing_validator_messages(
+        evidence.get("billing", "")
+    ),
+    "Policy_Balance_Validator": lambda claim, evidence: get_policy_balance_validator_messages(
+        claim, evidence.get("policy_coverage", "")
+    ),
+    "Coverage_Exclusions_Validator": lambda claim, evidence: get_coverage_exclusions_validator_messages(
+        evidence.get("detailed_exclusions", ""), evidence.get("exclusions_analysis", {})
+    ),
+}
+
+COORDINATOR_NAME = "Fraud_Decision_Coordinator"
+
+
+@functools.lru_cache(maxsize=1)
+def _get_async_client() -> 'AsyncAzureOpenAI':
+    config = get_llm_config()["config_list"][0]
+    return AsyncAzureOpenAI(
+        azure_endpoint=config["azure_endpoint"],
+        api_key=config["api_key"],
+        api_version=config["api_version"]
+    )
+
+
+async def _complete(prompt: Dict[str, Any], extra_context: str = "") -> str:
+    """
+    Run one chat completion for a prompt built by a get_*_messages() function.
+
+    Azure OpenAI has no cache_control field; it caches a byte-identical prompt prefix
+    on its own. The blocks are joined in order, so the static instructions built by
+    core.instructions stay the leading prefix and the claim-specific text follows.
+    """
+    llm_config = get_llm_config()
+    system = "".join(block["text"] for block in prompt["system"])
+    user = "".join(block["text"] for block in prompt["messages"][0]["content"]) + extra_context
+
+    response = await _get_async_client().chat.completions.create(
+        model=llm_config["config_list"][0]["model"],
+        messages=[{"role": "system", "content": system}, {"role": "user", "content": user}],
+        temperature=llm_config["temperature"],
+        max_tokens=llm_config["max_tokens"],
+        timeout=llm_config["timeout"]
+    )
+    return response.choices[0].message.content or ""
+
+
+async def build_and_dispatch_all(claim: Dict[str, Any], evidence: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Run the five validators concurrently, then the coordinator on their findings.
+
+    Args:
+        claim: Claim data (see core.config.get_default_claim_data)
+        evidence: Evidence dict as passed to AgentFactory
+
+    Returns:
+        Each agent's reply keyed by agent name, the coordinator's decision last
+    """
+    if not OPENAI_AVAILABLE:
+        raise ImportError("openai is not installed. Install with: pip install openai")
+
+    names = list(VALIDATOR_MESSAGE_BUILDERS)
+    logger.info("🚀 Dispatching %d validators concurrently...", len(names))
+    replies = await asyncio.gather(*(
+        _complete(VALIDATOR_MESSAGE_BUILDERS[name](claim, evidence)) for name in names
+    ))
+    findings = dict(zip(names, replies))
+
+    # The coordinator only starts once every validator has replied
+    agent_findings = "".join(f"\n\n{name} FINDINGS:\n{reply}" for name, reply in findings.items())
+    findings[COORDINATOR_NAME] = await _complete(get_fraud_coordinator_messages(claim), agent_findings)
+    logger.info("✅ All validator findings collected and synthesized")
+    return findings
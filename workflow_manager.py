@@ -9,9 +9,6 @@ from typing import Dict, Any, List, Optional
 from dataclasses import dataclass, asdict
 from enum import Enum
 from dotenv import load_dotenv
-from azure.ai.projects import AIProjectClient
-from azure.identity import DefaultAzureCredential
-from azure.ai.projects.models import AzureAISearchTool, Tool
 
 # Import our custom agents
 import sys
@@ -19,7 +16,9 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'agents'))
 from xrayanalysis import XRayPredictionAPI
 
 # Import centralized instructions
-from core.instructions import AZURE_AGENT_INSTRUCTIONS, SEARCH_FIELD_MAPPINGS
+from core.instructions import AZURE_AGENT_INSTRUCTIONS
+from core.agent_runner import build_search_tool, select_search_connection
+from core.azure_clients import get_project_client
 
 # Load environment variables
 load_dotenv()
@@ -99,14 +98,8 @@ class HealthInsuranceWorkflowManager:
         self.subscription_id = os.getenv("AZURE_SUBSCRIPTION_ID", "")
         self.project_name = os.getenv("AZURE_PROJECT_NAME", "")
         
-        # Initialize Azure AI Project client
-        self.project_client = AIProjectClient(
-            endpoint=self.endpoint,
-            resource_group_name=self.resource_group,
-            subscription_id=self.subscription_id,
-            project_name=self.project_name,
-            credential=DefaultAzureCredential()
-        )
+        # Shared Azure AI Project client; the Azure SDK is imported on first use, not at module import
+        self.project_client = get_project_client()
         
         # Find Azure AI Search connection
         self.conn_id = self._find_search_connection()
@@ -126,24 +119,11 @@ class HealthInsuranceWorkflowManager:
     
     def _find_search_connection(self) -> str:
         """Find and return the Azure AI Search connection ID"""
-        conn_list = self.project_client.connections.list()
-        
-        # Try to find fsisearchindex connection first
-        for conn in conn_list:
-            if conn.connection_type == "CognitiveSearch" and "fsisearchindex" in conn.id.lower():
-                return conn.id
-        
-        # If not found, try fsi
-        for conn in conn_list:
-            if conn.connection_type == "CognitiveSearch" and "fsi" in conn.id.lower():
-                return conn.id
-        
-        # Final fallback
-        for conn in conn_list:
-            if conn.connection_type == "CognitiveSearch":
-                return conn.id
-        
-        raise ValueError("No Azure AI Search connection found")
+        # Same selection as the standalone agents: fsisearchindex, then fsi, then the first
+        conn_id = select_search_connection(list(self.project_client.connections.list()))
+        if not conn_id:
+            raise ValueError("No Azure AI Search connection found")
+        return conn_id
     
     def initialize_shared_thread(self) -> str:
         """Initialize a shared thread for agent coordination"""
@@ -155,18 +135,8 @@ class HealthInsuranceWorkflowManager:
     def create_specialist_agent(self, agent_type: str, index_name: str) -> Any:
         """Create a specialized agent based on type"""
         
-        # Common AI Search tool setup using centralized field mappings
-        try:
-            ai_search = AzureAISearchTool(
-                index_connection_id=self.conn_id,
-                index_name=index_name,
-                field_mappings=SEARCH_FIELD_MAPPINGS
-            )
-        except TypeError:
-            ai_search = AzureAISearchTool(
-                index_connection_id=self.conn_id,
-                index_name=index_name
-            )
+        # Common AI Search tool setup using centralized field mappings and a top_k cap
+        ai_search = build_search_tool(self.conn_id, index_name)
         
         # Map agent_type to instruction keys
         instruction_key_map = {